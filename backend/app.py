@@ -1,12 +1,26 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import json
+import re
 import numpy as np
 from datetime import datetime
 import threading
 import time
-from models.model_loader import ModelLoader
+import os
+import sys
+import atexit
+from models.model_loader import ModelLoader, ARTIFACT_FORMAT
 from models.ml_processor import MLProcessor
+from models.batch_predictor import BatchPredictor
+from models.worker_pool import MLWorkerPool
+from models.intent_router import IntentRouter, DEFAULT_RULES_PATH
+from models.backends import ModelRegistry, TemplateBackend, MarkovBackend, ModelOverloaded, DEFAULT_CORPUS_PATH
+from storage.state import create_state
+from storage.records import Message, format_timestamp
+from storage.persistence import create_backend
+from storage.response_cache import LRUCache, content_key
+from storage.vector_index import ConversationIndex
+from serving.metrics import Metrics
+from serving.json_provider import FastJSONProvider
 import logging
 
 # Setup logging
@@ -15,14 +29,110 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
+app.json = FastJSONProvider(app, encoder=os.environ.get('BRAD_JSON_ENCODER') or None)
+
+# Stage timers and request counters, exported at /api/metrics
+metrics = Metrics(enabled=os.environ.get('BRAD_METRICS', '1') == '1')
 
 # Initialize components
-model_loader = ModelLoader()
+data_dir = os.environ.get('BRAD_DATA_DIR', 'data')
+training_mode = os.environ.get('BRAD_TRAINING_MODE', 'incremental')
+model_artifact = os.environ.get(
+    'BRAD_MODEL_ARTIFACT',
+    os.path.join(data_dir, 'models', f'classifier-{training_mode}-v{ARTIFACT_FORMAT}.pkl')
+)
+model_loader = ModelLoader(
+    incremental=training_mode == 'incremental',
+    max_samples=int(os.environ.get('BRAD_MAX_TRAINING_SAMPLES', 10000)),
+    artifact_path=model_artifact if model_artifact != 'none' else None,
+    metrics=metrics
+)
 ml_processor = MLProcessor()
 
-# Store conversation history
-conversation_history = {}
-user_profiles = {}
+# Optional process pool for feature extraction, classification and
+# embedding. Created before any background thread starts so that forked
+# workers inherit a clean process.
+ml_pool = None
+if os.environ.get('BRAD_EXECUTION', 'thread') == 'process':
+    ml_pool = MLWorkerPool(
+        ml_processor,
+        model_loader,
+        workers=int(os.environ.get('BRAD_PROCESS_WORKERS', 0)) or None,
+        fallback=os.environ.get('BRAD_PROCESS_FALLBACK', '1') == '1'
+    )
+    atexit.register(ml_pool.close)
+
+# The classifier loads on first use; 'background' starts loading it now
+# without holding up startup, 'eager' blocks until it is ready
+warmup = os.environ.get('BRAD_WARMUP', 'background')
+if warmup in ('background', 'eager'):
+    model_loader.warm_up(background=warmup == 'background')
+
+intent_router = IntentRouter.from_file(os.environ.get('BRAD_INTENT_RULES', DEFAULT_RULES_PATH))
+category_predictor = BatchPredictor(
+    model_loader,
+    max_batch=int(os.environ.get('BRAD_PREDICT_MAX_BATCH', 64)),
+    max_wait_ms=float(os.environ.get('BRAD_PREDICT_MAX_WAIT_MS', 2))
+)
+
+# Optional durable storage: 'log' (segment log) or 'sqlite'
+persistence = create_backend(
+    os.environ.get('BRAD_PERSISTENCE', 'none'),
+    data_dir,
+    history_size=50
+)
+if persistence is not None:
+    persistence.start_maintenance(float(os.environ.get('BRAD_MAINTENANCE_INTERVAL', 60)))
+    atexit.register(persistence.close)
+
+# Shared state: 'local' keeps history, profiles and the response cache in
+# this process; 'redis' keeps them on Redis-protocol servers so several
+# workers or nodes can serve the same users
+state = create_state(
+    os.environ.get('BRAD_STATE', 'local'),
+    urls=os.environ.get('BRAD_STATE_URLS'),
+    max_connections=int(os.environ.get('BRAD_STATE_POOL_SIZE', 16))
+)
+atexit.register(state.close)
+
+# Caches for deterministic per-message work. Features are cheaper to
+# recompute than to fetch, so their cache always stays in process
+feature_cache = LRUCache(
+    max_entries=int(os.environ.get('BRAD_CACHE_SIZE', 10000)),
+    ttl_seconds=float(os.environ.get('BRAD_CACHE_TTL', 300))
+)
+response_cache = state.cache(
+    'responses',
+    max_entries=int(os.environ.get('BRAD_CACHE_SIZE', 10000)),
+    ttl_seconds=float(os.environ.get('BRAD_CACHE_TTL', 300))
+)
+
+# Store conversation history and user profiles
+session_store = state.session_store(
+    max_users=int(os.environ.get('BRAD_MAX_USERS', 10000)),
+    ttl_seconds=float(os.environ.get('BRAD_SESSION_TTL', 3600)),
+    history_size=50,
+    persistence=persistence
+)
+# Expire idle sessions on a timer as well as on access; stats() only reads
+session_store.start_maintenance(float(os.environ.get('BRAD_MAINTENANCE_INTERVAL', 60)))
+atexit.register(session_store.close)
+
+# Serialized history entries; entries never change once stored
+history_fragments = LRUCache(
+    max_entries=int(os.environ.get('BRAD_HISTORY_FRAGMENTS', 100000)),
+    ttl_seconds=0
+)
+
+# Embedding index of past turns, searched for relevant context
+conversation_index = ConversationIndex(
+    ml_pool.embedder if ml_pool is not None else ml_processor.embedder,
+    max_users=int(os.environ.get('BRAD_INDEX_MAX_USERS', 1000)),
+    turns_per_user=int(os.environ.get('BRAD_INDEX_TURNS_PER_USER', 100)),
+    ttl_seconds=float(os.environ.get('BRAD_SESSION_TTL', 3600)),
+    # Rebuilt from the shared or persisted history when a user has no index here
+    load_history=session_store.get_history
+)
 
 # Available models with their specifications
 AVAILABLE_MODELS = {
@@ -78,93 +188,411 @@ AVAILABLE_MODELS = {
     }
 }
 
+# Model id -> backend, bound below once the generators are defined
+model_registry = ModelRegistry(
+    memory_budget=int(float(os.environ.get('BRAD_MODEL_MEMORY_MB', 256)) * 2 ** 20)
+)
+model_max_queue = int(os.environ.get('BRAD_MODEL_MAX_QUEUE', 64))
+
+# Limits of /api/chat/batch
+batch_max_items = int(os.environ.get('BRAD_BATCH_MAX_ITEMS', 10000))
+batch_chunk_size = int(os.environ.get('BRAD_BATCH_CHUNK', 256))
+
 @app.route('/api/models', methods=['GET'])
 def get_models():
-    """Get list of available models"""
+    """Get list of available models with their live backend state"""
+    registry = model_registry.stats()
+    models = {
+        model_id: dict(spec, runtime=registry["models"][model_id])
+        for model_id, spec in AVAILABLE_MODELS.items()
+    }
     return jsonify({
-        "models": AVAILABLE_MODELS,
+        "models": models,
         "default_model": "brad-ai-1.12.2x",
+        "memory": {
+            "used_bytes": registry["memory_bytes"],
+            "budget_bytes": registry["memory_budget"],
+            "evictions": registry["evictions"]
+        },
         "status": "success"
     })
 
+@app.route('/api/models/<model_id>', methods=['GET'])
+def get_model(model_id):
+    """Get one model with its backend state and measured performance"""
+    if model_id not in AVAILABLE_MODELS:
+        return jsonify({"error": "Model not found"}), 404
+    info = model_loader.get_model_info(model_id)
+    return jsonify(dict(
+        AVAILABLE_MODELS[model_id],
+        runtime=model_registry.get(model_id).stats(),
+        performance=info["performance"],
+        classifier=info["classifier"]
+    ))
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Main chat endpoint"""
+    started = time.perf_counter()
+    model_id, status = "invalid", 500
     try:
-        data = request.json
-        user_message = data.get('message', '').strip()
-        model_id = data.get('model', 'brad-ai-1.12.2x')
-        user_id = data.get('user_id', 'default')
+        params, error = parse_chat_request(request.json)
+        if error:
+            status = error[1]
+            return error
+        user_message, model_id, user_id = params
         
-        if not user_message:
-            return jsonify({"error": "Message is required"}), 400
-        
-        if model_id not in AVAILABLE_MODELS:
-            return jsonify({"error": "Model not found"}), 404
-        
-        # Initialize conversation history for user if not exists
-        if user_id not in conversation_history:
-            conversation_history[user_id] = []
-        
-        # Store user message
-        conversation_history[user_id].append({
-            "role": "user",
-            "message": user_message,
-            "timestamp": datetime.now().isoformat(),
-            "model": model_id
-        })
-        
-        # Process with ML features
-        ml_features = ml_processor.extract_features(user_message)
+        ml_features = begin_chat_turn(user_message, model_id, user_id)
         
         # Get response based on model
         response = generate_response(user_message, model_id, user_id, ml_features)
         
-        # Store assistant response
-        conversation_history[user_id].append({
-            "role": "assistant",
-            "message": response,
-            "timestamp": datetime.now().isoformat(),
-            "model": model_id
-        })
+        payload = complete_chat_turn(user_message, model_id, user_id, response, ml_features)
+        serialize_started = time.perf_counter()
+        reply = jsonify(payload)
+        metrics.observe('serialization', model_id, time.perf_counter() - serialize_started)
+        status = 200
+        return reply
         
-        # Update user profile with ML
-        update_user_profile(user_id, user_message, response, ml_features)
-        
-        # Keep only last 50 messages
-        if len(conversation_history[user_id]) > 50:
-            conversation_history[user_id] = conversation_history[user_id][-50:]
+    except ModelOverloaded as e:
+        status = 503
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+    except Exception as e:
+        logger.error(f"Error in chat endpoint: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        metrics.record_request('/api/chat', model_id, status, time.perf_counter() - started)
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Streaming chat endpoint using Server-Sent Events"""
+    started = time.perf_counter()
+    try:
+        params, error = parse_chat_request(request.json)
+        if error:
+            metrics.record_request('/api/chat/stream', "invalid", error[1], time.perf_counter() - started)
+            return error
+        user_message, model_id, user_id = params
         
-        return jsonify({
-            "response": response,
-            "model": AVAILABLE_MODELS[model_id]["name"],
-            "model_version": AVAILABLE_MODELS[model_id]["version"],
-            "timestamp": datetime.now().isoformat(),
-            "ml_insights": ml_features
-        })
+        ml_features = begin_chat_turn(user_message, model_id, user_id)
         
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}")
+        logger.error(f"Error in chat stream endpoint: {str(e)}")
+        metrics.record_request('/api/chat/stream', "invalid", 500, time.perf_counter() - started)
         return jsonify({"error": str(e)}), 500
+    
+    def events():
+        chunks = []
+        status = 500
+        try:
+            for chunk in stream_response(user_message, model_id, user_id, ml_features):
+                chunks.append(chunk)
+                yield sse_event({"delta": chunk})
+            
+            # Final event carries the metadata of the non-streaming endpoint
+            response = ''.join(chunks)
+            payload = complete_chat_turn(user_message, model_id, user_id, response, ml_features)
+            serialize_started = time.perf_counter()
+            event = sse_event(payload, event='done')
+            metrics.observe('serialization', model_id, time.perf_counter() - serialize_started)
+            status = 200
+            yield event
+        except GeneratorExit:
+            # Client went away mid-stream
+            status = 499
+            raise
+        except Exception as e:
+            logger.error(f"Error in chat stream endpoint: {str(e)}")
+            if isinstance(e, ModelOverloaded):
+                status = 503
+            yield sse_event({"error": str(e)}, event='error')
+        finally:
+            metrics.record_request('/api/chat/stream', model_id, status, time.perf_counter() - started)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
-def generate_response(message, model_id, user_id, ml_features):
-    """Generate response based on model and message"""
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Batch chat endpoint: many {message, model, user_id} items in one request
+
+    Results come back in item order, each with its own status, so one bad
+    item does not fail the batch. With "stream": true (or an Accept header
+    of application/x-ndjson) results are streamed as NDJSON, one line per
+    item, a chunk of items at a time.
+    """
+    started = time.perf_counter()
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A non-empty list of items is required"}), 400
+    if len(items) > batch_max_items:
+        return jsonify({"error": f"At most {batch_max_items} items per batch"}), 413
     
-    # Get conversation context
-    context = conversation_history.get(user_id, [])[-10:]  # Last 10 messages
+    stream = (isinstance(data, dict) and bool(data.get('stream'))) or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
     
-    # Base responses with model-specific variations
-    base_responses = {
-        "brad-ai-1.12.2x": generate_standard_response,
-        "brad-ai-1.13.4r": generate_reasoning_response,
-        "brad-ai-2.0.1a": generate_ml_enhanced_response,
-        "brad-ai-2.1.3c": generate_creative_response,
-        "brad-ai-2.2.0m": generate_technical_response
-    }
+    def results():
+        try:
+            for start in range(0, len(items), batch_chunk_size):
+                yield from process_chat_batch(items[start:start + batch_chunk_size], start)
+        finally:
+            metrics.record_request('/api/chat/batch', "batch", 200, time.perf_counter() - started)
+    
+    if stream:
+        lines = (app.json.dumps_bytes(result) + b"\n" for result in results())
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    
+    collected = list(results())
+    return jsonify({
+        "results": collected,
+        "count": len(collected),
+        "errors": sum(1 for result in collected if result["status"] != 200),
+        "status": "success"
+    })
+
+def process_chat_batch(items, offset=0):
+    """Run a chunk of batch items, returning one result dict per item in order"""
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if isinstance(item, dict):
+            params, error = validate_chat_request(item)
+        else:
+            params, error = None, ("Item must be an object", 400)
+        if error:
+            message, status = error
+            results[index] = {"index": offset + index, "status": status, "error": message}
+        else:
+            valid.append((index, *params))
+    
+    # Bulk feature extraction and classification across every model
+    analyses = analyze_batch([message for _, message, _, _ in valid]) if valid else []
+    
+    # Generate per model: cached responses are replayed, the rest of each
+    # model's items go to its worker pool as one task
+    responses = {}
+    pending = {}
+    for (index, message, model_id, user_id), ml_features in zip(valid, analyses):
+        backend = model_registry.get(model_id)
+        if backend.cacheable:
+            cached = response_cache.get(content_key('response', model_id, message))
+            if cached is not None:
+                responses[index] = cached
+                continue
+        context = conversation_index.search(user_id, message, k=10)
+        pending.setdefault(model_id, []).append((index, (message, context, ml_features)))
+    
+    generation_started = time.perf_counter()
+    futures = {}
+    for model_id, group in pending.items():
+        try:
+            futures[model_id] = model_registry.get(model_id).run_batch([request for _, request in group])
+        except ModelOverloaded as e:
+            for index, _ in group:
+                responses[index] = e
+    for model_id, future in futures.items():
+        backend = model_registry.get(model_id)
+        try:
+            outputs = future.result()
+        except Exception as e:
+            outputs = [e] * len(pending[model_id])
+        for (index, (message, _, _)), output in zip(pending[model_id], outputs):
+            responses[index] = output
+            if backend.cacheable and isinstance(output, str):
+                response_cache.put(content_key('response', model_id, message), output)
+    metrics.observe('generation', "batch", time.perf_counter() - generation_started)
+    
+    for (index, message, model_id, user_id), ml_features in zip(valid, analyses):
+        response = responses[index]
+        if isinstance(response, Exception):
+            status = getattr(response, 'status_code', 500)
+            results[index] = {"index": offset + index, "status": status, "error": str(response)}
+            continue
+        try:
+            session_store.append_message(user_id, Message('user', message, model=model_id))
+            payload = complete_chat_turn(message, model_id, user_id, response, ml_features)
+            results[index] = dict(payload, index=offset + index, status=200)
+        except Exception as e:
+            logger.error(f"Error in chat batch item: {str(e)}")
+            results[index] = {"index": offset + index, "status": 500, "error": str(e)}
+    return results
+
+def sse_event(data, event=None):
+    """Format a Server-Sent Events frame with a JSON payload"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {app.json.dumps(data)}\n\n"
+
+def validate_chat_request(data):
+    """Validate a chat request body into (message, model_id, user_id) or (error, status)"""
+    data = data or {}
+    user_message = data.get('message', '')
+    model_id = data.get('model', 'brad-ai-1.12.2x')
+    user_id = data.get('user_id', 'default')
+    
+    if not isinstance(user_message, str):
+        return None, ("Message must be a string", 400)
+    user_message = user_message.strip()
+    if not user_message:
+        return None, ("Message is required", 400)
+    
+    # Stores key users by string: JSON snapshots and Redis keys turn 42 into "42"
+    if isinstance(user_id, bool) or not isinstance(user_id, (str, int, float)):
+        return None, ("Invalid user_id", 400)
+    user_id = str(user_id)
+    
+    # A list or object model id is unhashable and cannot name a model
+    if not isinstance(model_id, str) or model_id not in AVAILABLE_MODELS:
+        return None, ("Model not found", 404)
+    
+    return (user_message, model_id, user_id), None
+
+def parse_chat_request(data):
+    """Validate a chat request body, returning a Flask error response on failure"""
+    params, error = validate_chat_request(data)
+    if error:
+        message, status = error
+        return None, (jsonify({"error": message}), status)
+    return params, None
+
+def begin_chat_turn(user_message, model_id, user_id):
+    """Store the user message and extract its ML features"""
+    session_store.append_message(user_id, Message('user', user_message, model=model_id))
+    
+    # Process with ML features
+    started = time.perf_counter()
+    if ml_pool is not None:
+        ml_features = analyze_in_pool(user_message)
+        metrics.observe('analysis', model_id, time.perf_counter() - started)
+        return ml_features
+    ml_features = extract_features_cached(user_message)
+    classify_started = time.perf_counter()
+    ml_features['category'] = str(category_predictor.predict(user_message))
+    metrics.observe('features', model_id, classify_started - started)
+    metrics.observe('classification', model_id, time.perf_counter() - classify_started)
+    return ml_features
+
+def analyze_in_pool(message):
+    """Features and category from one worker round trip, reusing cached features"""
+    key = content_key('features', message)
+    features = feature_cache.get(key)
+    if features is None:
+        (features,), (category,) = ml_pool.run([message], ('features', 'category'))
+        feature_cache.put(key, features)
+    else:
+        (category,), = ml_pool.run([message], ('category',))
+    return dict(features, topics=list(features['topics']), category=category)
+
+def analyze_batch(messages):
+    """Features and category for many messages, extracting and classifying in bulk"""
+    started = time.perf_counter()
+    unique = list(dict.fromkeys(messages))
+    keys = {message: content_key('features', message) for message in unique}
+    cached = {message: feature_cache.get(key) for message, key in keys.items()}
+    missing = [message for message in unique if cached[message] is None]
+    
+    if ml_pool is not None:
+        extracted = ml_pool.run(missing, ('features',))[0] if missing else []
+        categories = ml_pool.run(unique, ('category',))[0]
+        metrics.observe('analysis', "batch", time.perf_counter() - started)
+    else:
+        extracted = ml_processor.extract_features_batch(missing).to_dicts() if missing else []
+        classify_started = time.perf_counter()
+        metrics.observe('features', "batch", classify_started - started)
+        categories = [str(category) for category in model_loader.predict_categories(unique)]
+        metrics.observe('classification', "batch", time.perf_counter() - classify_started)
+    
+    for message, features in zip(missing, extracted):
+        feature_cache.put(keys[message], features)
+        cached[message] = features
+    categories = dict(zip(unique, categories))
     
-    generator = base_responses.get(model_id, generate_standard_response)
-    return generator(message, context, ml_features)
+    # Callers add keys to the dicts, so hand out copies
+    return [
+        dict(cached[message], topics=list(cached[message]['topics']), category=categories[message])
+        for message in messages
+    ]
+
+def extract_features_cached(message):
+    """Extract ML features, reusing results for previously seen messages"""
+    key = content_key('features', message)
+    features = feature_cache.get(key)
+    if features is None:
+        features = ml_processor.extract_features(message)
+        feature_cache.put(key, features)
+    # Callers add keys to the dict, so hand out a copy
+    return dict(features, topics=list(features['topics']))
+
+def complete_chat_turn(user_message, model_id, user_id, response, ml_features):
+    """Store the assistant response, update the profile and build the reply payload"""
+    now = time.time()
+    assistant_entry = Message('assistant', response, now, model_id)
+    
+    # Store the response and update the user profile with ML in one write
+    started = time.perf_counter()
+    session_store.record_turn(user_id, [assistant_entry], ml_features, now)
+    metrics.observe('profile_update', model_id, time.perf_counter() - started)
+    
+    # Index the finished turn for later context retrieval
+    conversation_index.add_turns(user_id, [Message('user', user_message, now, model_id), assistant_entry])
+    
+    return {
+        "response": response,
+        "model": AVAILABLE_MODELS[model_id]["name"],
+        "model_version": AVAILABLE_MODELS[model_id]["version"],
+        "timestamp": format_timestamp(now),
+        "ml_insights": ml_features
+    }
+
+def generate_response(message, model_id, user_id, ml_features):
+    """Generate response based on model and message"""
+    return ''.join(stream_response(message, model_id, user_id, ml_features))
+
+def stream_response(message, model_id, user_id, ml_features):
+    """Yield response chunks based on model and message"""
+    started = time.perf_counter()
+    try:
+        # Get conversation context: the 10 past messages most relevant to this one
+        context = conversation_index.search(user_id, message, k=10)
+        
+        # Generation runs on the model's own worker pool
+        backend = model_registry.get(model_id)
+        if not backend.cacheable:
+            yield from backend.stream(message, context, ml_features)
+            return
+        
+        # Deterministic generators depend only on the message and model
+        key = content_key('response', model_id, message)
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield from stream_text(cached)
+            return
+        
+        chunks = []
+        for chunk in backend.stream(message, context, ml_features):
+            chunks.append(chunk)
+            yield chunk
+        response_cache.put(key, ''.join(chunks))
+    finally:
+        # Includes time the consumer spends between chunks when streaming
+        metrics.observe('generation', model_id, time.perf_counter() - started)
+
+def uncacheable(generator):
+    """Mark a response generator whose output must not be cached"""
+    generator.cacheable = False
+    return generator
 
+# Word-sized pieces whose concatenation is the original text
+STREAM_TOKEN_PATTERN = re.compile(r'\S+\s*|\s+')
+
+def stream_text(text):
+    """Yield text one word (with trailing whitespace) at a time"""
+    for match in STREAM_TOKEN_PATTERN.finditer(text):
+        yield match.group()
+
+@uncacheable
 def generate_standard_response(message, context, ml_features):
     """Standard model response"""
     responses = [
@@ -175,7 +603,8 @@ def generate_standard_response(message, context, ml_features):
         f"Based on your query, I'd like to share some insights."
     ]
     
-    return np.random.choice(responses) + "\n\n" + get_detailed_response(message)
+    yield np.random.choice(responses) + "\n\n"
+    yield from stream_text(get_detailed_response(message))
 
 def generate_reasoning_response(message, context, ml_features):
     """Reasoning-optimized response"""
@@ -185,7 +614,8 @@ def generate_reasoning_response(message, context, ml_features):
     reasoning_prompt += f"3. Analyzing relationships\n"
     reasoning_prompt += f"4. Drawing conclusions\n\n"
     
-    return reasoning_prompt + "Based on logical analysis, here's my response:\n" + get_detailed_response(message)
+    yield reasoning_prompt + "Based on logical analysis, here's my response:\n"
+    yield from stream_text(get_detailed_response(message))
 
 def generate_ml_enhanced_response(message, context, ml_features):
     """ML-enhanced response with personalization"""
@@ -196,18 +626,8 @@ def generate_ml_enhanced_response(message, context, ml_features):
     if topics:
         personalized += f" and relates to {', '.join(topics[:3])}"
     
-    return f"{personalized}.\n\nAs Brad AI 2.0.1a with machine learning capabilities, I've analyzed your query pattern. " + get_detailed_response(message)
-
-def generate_creative_response(message, context, ml_features):
-    """Creative and conversational response"""
-    creative_intros = [
-        "What an interesting question! Let me weave some insights together...",
-        "I love this topic! Here's a creative take on it:",
-        "From a creative perspective, here's how I see it:",
-        "Let me craft a thoughtful response for you:"
-    ]
-    
-    return np.random.choice(creative_intros) + "\n\n" + get_detailed_response(message)
+    yield f"{personalized}.\n\nAs Brad AI 2.0.1a with machine learning capabilities, I've analyzed your query pattern. "
+    yield from stream_text(get_detailed_response(message))
 
 def generate_technical_response(message, context, ml_features):
     """Technical and detailed response"""
@@ -219,97 +639,139 @@ def generate_technical_response(message, context, ml_features):
     technical_template += "- Inference generation\n\n"
     technical_template += "**Response:**\n"
     
-    return technical_template + get_detailed_response(message)
+    yield technical_template
+    yield from stream_text(get_detailed_response(message))
 
 def get_detailed_response(message):
     """Generate a detailed response based on message content"""
-    message_lower = message.lower()
-    
-    if any(word in message_lower for word in ['hello', 'hi', 'hey']):
-        return "Hello! I'm Brad AI, ready to assist you with various tasks. How can I help you today?"
-    
-    elif any(word in message_lower for word in ['how are you', 'how do you do']):
-        return "I'm functioning optimally, thank you for asking! As an AI, I don't have feelings, but I'm fully operational and ready to help with your queries."
-    
-    elif any(word in message_lower for word in ['weather', 'temperature']):
-        return "I don't have real-time weather data access, but I can help you understand meteorological concepts or analyze weather patterns historically."
-    
-    elif any(word in message_lower for word in ['joke', 'funny']):
-        return "Why don't scientists trust atoms?\nBecause they make up everything! \n\nNow, how else can I assist you?"
-    
-    elif any(word in message_lower for word in ['machine learning', 'ml', 'ai']):
-        return "Machine learning is a subset of artificial intelligence that enables systems to learn and improve from experience without being explicitly programmed. Key concepts include supervised learning, unsupervised learning, neural networks, and deep learning. I can help explain these concepts in detail!"
-    
-    elif any(word in message_lower for word in ['python', 'code', 'programming']):
-        return "I can help with Python programming! Here's a simple example:\n```python\ndef greet(name):\n    return f'Hello, {name}!'\n\nprint(greet('User'))\n```\nWould you like help with a specific programming task?"
-    
-    elif any(word in message_lower for word in ['explain', 'what is', 'tell me about']):
-        topic = message.replace('explain', '').replace('what is', '').replace('tell me about', '').strip()
-        return f"{topic.capitalize()} is a topic I can provide information about. Would you like me to go into more specific details?"
-    
-    else:
-        return f"I've received your message about '{message}'. This appears to be a general inquiry. I'm capable of helping with:\n- Answering questions\n- Providing explanations\n- Generating creative content\n- Assisting with technical topics\n- Machine learning concepts\n\nHow would you like me to proceed with this topic?"
-
-def update_user_profile(user_id, message, response, ml_features):
-    """Update user profile with ML insights"""
-    if user_id not in user_profiles:
-        user_profiles[user_id] = {
-            "interaction_count": 0,
-            "topics": [],
-            "average_sentiment": 0,
-            "preferred_model": None,
-            "last_interaction": datetime.now().isoformat()
-        }
-    
-    profile = user_profiles[user_id]
-    profile["interaction_count"] += 1
-    profile["last_interaction"] = datetime.now().isoformat()
-    
-    # Update topics
-    if 'topics' in ml_features:
-        profile["topics"].extend(ml_features['topics'])
-        profile["topics"] = list(set(profile["topics"]))[:10]  # Keep unique, limit to 10
-    
-    # Update sentiment average
-    if 'sentiment_score' in ml_features:
-        current_avg = profile["average_sentiment"]
-        count = profile["interaction_count"]
-        profile["average_sentiment"] = (current_avg * (count-1) + ml_features['sentiment_score']) / count
+    return intent_router.respond(message)
+
+# Bind each model id to a backend with its worker pool size. The creative
+# model opens with a sentence from a Markov chain over a local corpus.
+model_registry.register(TemplateBackend(
+    "brad-ai-1.12.2x", generate_standard_response, max_concurrency=8, max_queue=model_max_queue))
+model_registry.register(TemplateBackend(
+    "brad-ai-1.13.4r", generate_reasoning_response, max_concurrency=4, max_queue=model_max_queue))
+model_registry.register(TemplateBackend(
+    "brad-ai-2.0.1a", generate_ml_enhanced_response, max_concurrency=4, max_queue=model_max_queue))
+model_registry.register(MarkovBackend(
+    "brad-ai-2.1.3c", lambda message: stream_text(get_detailed_response(message)),
+    corpus_path=os.environ.get('BRAD_MARKOV_CORPUS', DEFAULT_CORPUS_PATH),
+    max_concurrency=4, max_queue=model_max_queue))
+model_registry.register(TemplateBackend(
+    "brad-ai-2.2.0m", generate_technical_response, max_concurrency=2, max_queue=model_max_queue))
 
 @app.route('/api/profile/<user_id>', methods=['GET'])
 def get_profile(user_id):
     """Get user profile"""
-    profile = user_profiles.get(user_id, {})
-    return jsonify({
+    with session_store.user_lock(user_id):
+        profile = session_store.get_profile(user_id)
+        # A profile changes only when an interaction is recorded
+        etag = f"p{profile.interaction_count}-{profile.last_interaction!r}" if profile else "p0"
+        if request.if_none_match.contains(etag):
+            return not_modified(etag)
+        profile = profile.to_dict() if profile else {}
+    response = jsonify({
         "user_id": user_id,
         "profile": profile,
         "status": "success"
     })
+    response.set_etag(etag)
+    return response
 
 @app.route('/api/history/<user_id>', methods=['GET'])
 def get_history(user_id):
-    """Get conversation history"""
-    history = conversation_history.get(user_id, [])
-    return jsonify({
-        "user_id": user_id,
-        "history": history[-20:],  # Last 20 messages
-        "total_messages": len(history),
-        "status": "success"
-    })
+    """Get conversation history, assembled from cached per-entry JSON"""
+    history = session_store.get_history(user_id)
+    # Every append moves the newest entry's timestamp
+    etag = f"h{len(history)}-{history[-1].timestamp!r}" if history else "h0"
+    if request.if_none_match.contains(etag):
+        return not_modified(etag)
+    
+    dumps = app.json.dumps_bytes
+    body = b''.join((
+        b'{"user_id":', dumps(user_id),
+        b',"history":[', b','.join(history_fragment(entry) for entry in history[-20:]),  # Last 20 messages
+        b'],"total_messages":', dumps(len(history)),
+        b',"status":"success"}'
+    ))
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def history_fragment(entry):
+    """Serialized JSON of a history entry, cached by entry"""
+    fragment = history_fragments.get(entry)
+    if fragment is None:
+        fragment = app.json.dumps_bytes(entry.to_dict())
+        history_fragments.put(entry, fragment)
+    return fragment
+
+def not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness)"""
     return jsonify({
         "status": "healthy",
+        "ready": model_loader.is_ready,
         "service": "Brad AI Chat API",
         "timestamp": datetime.now().isoformat(),
-        "active_users": len(conversation_history),
-        "models_loaded": len(AVAILABLE_MODELS)
+        "active_users": len(session_store),
+        "models_loaded": len(AVAILABLE_MODELS),
+        "sessions": session_store.stats(),
+        "classifier": category_predictor.stats(),
+        "execution": ml_pool.stats() if ml_pool is not None else {"mode": "thread"},
+        "context_index": conversation_index.stats(),
+        "cache": {
+            "features": feature_cache.stats(),
+            "responses": response_cache.stats()
+        }
     })
 
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 503 until the classifier is loaded"""
+    ready = model_loader.is_ready
+    return jsonify({
+        "status": "ready" if ready else "starting",
+        "ready": ready,
+        "timestamp": datetime.now().isoformat()
+    }), 200 if ready else 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of stage timings, request counters and gauges"""
+    models = model_registry.stats()["models"]
+    feature_stats = feature_cache.stats()
+    response_stats = response_cache.stats()
+    gauges = {
+        "active_users": ("Users with an active session.", len(session_store)),
+        "classifier_ready": ("1 once the category classifier is loaded.", int(model_loader.is_ready)),
+        "classifier_queue_depth": ("Texts waiting for batched classification.", category_predictor.stats()["queued"]),
+        "feature_cache_hit_ratio": ("Feature cache hit ratio.", feature_stats["hit_rate"]),
+        "response_cache_hit_ratio": ("Response cache hit ratio.", response_stats["hit_rate"]),
+        "model_warm": ("1 if the model backend is loaded.",
+                       {model_id: int(stats["state"] == 'warm') for model_id, stats in models.items()}),
+        "model_queue_depth": ("Requests waiting for a model worker.",
+                              {model_id: stats["queue_depth"] for model_id, stats in models.items()}),
+        "model_active_requests": ("Requests being generated by a model.",
+                                  {model_id: stats["active"] for model_id, stats in models.items()}),
+        "model_memory_bytes": ("Approximate memory held by a loaded model.",
+                               {model_id: stats["memory_bytes"] for model_id, stats in models.items()})
+    }
+    return Response(metrics.render_prometheus(gauges), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     logger.info("Starting Brad AI Server...")
     logger.info(f"Loaded {len(AVAILABLE_MODELS)} models")
     logger.info("Server running on http://localhost:5000")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    if os.environ.get('BRAD_SERVER', 'dev') == 'asgi':
+        # Production mode: async handlers with admission control
+        from serving.asgi import serve
+        serve(sys.modules[__name__], host='0.0.0.0', port=5000)
+    else:
+        app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,102 @@
+"""Benchmark for /api/chat/batch against looping on /api/chat.
+
+Sends the same synthetic prompts once as individual /api/chat requests
+and once as /api/chat/batch requests of --batch-size items (plain JSON
+and streamed NDJSON), clearing the caches in between, and reports
+items per second. Uses the Flask test client by default, or a running
+server with --url.
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch_chat
+    python -m benchmarks.bench_batch_chat --url http://localhost:5000
+"""
+import argparse
+import http.client
+import json
+import os
+import time
+from urllib.parse import urlparse
+
+os.environ.setdefault('BRAD_WARMUP', 'eager')
+
+from benchmarks.bench_feature_extraction import make_corpus
+
+MODELS = ["brad-ai-1.12.2x", "brad-ai-1.13.4r", "brad-ai-2.0.1a", "brad-ai-2.1.3c", "brad-ai-2.2.0m"]
+
+
+class TestClientTransport:
+    def __init__(self):
+        import app as backend
+        self.backend = backend
+        self.client = backend.app.test_client()
+
+    def post(self, path, body):
+        response = self.client.post(path, json=body)
+        return response.status_code, response.data
+
+    def reset(self):
+        self.backend.feature_cache.clear()
+        self.backend.response_cache.clear()
+
+
+class HTTPTransport:
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80)
+
+    def post(self, path, body):
+        self.connection.request('POST', path, json.dumps(body), {"Content-Type": "application/json"})
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+    def reset(self):
+        """A remote server's caches cannot be cleared; runs use distinct prompts"""
+
+
+def make_items(count, run):
+    corpus = make_corpus(count, seed=run)
+    return [
+        {"message": message, "model": MODELS[index % len(MODELS)], "user_id": f"bench-{run}-{index % 100}"}
+        for index, message in enumerate(corpus)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--url', default=None)
+    args = parser.parse_args()
+
+    transport = HTTPTransport(args.url) if args.url else TestClientTransport()
+    # Warm up model backends and the classifier
+    for item in make_items(20, run=99):
+        transport.post('/api/chat', item)
+
+    results = {}
+    for run, mode in enumerate(('loop', 'batch', 'batch+ndjson')):
+        items = make_items(args.items, run)
+        transport.reset()
+        start = time.perf_counter()
+        if mode == 'loop':
+            for item in items:
+                status, _ = transport.post('/api/chat', item)
+                assert status == 200
+        else:
+            for offset in range(0, len(items), args.batch_size):
+                body = {"items": items[offset:offset + args.batch_size], "stream": mode == 'batch+ndjson'}
+                status, data = transport.post('/api/chat/batch', body)
+                assert status == 200
+                if mode == 'batch':
+                    assert json.loads(data)["errors"] == 0
+                else:
+                    assert data.count(b'\n') == len(body["items"])
+        results[mode] = args.items / (time.perf_counter() - start)
+
+    print(f"{'mode':>14} {'items/s':>10} {'speedup':>8}")
+    for mode, rate in results.items():
+        print(f"{mode:>14} {rate:>10.0f} {rate / results['loop']:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
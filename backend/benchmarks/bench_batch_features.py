@@ -0,0 +1,66 @@
+"""Benchmark for batched feature extraction and embeddings.
+
+Compares a Python loop over MLProcessor.extract_features and
+generate_embeddings against extract_features_batch and
+generate_embeddings_batch, after checking that both paths agree exactly.
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch_features
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_feature_extraction import make_corpus
+from models.ml_processor import MLProcessor
+
+
+def check_equivalence(processor, corpus):
+    """Assert the batch results match the per-message path"""
+    batch = processor.extract_features_batch(corpus)
+    for index, text in enumerate(corpus):
+        assert batch.row(index) == processor.extract_features(text), text
+
+    embeddings = processor.generate_embeddings_batch(corpus)
+    expected = np.array([processor.generate_embeddings(text) for text in corpus])
+    assert embeddings.shape == expected.shape
+    assert np.array_equal(embeddings, expected)
+
+
+def best_time(func, repeat):
+    """Return the fastest wall time over several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    processor = MLProcessor()
+    corpus = make_corpus(args.messages, seed=1)
+    corpus += ['', '   ', 'Straße ÀÉÎ?', 'foodoctor!!']
+    check_equivalence(processor, corpus)
+
+    loop_features = best_time(lambda: [processor.extract_features(t) for t in corpus], args.repeat)
+    batch_features = best_time(lambda: processor.extract_features_batch(corpus), args.repeat)
+    loop_embeddings = best_time(lambda: [processor.generate_embeddings(t) for t in corpus], args.repeat)
+    batch_embeddings = best_time(lambda: processor.generate_embeddings_batch(corpus), args.repeat)
+
+    n = len(corpus)
+    print(f"messages:            {n}")
+    print(f"features loop:       {n / loop_features:,.0f} msg/s")
+    print(f"features batch:      {n / batch_features:,.0f} msg/s")
+    print(f"embeddings loop:     {n / loop_embeddings:,.0f} msg/s")
+    print(f"embeddings batch:    {n / batch_embeddings:,.0f} msg/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Throughput benchmark for micro-batched category prediction.
+
+Each caller thread classifies messages back to back, either by calling
+ModelLoader.predict_category directly or through BatchPredictor. Reports
+predictions/second and the average batch size at each concurrency level.
+
+Run from the backend directory:
+    python -m benchmarks.bench_batch_predictor
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.bench_feature_extraction import make_corpus
+from models.batch_predictor import BatchPredictor
+from models.model_loader import ModelLoader
+
+
+def run_callers(predict, corpus, callers, duration):
+    """Run closed-loop callers for duration seconds, return predictions/second"""
+    counts = [0] * callers
+    deadline = time.perf_counter() + duration
+
+    def caller(index):
+        position = index
+        while time.perf_counter() < deadline:
+            predict(corpus[position % len(corpus)])
+            position += callers
+            counts[index] += 1
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(callers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--callers', type=int, nargs='+', default=[1, 8, 64, 256])
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--incremental', action='store_true')
+    args = parser.parse_args()
+
+    loader = ModelLoader(incremental=args.incremental)
+    # The loader is lazy: import sklearn and fit now, not inside the first timed pass
+    loader.warm_up()
+    corpus = make_corpus(5000, seed=2)
+
+    print(f"{'callers':>8} {'direct/s':>10} {'batched/s':>10} {'speedup':>8} {'avg batch':>10} {'avg wait ms':>12}")
+    for callers in args.callers:
+        direct = run_callers(loader.predict_category, corpus, callers, args.duration)
+        predictor = BatchPredictor(loader, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+        batched = run_callers(predictor.predict, corpus, callers, args.duration)
+        stats = predictor.stats()
+        predictor.close()
+        print(f"{callers:>8} {direct:>10.0f} {batched:>10.0f} {batched / direct:>7.2f}x "
+              f"{stats['avg_batch_size']:>10.1f} {stats['avg_queue_wait_ms']:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Microbenchmark for MLProcessor.extract_features.
+
+Compares the legacy multi-pass extraction (composed from the individual
+MLProcessor methods) against the compiled single-pass engine and checks
+that both produce the same feature dict.
+
+Run from the backend directory:
+    python -m benchmarks.bench_feature_extraction
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from models.ml_processor import MLProcessor
+
+VOCABULARY = [
+    'hello', 'how', 'are', 'you', 'the', 'a', 'is', 'what', 'explain', 'code',
+    'python', 'programming', 'machine', 'learning', 'great', 'terrible', 'love',
+    'hate', 'movie', 'game', 'team', 'score', 'research', 'university', 'market',
+    'doctor', 'recipe', 'restaurant', 'software', 'computer', 'function',
+    'technique', 'awesome', 'worst', 'this', 'that', 'with', 'about', 'please',
+]
+
+
+def legacy_extract_features(processor, text):
+    """Feature extraction as it was before the single-pass engine"""
+    return {
+        'length': len(text),
+        'word_count': len(text.split()),
+        'sentiment': processor.analyze_sentiment(text),
+        'sentiment_score': processor.calculate_sentiment_score(text),
+        'topics': processor.extract_topics(text),
+        'complexity': processor.calculate_complexity(text),
+        'has_question': '?' in text,
+        'has_exclamation': '!' in text,
+        'unique_words': len(set(text.lower().split())),
+        'avg_word_length': np.mean([len(word) for word in text.split()]) if text.split() else 0
+    }
+
+
+def make_corpus(size, seed=0):
+    """Build a synthetic corpus of chat-like messages"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(1, 40))]
+        if rng.random() < 0.3:
+            words[0] = words[0].capitalize()
+        text = ' '.join(words) + rng.choice(['', '.', '?', '!', '. Thanks!'])
+        corpus.append(text)
+    return corpus
+
+
+def check_equivalence(processor, corpus):
+    """Assert the new engine matches the legacy output"""
+    for text in corpus:
+        expected = legacy_extract_features(processor, text)
+        actual = processor.extract_features(text)
+        # The legacy path truncated topics in set iteration order, so only
+        # the count and membership are comparable.
+        expected_topics = expected.pop('topics')
+        actual_topics = actual.pop('topics')
+        text_lower = text.lower()
+        matched = {
+            topic for topic, keywords in processor.topic_keywords.items()
+            if any(keyword in text_lower for keyword in keywords)
+        }
+        assert len(expected_topics) == len(actual_topics), text
+        assert set(actual_topics) <= matched, text
+        assert expected == actual, (text, expected, actual)
+
+
+def measure(func, corpus, repeat):
+    """Return the best messages/second over several runs"""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            func(text)
+        elapsed = time.perf_counter() - start
+        best = max(best, len(corpus) / elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    processor = MLProcessor()
+    corpus = make_corpus(args.messages)
+    check_equivalence(processor, corpus[:2000])
+
+    before = measure(lambda text: legacy_extract_features(processor, text), corpus, args.repeat)
+    after = measure(processor.extract_features, corpus, args.repeat)
+
+    print(f"messages:  {args.messages}")
+    print(f"before:    {before:,.0f} msg/s")
+    print(f"after:     {after:,.0f} msg/s")
+    print(f"speedup:   {after / before:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark for the memory taken by stored history and profiles.
+
+Fills per-user history ring buffers with --messages entries, once as the
+dicts of four strings the store used to hold (a fresh ISO timestamp and
+a model id string decoded from each request) and once as Message records,
+and reports the bytes allocated per stored message. Message texts come
+from a shared pool, so both runs measure the entry itself; the mean text
+size is printed separately. Profiles are compared the same way.
+
+Run from the backend directory:
+    python -m benchmarks.bench_history_memory
+"""
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+from storage.records import Message, Profile
+from benchmarks.bench_feature_extraction import make_corpus
+
+MODELS = ["brad-ai-1.12.2x", "brad-ai-1.13.4r", "brad-ai-2.0.1a", "brad-ai-2.1.3c", "brad-ai-2.2.0m"]
+TOPICS = ["technology", "science", "business", "health", "education", "entertainment"]
+
+
+def dict_entry(role, message, model):
+    # As built per request: model id decoded from the request JSON, timestamp formatted
+    return {
+        "role": role,
+        "message": message,
+        "timestamp": datetime.now().isoformat(),
+        "model": json.loads(f'"{model}"')
+    }
+
+
+def record_entry(role, message, model):
+    return Message(role, message, model=json.loads(f'"{model}"'))
+
+
+def dict_profile(rng):
+    profile = {"interaction_count": 0, "topics": [], "average_sentiment": 0,
+               "preferred_model": None, "last_interaction": datetime.now().isoformat()}
+    for _ in range(20):
+        profile["interaction_count"] += 1
+        profile["last_interaction"] = datetime.now().isoformat()
+        profile["topics"].extend(rng.sample(TOPICS, 2))
+        profile["topics"] = list(set(profile["topics"]))[:10]
+    return profile
+
+
+def record_profile(rng):
+    profile = Profile()
+    for _ in range(20):
+        profile.record({"topics": rng.sample(TOPICS, 2), "sentiment_score": 0.0})
+    return profile
+
+
+def measure(build):
+    """Bytes still allocated after build() returns its result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def fill_histories(make_entry, texts, messages, history_size):
+    histories = {}
+    users = messages // history_size
+    for index in range(messages):
+        user_id = f"user-{index % users}"
+        history = histories.get(user_id)
+        if history is None:
+            history = histories[user_id] = deque(maxlen=history_size)
+        role = "user" if index % 2 == 0 else "assistant"
+        history.append(make_entry(role, texts[index % len(texts)], MODELS[index % len(MODELS)]))
+    return histories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--history-size', type=int, default=50)
+    parser.add_argument('--profiles', type=int, default=20000)
+    args = parser.parse_args()
+
+    texts = make_corpus(1000, seed=0)
+    # Dict keys and user id strings are common to both layouts; build them once
+    baseline = measure(lambda: fill_histories(lambda role, message, model: None, texts,
+                                              args.messages, args.history_size))
+    print(f"{args.messages} messages, mean text {sum(map(len, texts)) / len(texts):.0f} chars (not counted)")
+    print(f"{'layout':>8} {'history MB':>11} {'bytes/message':>14}")
+    results = {}
+    for name, make_entry in (('dict', dict_entry), ('record', record_entry)):
+        allocated = measure(lambda: fill_histories(make_entry, texts, args.messages, args.history_size))
+        results[name] = (allocated - baseline) / args.messages
+        print(f"{name:>8} {allocated / 2 ** 20:>11.1f} {results[name]:>14.1f}")
+    print(f"saving: {100 * (1 - results['record'] / results['dict']):.0f}% per message")
+
+    print(f"\n{args.profiles} profiles")
+    for name, make_profile in (('dict', dict_profile), ('record', record_profile)):
+        rng = random.Random(0)
+        allocated = measure(lambda: [make_profile(rng) for _ in range(args.profiles)])
+        print(f"{name:>8} {allocated / args.profiles:>8.0f} bytes/profile")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Benchmark for intent routing in get_detailed_response.
+
+Compares the old if/elif chain of substring scans with the compiled
+IntentRouter on messages from 100 bytes to 100KB, for a message with no
+matching intent (every rule is scanned) and one whose only match is the
+last rule, and then with a growing number of rules. Also lists messages
+where the two disagree because the old chain matched inside words.
+
+Run from the backend directory:
+    python -m benchmarks.bench_intent_router
+"""
+import argparse
+import random
+import time
+
+from models.intent_router import IntentRouter
+
+FILLER = (
+    "lorem ipsum dolor sit amet, consectetur adipiscing elit; sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua."
+).split()
+
+LEGACY_RULES = [
+    ("greeting", ['hello', 'hi', 'hey']),
+    ("wellbeing", ['how are you', 'how do you do']),
+    ("weather", ['weather', 'temperature']),
+    ("joke", ['joke', 'funny']),
+    ("machine_learning", ['machine learning', 'ml', 'ai']),
+    ("programming", ['python', 'code', 'programming']),
+    ("explanation", ['explain', 'what is', 'tell me about']),
+]
+
+
+def legacy_intent(message, rules=LEGACY_RULES):
+    """Intent chosen by the old if/elif substring chain"""
+    message_lower = message.lower()
+    for intent, words in rules:
+        if any(word in message_lower for word in words):
+            return intent
+    return "general"
+
+
+def make_message(size, tail, seed=0):
+    rng = random.Random(seed)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words) + tail
+
+
+def per_call(func, message, budget=0.5):
+    """Average seconds per call, repeating for about budget seconds"""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        func(message)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= budget:
+            return elapsed / calls
+
+
+def synthetic_rules(count, seed=0):
+    """Extra (intent, keywords) rules with random keywords"""
+    rng = random.Random(seed)
+    letters = 'bcdfgjkqvwxz'
+    return [
+        (f"extra_{index}", [''.join(rng.choice(letters) for _ in range(6)) for _ in range(3)])
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    args = parser.parse_args()
+
+    router = IntentRouter.from_file()
+    cases = [("no match", ""), ("last rule", " tell me about it")]
+
+    print(f"{'size':>8} {'case':>10} {'chain us':>10} {'router us':>10} {'speedup':>8}")
+    for size in args.sizes:
+        for name, tail in cases:
+            message = make_message(size, tail)
+            assert legacy_intent(message) == router.match(message).intent
+            chain = per_call(legacy_intent, message)
+            compiled = per_call(router.match, message)
+            print(f"{size:>8} {name:>10} {chain * 1e6:>10.1f} {compiled * 1e6:>10.1f} {chain / compiled:>7.2f}x")
+
+    print()
+    print(f"{'rules':>8} {'chain us':>10} {'router us':>10} {'speedup':>8}   (10KB, no match)")
+    message = make_message(10000, "")
+    for extra in (0, 50, 200, 1000):
+        rules = LEGACY_RULES + synthetic_rules(extra)
+        scaled = IntentRouter(
+            [{"intent": intent, "patterns": words, "response": ""} for intent, words in rules],
+            {"intent": "general", "response": ""}
+        )
+        chain = per_call(lambda text: legacy_intent(text, rules), message)
+        compiled = per_call(scaled.match, message)
+        print(f"{len(rules):>8} {chain * 1e6:>10.1f} {compiled * 1e6:>10.1f} {chain / compiled:>7.2f}x")
+
+    print()
+    print("Word-boundary differences:")
+    for message in ["this is html", "show me the weather", "mail the chair", "please explain"]:
+        print(f"  {message!r}: chain={legacy_intent(message)} router={router.match(message).intent}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark for JSON response serialization.
+
+Encodes a /api/chat reply payload with Flask's default provider and with
+FastJSONProvider on each encoder, plus a payload of NumPy scalars and
+arrays (which the default provider cannot encode). It then times the
+/api/history view and full test-client polls with entries re-serialized
+on every request, with cached entry fragments, and with If-None-Match
+answered by 304.
+
+Run from the backend directory:
+    python -m benchmarks.bench_json
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault('BRAD_WARMUP', 'eager')
+
+import app as backend
+from flask.json.provider import DefaultJSONProvider
+from serving.json_provider import FastJSONProvider, orjson
+from benchmarks.bench_feature_extraction import make_corpus
+
+
+def per_call(func, repeat):
+    """Best-of-three microseconds per call"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20000)
+    parser.add_argument('--polls', type=int, default=5000)
+    args = parser.parse_args()
+
+    flask_app = backend.app
+    client = flask_app.test_client()
+    corpus = make_corpus(60, seed=0)
+    for message in corpus:
+        response = client.post('/api/chat', json={"message": message, "model": "brad-ai-2.0.1a", "user_id": "bench"})
+        payload = response.get_json()
+
+    numeric = {
+        "scores": {f"class-{index}": np.float32(index / 7) for index in range(20)},
+        "counts": np.arange(50, dtype=np.int64),
+        "total": np.int64(12345)
+    }
+    providers = [('flask', DefaultJSONProvider(flask_app)), ('json', FastJSONProvider(flask_app, 'json'))]
+    if orjson is not None:
+        providers.append(('orjson', FastJSONProvider(flask_app, 'orjson')))
+
+    print(f"{'provider':>9} {'chat payload us':>16} {'numpy payload us':>17}")
+    for name, provider in providers:
+        chat = per_call(lambda: provider.dumps(payload), args.repeat)
+        if isinstance(provider, FastJSONProvider):
+            numbers = f"{per_call(lambda: provider.dumps_bytes(numeric), args.repeat):>17.2f}"
+        else:
+            numbers = f"{'unsupported':>17}"
+        print(f"{name:>9} {chat:>16.2f} {numbers}")
+
+    print(f"\n/api/history polls ({flask_app.json.encoder} encoder)")
+    url = '/api/history/bench'
+    etag = client.get(url).headers['ETag']
+    scenarios = (
+        ('re-serialized', True, {}),
+        ('fragments', False, {}),
+        ('304', False, {'If-None-Match': etag})
+    )
+    print(f"{'':>14} {'view us':>8} {'client req/s':>13}")
+    for name, clear, headers in scenarios:
+        def view():
+            if clear:
+                backend.history_fragments.clear()
+            return backend.get_history('bench')
+
+        def poll():
+            if clear:
+                backend.history_fragments.clear()
+            return client.get(url, headers=headers)
+
+        with flask_app.test_request_context(url, headers=headers):
+            view_us = per_call(view, args.polls)
+        print(f"{name:>14} {view_us:>8.1f} {1e6 / per_call(poll, args.polls):>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark for the overhead of request instrumentation.
+
+Measures the cost of the calls one chat request makes into Metrics
+(five stage observations, one request record and their perf_counter
+reads) and compares it with the median /api/chat latency through the
+Flask test client. It also runs requests with metrics switched on and
+off every few requests and compares the two latency samples. The target
+is an overhead below 1% of request time.
+
+Run from the backend directory:
+    python -m benchmarks.bench_metrics
+"""
+import argparse
+import os
+import statistics
+import time
+
+os.environ.setdefault('BRAD_WARMUP', 'eager')
+
+import app as backend
+from serving.metrics import Metrics
+from benchmarks.bench_feature_extraction import make_corpus
+
+STAGES_PER_REQUEST = ('features', 'classification', 'generation', 'profile_update', 'serialization')
+
+
+def instrumentation_cost(repeat=20000):
+    """Seconds of instrumentation work per chat request"""
+    metrics = Metrics()
+    model = 'brad-ai-1.12.2x'
+    start = time.perf_counter()
+    for _ in range(repeat):
+        request_started = time.perf_counter()
+        for stage in STAGES_PER_REQUEST:
+            stage_started = time.perf_counter()
+            metrics.observe(stage, model, time.perf_counter() - stage_started)
+        metrics.record_request('/api/chat', model, 200, time.perf_counter() - request_started)
+    return (time.perf_counter() - start) / repeat
+
+
+def request_times(client, corpus, models, metrics=None):
+    """Per-request latencies; with metrics, toggle it every round of models
+
+    Switching on and off every few requests interleaves the two samples in
+    time, so drift (growing histories, indexes, GC) affects both equally.
+    """
+    enabled, disabled = [], []
+    for index, message in enumerate(corpus):
+        flag = (index // len(models)) % 2 == 0
+        if metrics is not None:
+            metrics.enabled = flag
+        body = {"message": message, "model": models[index % len(models)], "user_id": f"user-{index % 50}"}
+        start = time.perf_counter()
+        response = client.post('/api/chat', json=body)
+        (enabled if flag else disabled).append(time.perf_counter() - start)
+        assert response.status_code == 200
+    if metrics is not None:
+        metrics.enabled = True
+    return enabled, disabled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=4000)
+    args = parser.parse_args()
+
+    client = backend.app.test_client()
+    models = list(backend.AVAILABLE_MODELS)
+    corpus = make_corpus(args.requests, seed=0)
+    # Warm up the caches, classifier and model backends
+    request_times(client, corpus[:200], models)
+
+    enabled, disabled = request_times(client, corpus, models, backend.metrics)
+
+    cost = instrumentation_cost()
+    on = statistics.median(enabled)
+    off = statistics.median(disabled)
+    print(f"instrumentation per request: {cost * 1e6:.2f}us")
+    print(f"median request: {on * 1e6:.0f}us with metrics, {off * 1e6:.0f}us without")
+    print(f"overhead from instrumentation cost: {100 * cost / on:.3f}%")
+    print(f"overhead from A/B medians:          {100 * (on - off) / off:+.3f}% (noise-limited)")
+    print(f"overhead from A/B means:            "
+          f"{100 * (statistics.mean(enabled) - statistics.mean(disabled)) / statistics.mean(disabled):+.3f}%")
+    print("PASS" if cost / on < 0.01 else "FAIL", "(target < 1%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark for the process-pool execution mode.
+
+Runs the CPU-bound stages of a chat turn (features, category, embedding)
+for a synthetic corpus from a number of concurrent request threads, once
+in-thread and once through MLWorkerPool, and reports messages per second.
+In-thread throughput is capped by the GIL; the pool should scale with the
+number of cores up to the worker count.
+
+Run from the backend directory:
+    python -m benchmarks.bench_process_pool
+"""
+import argparse
+import os
+import threading
+import time
+
+from models.ml_processor import MLProcessor
+from models.model_loader import ModelLoader
+from models.worker_pool import MLWorkerPool, run_stages, STAGES
+from benchmarks.bench_feature_extraction import make_corpus
+
+
+def throughput(analyze, corpus, threads):
+    """Messages per second with threads callers sharing the corpus"""
+    shares = [corpus[index::threads] for index in range(threads)]
+
+    def worker(texts):
+        for text in texts:
+            analyze(text)
+
+    pool = [threading.Thread(target=worker, args=(share,)) for share in shares]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.messages, seed=0)
+    processor = MLProcessor()
+    loader = ModelLoader()
+    pool = MLWorkerPool(processor, loader, workers=args.workers, fallback=False)
+
+    def in_thread(text):
+        run_stages(processor, loader, [text], STAGES)
+
+    def in_pool(text):
+        pool.run([text], STAGES)
+
+    start = time.perf_counter()
+    pool.run(corpus)
+    bulk = len(corpus) / (time.perf_counter() - start)
+
+    print(f"cpus: {os.cpu_count()}  workers: {args.workers}")
+    print(f"{'threads':>8} {'thread msg/s':>13} {'pool msg/s':>11} {'speedup':>8}")
+    try:
+        for threads in args.threads:
+            local = throughput(in_thread, corpus, threads)
+            pooled = throughput(in_pool, corpus, threads)
+            print(f"{threads:>8} {local:>13.0f} {pooled:>11.0f} {pooled / local:>7.2f}x")
+        print(f"bulk run() of {len(corpus)} messages split across workers: {bulk:.0f} msg/s")
+    finally:
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
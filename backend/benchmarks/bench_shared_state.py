@@ -0,0 +1,171 @@
+"""Multi-process load test of the shared state backend.
+
+Starts --shards stand-in Redis-protocol servers (storage.resp_server),
+then for each worker count runs that many backend processes against
+them, all chatting as the same pool of users for --duration seconds, and
+reports the combined throughput. Afterwards it checks that every user's
+profile counted every turn, whichever process served it, and that their
+history holds both messages of the most recent turns. A single process with in-process
+state is measured first for reference.
+
+Throughput can only scale with worker count up to the number of CPU
+cores, which the stand-in servers share with the workers.
+
+Run from the backend directory:
+    python -m benchmarks.bench_shared_state
+    python -m benchmarks.bench_shared_state --workers 1,2,4,8 --shards 2
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from storage.redis_client import ConnectionPool, RedisError
+from storage.state import RedisState
+
+CHILD = r'''
+import json, random, sys, time
+import app
+from benchmarks.bench_feature_extraction import make_corpus
+
+worker, users, duration = int(sys.argv[1]), int(sys.argv[2]), float(sys.argv[3])
+client = app.app.test_client()
+models = list(app.AVAILABLE_MODELS)
+corpus = make_corpus(500, seed=worker)
+rng = random.Random(worker)
+for message in corpus[:20]:
+    client.post('/api/chat', json={"message": message, "model": models[0], "user_id": "warmup"})
+print("ready", flush=True)
+sys.stdin.readline()
+
+counts, latencies = {}, []
+deadline = time.perf_counter() + duration
+while time.perf_counter() < deadline:
+    user_id = f"user-{rng.randrange(users)}"
+    body = {"message": rng.choice(corpus), "model": rng.choice(models), "user_id": user_id}
+    started = time.perf_counter()
+    response = client.post('/api/chat', json=body)
+    latencies.append(time.perf_counter() - started)
+    assert response.status_code == 200, response.data
+    counts[user_id] = counts.get(user_id, 0) + 1
+print(json.dumps({"counts": counts, "latencies": latencies}), flush=True)
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_servers(count, backend_dir):
+    servers, urls = [], []
+    for _ in range(count):
+        port = free_port()
+        servers.append(subprocess.Popen(
+            [sys.executable, '-m', 'storage.resp_server', '--port', str(port)],
+            cwd=backend_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ))
+        urls.append(f"redis://127.0.0.1:{port}/0")
+    for url in urls:
+        pool = ConnectionPool.from_url(url)
+        for _ in range(100):
+            try:
+                pool.execute('PING')
+                break
+            except (OSError, RedisError):
+                time.sleep(0.05)
+        pool.close()
+    return servers, urls
+
+
+def run_workers(workers, env, args, backend_dir):
+    """Start workers, release them together, return their merged results"""
+    children = [
+        subprocess.Popen(
+            [sys.executable, '-c', CHILD, str(worker), str(args.users), str(args.duration)],
+            cwd=backend_dir, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True
+        )
+        for worker in range(workers)
+    ]
+    for child in children:
+        assert child.stdout.readline().strip() == 'ready'
+    for child in children:
+        child.stdin.write('go\n')
+        child.stdin.flush()
+
+    counts, latencies = {}, []
+    for child in children:
+        result = json.loads(child.stdout.readline())
+        child.wait()
+        for user_id, count in result["counts"].items():
+            counts[user_id] = counts.get(user_id, 0) + count
+        latencies.extend(result["latencies"])
+    return counts, latencies
+
+
+def check_state(urls, counts, history_size=50):
+    """Users whose stored profile or history disagrees with the turns sent"""
+    store = RedisState(urls).session_store(history_size=history_size)
+    wrong = []
+    for user_id, count in counts.items():
+        profile = store.get_profile(user_id)
+        # Concurrent turns of one user may interleave, so only count entries
+        stored = store.history_length(user_id)
+        if profile is None or profile.interaction_count != count or stored != min(2 * count, history_size):
+            wrong.append(user_id)
+    store.state.close()
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--shards', type=int, default=2)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    data_dir = tempfile.mkdtemp()
+    base_env = dict(os.environ, BRAD_WARMUP='eager', BRAD_DATA_DIR=data_dir, PYTHONPATH=backend_dir)
+    servers, urls = start_servers(args.shards, backend_dir)
+    try:
+        print(f"{os.cpu_count()} CPUs, {args.shards} state shards, {args.users} users, {args.duration:.0f}s per run")
+        print(f"{'state':>6} {'workers':>8} {'req/s':>8} {'speedup':>8} {'p50 ms':>7} {'p95 ms':>7} {'consistent':>11}")
+
+        counts, latencies = run_workers(1, dict(base_env, BRAD_STATE='local'), args, backend_dir)
+        local_rate = sum(counts.values()) / args.duration
+        print(f"{'local':>6} {1:>8} {local_rate:>8.0f} {'':>8} "
+              f"{statistics.median(latencies) * 1000:>7.2f} "
+              f"{statistics.quantiles(latencies, n=20)[-1] * 1000:>7.2f} {'-':>11}")
+
+        env = dict(base_env, BRAD_STATE='redis', BRAD_STATE_URLS=','.join(urls))
+        baseline = None
+        for workers in (int(count) for count in args.workers.split(',')):
+            for url in urls:
+                pool = ConnectionPool.from_url(url)
+                pool.execute('FLUSHDB')
+                pool.close()
+            counts, latencies = run_workers(workers, env, args, backend_dir)
+            rate = sum(counts.values()) / args.duration
+            baseline = baseline or rate
+            wrong = check_state(urls, counts)
+            print(f"{'redis':>6} {workers:>8} {rate:>8.0f} {rate / baseline:>7.2f}x "
+                  f"{statistics.median(latencies) * 1000:>7.2f} "
+                  f"{statistics.quantiles(latencies, n=20)[-1] * 1000:>7.2f} "
+                  f"{'yes' if not wrong else f'{len(wrong)} users off':>11}")
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark for backend cold start.
+
+Starts a fresh interpreter for each scenario and measures the time to
+import app, the time until /api/health/ready reports ready and the
+latency of the first /api/chat request, for each BRAD_WARMUP mode with
+and without a saved model artifact. A fresh process per run means
+nothing is already imported or cached.
+
+Run from the backend directory:
+    python -m benchmarks.bench_startup
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+CHILD = r'''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+request_start = time.perf_counter()
+client.post('/api/chat', json={"message": "hello there", "model": "brad-ai-2.0.1a", "user_id": "bench"})
+done = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_request": done - request_start, "total": done - start}))
+'''
+
+READY_CHILD = r'''
+import json, time
+start = time.perf_counter()
+import app
+client = app.app.test_client()
+while client.get('/api/health/ready').status_code != 200:
+    time.sleep(0.005)
+print(json.dumps({"ready": time.perf_counter() - start}))
+'''
+
+
+def run_child(code, env):
+    output = subprocess.run(
+        [sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'warmup':>11} {'artifact':>9} {'import ms':>10} {'ready ms':>9} {'first req ms':>13} {'total ms':>9}")
+    for warmup in ('lazy', 'background', 'eager'):
+        for artifact in ('cold', 'warm'):
+            with tempfile.TemporaryDirectory() as data_dir:
+                env = dict(os.environ, BRAD_WARMUP=warmup, BRAD_DATA_DIR=data_dir, PYTHONPATH=backend)
+                if artifact == 'warm':
+                    run_child(CHILD, env)
+                runs = []
+                for _ in range(args.repeat):
+                    timings = {}
+                    # Lazy mode only becomes ready when a request arrives
+                    for code in (CHILD,) if warmup == 'lazy' else (CHILD, READY_CHILD):
+                        if artifact == 'cold':
+                            # Drop the artifact so the run refits
+                            shutil.rmtree(os.path.join(data_dir, 'models'), ignore_errors=True)
+                        timings.update(run_child(code, env))
+                    runs.append(timings)
+            best = {key: min(run[key] for run in runs) * 1000 for key in runs[0]}
+            ready = f"{best['ready']:>9.0f}" if 'ready' in best else f"{'-':>9}"
+            print(f"{warmup:>11} {artifact:>9} {best['import']:>10.0f} {ready} "
+                  f"{best['first_request']:>13.1f} {best['total']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark for embedding index query latency.
+
+Fills a flat VectorIndex and a PartitionedIndex (IVF) with clustered
+random unit vectors and measures top-k query latency and the recall of
+the IVF index against the exact brute-force results, for stores from 1K
+to 1M vectors. Memory is dim * 4 bytes per vector, so 1M vectors at
+dim 128 take about 500MB.
+Also times HashedNgramEmbedder on a chat-sized text corpus.
+
+Run from the backend directory:
+    python -m benchmarks.bench_vector_index
+"""
+import argparse
+import time
+
+import numpy as np
+
+from models.embeddings import HashedNgramEmbedder
+from storage.vector_index import VectorIndex, PartitionedIndex
+from benchmarks.bench_feature_extraction import make_corpus
+
+
+def random_unit_vectors(count, dim, rng, centers=None, spread=0.6, chunk=100000):
+    """Unit vectors, scattered around random cluster centers when given"""
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for start in range(0, count, chunk):
+        block = rng.standard_normal((min(chunk, count - start), dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        if centers is not None:
+            block = centers[rng.integers(len(centers), size=len(block))] + spread * block
+            block /= np.linalg.norm(block, axis=1, keepdims=True)
+        vectors[start:start + len(block)] = block
+    return vectors
+
+
+def time_queries(index, queries, k):
+    """Per-query latencies in seconds and the returned payloads"""
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = index.search(query, k)
+        latencies.append(time.perf_counter() - start)
+        results.append({payload for _, payload in hits})
+    return np.array(latencies), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--nprobe', type=int, default=8)
+    parser.add_argument('--clusters', type=int, default=1000,
+                        help="topic clusters in the synthetic data (0 for uniform)")
+    args = parser.parse_args()
+
+    embedder = HashedNgramEmbedder(dim=args.dim)
+    corpus = make_corpus(5000, seed=0)
+    start = time.perf_counter()
+    embedder.embed_batch(corpus)
+    elapsed = time.perf_counter() - start
+    print(f"embed_batch: {len(corpus)} texts in {elapsed * 1000:.1f}ms "
+          f"({elapsed / len(corpus) * 1e6:.1f}us/text, dim {args.dim})")
+    print()
+
+    rng = np.random.default_rng(0)
+    # Conversation embeddings cluster by topic; uniform random vectors
+    # are the worst case for the IVF index
+    centers = random_unit_vectors(args.clusters, args.dim, rng) if args.clusters else None
+    print(f"{'vectors':>9} {'MB':>7} {'flat p50 ms':>12} {'flat p99 ms':>12} "
+          f"{'ivf p50 ms':>11} {'ivf p99 ms':>11} {'lists':>6} {'recall':>7}")
+    for size in args.sizes:
+        vectors = random_unit_vectors(size, args.dim, rng, centers)
+        queries = random_unit_vectors(args.queries, args.dim, rng, centers)
+
+        flat = VectorIndex(args.dim, initial_rows=size)
+        flat.add_batch(vectors, range(size))
+        flat_latency, exact = time_queries(flat, queries, args.k)
+
+        n_lists = max(1, int(np.sqrt(size)))
+        ivf = PartitionedIndex(args.dim, n_lists=n_lists, nprobe=args.nprobe)
+        ivf.train(vectors[rng.choice(size, min(size, n_lists * 40), replace=False)])
+        ivf.add_batch(vectors, range(size))
+        ivf_latency, approximate = time_queries(ivf, queries, args.k)
+
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact)])
+        print(f"{size:>9} {flat.nbytes / 2**20:>7.1f} "
+              f"{np.percentile(flat_latency, 50) * 1000:>12.3f} {np.percentile(flat_latency, 99) * 1000:>12.3f} "
+              f"{np.percentile(ivf_latency, 50) * 1000:>11.3f} {np.percentile(ivf_latency, 99) * 1000:>11.3f} "
+              f"{n_lists:>6} {recall:>7.2f}")
+        del flat, ivf, vectors
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Synthetic chat traffic for benchmarks.
+
+ChatCorpus builds a fixed pool of distinct messages and draws requests
+from it the way real chat traffic looks: message lengths mix one-word
+greetings, ordinary questions and pasted paragraphs; a few popular
+messages repeat often while most are rare (Zipf-distributed ranks); and
+requests come from many users, a handful of them very active. Everything
+derives from the seed, so two runs with the same seed see the same
+requests in the same order.
+
+Print a sample from the backend directory:
+    python -m benchmarks.corpus --requests 20
+"""
+import argparse
+import random
+
+import numpy as np
+
+from benchmarks.bench_feature_extraction import VOCABULARY
+
+# Words per message: (share of messages, fewest words, most words)
+LENGTH_MIX = [
+    (0.35, 1, 6),
+    (0.50, 7, 30),
+    (0.15, 31, 200),
+]
+
+# Keywords of each topic the feature extractor and classifier know about
+TOPIC_WORDS = {
+    'programming': ['python', 'code', 'programming', 'function', 'software', 'computer', 'bug', 'debug'],
+    'ai': ['machine', 'learning', 'neural', 'network', 'model', 'ai', 'training', 'data'],
+    'science': ['science', 'research', 'experiment', 'theory', 'scientific', 'study'],
+    'business': ['business', 'company', 'market', 'finance', 'investment'],
+    'health': ['health', 'medical', 'doctor', 'hospital', 'medicine'],
+    'entertainment': ['movie', 'music', 'game', 'fun', 'joke', 'funny'],
+    'food': ['food', 'cook', 'recipe', 'meal', 'restaurant'],
+    'weather': ['weather', 'temperature', 'climate', 'rain', 'forecast'],
+}
+
+OPENERS = [
+    'hello', 'hi there', 'hey', 'can you explain', 'what is', 'how do i', 'tell me about',
+    'please help with', 'why does', 'thanks for', 'i love', 'i hate',
+]
+
+FILLER = VOCABULARY + [
+    'and', 'or', 'but', 'because', 'when', 'then', 'my', 'your', 'it', 'in', 'on', 'for',
+    'really', 'very', 'good', 'bad', 'happy', 'sad', 'perfect', 'horrible', 'simple', 'fast',
+]
+
+
+def zipf_weights(count, exponent):
+    """Normalized 1 / rank ** exponent for ranks 1..count"""
+    weights = 1.0 / np.arange(1, count + 1, dtype=np.float64) ** exponent
+    return weights / weights.sum()
+
+
+class ChatCorpus:
+    """Reproducible generator of chat requests.
+
+    unique_messages distinct messages are drawn with Zipf(exponent)
+    popularity and users user ids with Zipf(user_exponent) activity.
+    Every message is written around one topic, returned as its label.
+    """
+
+    def __init__(self, seed=0, unique_messages=5000, users=2000, exponent=1.1, user_exponent=0.8,
+                 models=None):
+        """Build the message pool"""
+        self.seed = seed
+        self.users = users
+        self.exponent = exponent
+        self.user_exponent = user_exponent
+        self.models = list(models) if models else [
+            'brad-ai-1.12.2x', 'brad-ai-1.13.4r', 'brad-ai-2.0.1a', 'brad-ai-2.1.3c', 'brad-ai-2.2.0m'
+        ]
+        rng = random.Random(seed)
+        self.pool = [self._message(rng) for _ in range(unique_messages)]
+        self._message_weights = zipf_weights(unique_messages, exponent)
+        self._user_weights = zipf_weights(users, user_exponent)
+
+    @staticmethod
+    def _message(rng):
+        """One (text, topic) pair"""
+        share = rng.random()
+        for weight, low, high in LENGTH_MIX:
+            share -= weight
+            if share < 0:
+                break
+        length = rng.randint(low, high)
+        topic = rng.choice(list(TOPIC_WORDS))
+        keywords = TOPIC_WORDS[topic]
+
+        opener = rng.choice(OPENERS).split()
+        words = opener if len(opener) < length else [rng.choice(keywords + ['hello', 'hi', 'thanks'])]
+        while len(words) < length:
+            words.append(rng.choice(keywords) if rng.random() < 0.3 else rng.choice(FILLER))
+        if length > 15:
+            # Long messages come as several sentences
+            for index in range(rng.randint(8, 15), len(words) - 1, rng.randint(8, 15)):
+                words[index] += '.'
+        text = ' '.join(words)
+        ending = rng.random()
+        if ending < 0.4:
+            text += '?'
+        elif ending < 0.5:
+            text += '!'
+        return text[0].upper() + text[1:], topic
+
+    def requests(self, count, offset=0):
+        """count request bodies for /api/chat; offset selects a different stretch of traffic"""
+        rng = np.random.default_rng([self.seed, offset])
+        messages = rng.choice(len(self.pool), size=count, p=self._message_weights)
+        users = rng.choice(self.users, size=count, p=self._user_weights)
+        models = rng.integers(len(self.models), size=count)
+        return [
+            {"message": self.pool[message][0], "model": self.models[model], "user_id": f"user-{user}"}
+            for message, user, model in zip(messages.tolist(), users.tolist(), models.tolist())
+        ]
+
+    def messages(self, count, offset=0):
+        """count message texts with the request mix of repeats and lengths"""
+        return [body["message"] for body in self.requests(count, offset)]
+
+    def labeled(self, count):
+        """count distinct-first (text, topic) pairs, cycling through the pool"""
+        return [self.pool[index % len(self.pool)] for index in range(count)]
+
+    @staticmethod
+    def describe(requests):
+        """Length, repeat and user spread of a list of requests"""
+        words = np.array([len(body["message"].split()) for body in requests])
+        return {
+            "requests": len(requests),
+            "distinct_messages": len({body["message"] for body in requests}),
+            "distinct_users": len({body["user_id"] for body in requests}),
+            "words_p50": float(np.percentile(words, 50)),
+            "words_p95": float(np.percentile(words, 95)),
+            "words_max": int(words.max()) if len(words) else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stats', type=int, default=10000, help='requests to summarize')
+    args = parser.parse_args()
+
+    corpus = ChatCorpus(seed=args.seed)
+    for body in corpus.requests(args.requests):
+        print(f"{body['user_id']:>10} {body['model']:>16}  {body['message'][:90]}")
+    print(ChatCorpus.describe(corpus.requests(args.stats)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Closed-loop HTTP load test for /api/chat.
+
+Runs a fixed number of client threads per concurrency level, each sending
+requests back to back over a keep-alive connection, and reports RPS,
+p50/p99 latency and how many requests were shed (429/503).
+
+Start the server first, e.g. from the backend directory:
+    BRAD_SERVER=asgi python app.py
+then:
+    python -m benchmarks.load_test --concurrency 1 8 32 128
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+MESSAGES = [
+    "hello there",
+    "how are you doing today?",
+    "explain machine learning in simple terms",
+    "write some python code that sorts a list",
+    "tell me about the weather and temperature patterns",
+    "what is the best recipe for a quick meal?",
+]
+
+
+def worker(url, deadline, results, index):
+    """Send requests until the deadline, recording (latency, status)"""
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+    path = parsed.path or '/api/chat'
+    count = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps({
+            "message": MESSAGES[count % len(MESSAGES)],
+            "model": "brad-ai-1.13.4r",
+            "user_id": f"load-{index}"
+        })
+        start = time.perf_counter()
+        try:
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+            status = 0
+        results.append((time.perf_counter() - start, status))
+        count += 1
+    conn.close()
+
+
+def run_level(url, concurrency, duration):
+    """Run one concurrency level and summarize it"""
+    results = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=worker, args=(url, deadline, results, index))
+        for index in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, status in results if status == 200])
+    statuses = [status for _, status in results]
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(latencies),
+        "shed": sum(1 for status in statuses if status in (429, 503)),
+        "errors": sum(1 for status in statuses if status not in (200, 429, 503)),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000) if len(latencies) else 0.0,
+        "p99_ms": float(np.percentile(latencies, 99) * 1000) if len(latencies) else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000/api/chat')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per level')
+    args = parser.parse_args()
+
+    print(f"{'conc':>5} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'shed':>6} {'errors':>7}")
+    for concurrency in args.concurrency:
+        row = run_level(args.url, concurrency, args.duration)
+        print(f"{row['concurrency']:>5} {row['requests']:>9} {row['rps']:>9.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['shed']:>6} {row['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
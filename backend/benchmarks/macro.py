@@ -0,0 +1,217 @@
+"""Macro benchmarks: the whole app under synthetic chat traffic.
+
+Two drivers replay ChatCorpus requests: the Flask test client in this
+process, and closed-loop HTTP clients against a real server. The test
+client mixes the traffic of a live session: mostly /api/chat, with some
+/api/chat/stream and history and profile reads for users who have
+chatted. Each request's latency is one sample, kept per endpoint. The
+HTTP driver runs --concurrency clients that each send their next request
+as soon as the previous one is answered, against a server started in a
+subprocess (the dev server, or --server asgi) or at --url.
+
+Run from the backend directory (python -m benchmarks.suite runs these
+together with the microbenchmarks and saves the results):
+    python -m benchmarks.macro
+    python -m benchmarks.macro --url http://localhost:5000 --concurrency 1 8 32
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks.corpus import ChatCorpus
+from benchmarks.results import Results, format_duration
+
+# Share of test client requests per endpoint; the rest go to /api/chat
+MIX = (('chat_stream', 0.10), ('history', 0.05), ('profile', 0.05))
+
+SERVER = r'''
+import sys
+import app
+if sys.argv[1] == 'asgi':
+    from serving.asgi import serve
+    serve(app, host='127.0.0.1', port=int(sys.argv[2]))
+else:
+    from werkzeug.serving import make_server
+    make_server('127.0.0.1', int(sys.argv[2]), app.app, threaded=True).serve_forever()
+'''
+
+
+def _report(log, name, entry, elapsed=None):
+    summary = entry["summary"]
+    rate = f"{len(entry['samples']) / elapsed:>8.1f} req/s" if elapsed else ''
+    log(f"{name:<58} p50 {format_duration(summary['median']):>8}  p95 {format_duration(summary['p95']):>8} {rate}")
+
+
+def run_test_client(results, corpus, backend, requests=2000, warmup=200, log=print):
+    """Replay a mixed session through the Flask test client"""
+    client = backend.app.test_client()
+    np.random.seed(corpus.seed)
+    for body in corpus.requests(warmup, offset=1):
+        client.post('/api/chat', json=body)
+
+    rng = np.random.default_rng([corpus.seed, 2])
+    kinds = [kind for kind, _ in MIX] + ['chat']
+    shares = [share for _, share in MIX]
+    picks = rng.choice(len(kinds), size=requests, p=shares + [1 - sum(shares)])
+    latencies = {kind: [] for kind in kinds}
+    seen_users = []
+    started = time.perf_counter()
+    for body, pick in zip(corpus.requests(requests), picks.tolist()):
+        kind = kinds[pick]
+        if kind in ('history', 'profile') and not seen_users:
+            kind = 'chat'
+        request_started = time.perf_counter()
+        if kind == 'chat':
+            response = client.post('/api/chat', json=body)
+        elif kind == 'chat_stream':
+            response = client.post('/api/chat/stream', json=body)
+        else:
+            user_id = seen_users[int(rng.integers(len(seen_users)))]
+            response = client.get(f'/api/{kind}/{user_id}')
+        response.get_data()
+        latencies[kind].append(time.perf_counter() - request_started)
+        if response.status_code != 200:
+            raise RuntimeError(f"{kind} request failed with {response.status_code}: {response.data[:200]!r}")
+        if kind.startswith('chat'):
+            seen_users.append(body["user_id"])
+    elapsed = time.perf_counter() - started
+
+    log(f"test client: {requests} requests in {elapsed:.1f}s ({requests / elapsed:.0f} req/s)")
+    for kind in ('chat', 'chat_stream', 'history', 'profile'):
+        name = f"macro.test_client.{kind}"
+        entry = results.add(name, 'macro', latencies[kind], requests=len(latencies[kind]))
+        _report(log, name, entry)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind='dev'):
+    """Run the app in a subprocess on a free port; returns (process, url)"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    port = free_port()
+    env = dict(os.environ, BRAD_WARMUP='eager', PYTHONPATH=backend_dir)
+    env.setdefault('BRAD_DATA_DIR', tempfile.mkdtemp())
+    env.setdefault('PYTHONHASHSEED', '0')
+    process = subprocess.Popen(
+        [sys.executable, '-c', SERVER, kind, str(port)],
+        cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The {kind} server exited with {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/health/ready')
+            if connection.getresponse().status == 200:
+                return process, url
+        except OSError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"The {kind} server did not become ready")
+
+
+def run_level(url, bodies, concurrency, duration):
+    """Closed-loop POSTs to /api/chat; returns (latencies, statuses, elapsed)"""
+    parsed = urlparse(url)
+    next_body = itertools.cycle(bodies).__next__
+    lock = threading.Lock()
+    latencies, statuses = [], []
+    deadline = time.perf_counter() + duration
+
+    def client():
+        connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+        mine, codes = [], []
+        while time.perf_counter() < deadline:
+            with lock:
+                body = json.dumps(next_body())
+            started = time.perf_counter()
+            try:
+                connection.request('POST', '/api/chat', body, {"Content-Type": "application/json"})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+                status = None
+            if status == 200:
+                mine.append(time.perf_counter() - started)
+            codes.append(status)
+        with lock:
+            latencies.extend(mine)
+            statuses.extend(codes)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - started
+
+
+def run_http(results, corpus, url=None, server='dev', levels=(1, 8), duration=10.0, warmup=200, log=print):
+    """Load the server at url, or a fresh one, at each concurrency level"""
+    process = None
+    if url is None:
+        process, url = start_server(server)
+    try:
+        parsed = urlparse(url)
+        connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+        for body in corpus.requests(warmup, offset=1):
+            connection.request('POST', '/api/chat', json.dumps(body), {"Content-Type": "application/json"})
+            connection.getresponse().read()
+        connection.close()
+        bodies = corpus.requests(20000)
+        for concurrency in levels:
+            latencies, statuses, elapsed = run_level(url, bodies, concurrency, duration)
+            errors = sum(1 for status in statuses if status != 200)
+            name = f"macro.http.{server if process else 'remote'}.chat[c={concurrency}]"
+            entry = results.add(name, 'macro', latencies, concurrency=concurrency,
+                                throughput=len(latencies) / elapsed, errors=errors)
+            _report(log, name, entry, elapsed)
+            if errors:
+                log(f"{'':<58} {errors} failed requests")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=2000, help='test client requests')
+    parser.add_argument('--url', help='benchmark a running server instead of starting one')
+    parser.add_argument('--server', choices=('dev', 'asgi'), default='dev')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per concurrency level')
+    args = parser.parse_args()
+
+    from benchmarks.suite import import_backend
+    results = Results(config=vars(args))
+    corpus = ChatCorpus(seed=args.seed)
+    run_test_client(results, corpus, import_backend(), args.requests)
+    run_http(results, corpus, args.url, args.server, args.concurrency, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Microbenchmarks of the chat pipeline's building blocks.
+
+Times every MLProcessor method, ModelLoader.predict_category and
+predict_categories, train_classifier at growing dataset sizes in both
+training modes, and each model's response generator, all on messages
+from the synthetic ChatCorpus. Each benchmark cycles through the same
+messages, so results are comparable between runs with the same seed.
+
+Run from the backend directory (python -m benchmarks.suite runs these
+together with the macro benchmarks and saves the results):
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter generate
+"""
+import argparse
+import itertools
+import random
+
+import numpy as np
+
+from benchmarks.corpus import ChatCorpus
+from benchmarks.results import Results, format_duration, time_calls
+from models.ml_processor import MLProcessor
+from models.model_loader import ModelLoader
+
+# Dataset sizes train_classifier is timed at
+TRAIN_SIZES = (10, 100, 1000, 10000)
+
+GENERATORS = (
+    ('standard', 'generate_standard_response'),
+    ('reasoning', 'generate_reasoning_response'),
+    ('ml_enhanced', 'generate_ml_enhanced_response'),
+    ('technical', 'generate_technical_response'),
+)
+
+
+def _cycle(items):
+    return itertools.cycle(items).__next__
+
+
+def ml_processor_benchmarks(messages, batch_size=64):
+    """(name, function) pairs for each MLProcessor method"""
+    processor = MLProcessor()
+    batches = [messages[index:index + batch_size] for index in range(0, len(messages), batch_size)]
+    benchmarks = []
+    for method in ('extract_features', 'analyze_sentiment', 'calculate_sentiment_score', 'extract_topics',
+                   'calculate_complexity', 'generate_embeddings'):
+        benchmarks.append((method, lambda call=getattr(processor, method), text=_cycle(messages): call(text())))
+    # Batch methods are reported per batch of batch_size messages
+    for method in ('extract_features_batch', 'generate_embeddings_batch'):
+        benchmarks.append((method, lambda call=getattr(processor, method), texts=_cycle(batches): call(texts())))
+    return [(f"micro.ml_processor.{name}", function) for name, function in benchmarks]
+
+
+def model_loader_benchmarks(messages, labeled, sizes=TRAIN_SIZES, batch_size=64):
+    """(name, function) pairs for prediction and for training at each size"""
+    loader = ModelLoader()
+    loader.warm_up()
+    batch = messages[:batch_size]
+    benchmarks = [
+        ("micro.model_loader.predict_category",
+         lambda text=_cycle(messages): loader.predict_category(text())),
+        ("micro.model_loader.predict_categories",
+         lambda: loader.predict_categories(batch)),
+    ]
+    for incremental in (False, True):
+        for size in sizes:
+            trainer = ModelLoader(incremental=incremental, max_samples=size)
+            for text, label in labeled[:size]:
+                trainer.training_data.append(text)
+                trainer.training_labels.append(label)
+            mode = 'hashing' if incremental else 'tfidf'
+            benchmarks.append((f"micro.model_loader.train_classifier[{mode},n={size}]", trainer.train_classifier))
+    return benchmarks
+
+
+def generator_benchmarks(messages, backend):
+    """(name, function) pairs for each generate_*_response and the Markov model"""
+    # Features and context as the chat path would pass them
+    inputs = [(message, [], backend.ml_processor.extract_features(message)) for message in messages]
+    benchmarks = []
+    for name, attribute in GENERATORS:
+        generator = getattr(backend, attribute)
+        benchmarks.append((
+            f"micro.generate.{name}",
+            lambda generator=generator, item=_cycle(inputs): ''.join(generator(*item()))
+        ))
+    markov = backend.model_registry.get('brad-ai-2.1.3c')
+    markov.ensure_loaded()
+    benchmarks.append((
+        "micro.generate.markov",
+        lambda item=_cycle(inputs): ''.join(markov.generate(*item()))
+    ))
+    benchmarks.append((
+        "micro.generate.detailed_response",
+        lambda item=_cycle(inputs): backend.get_detailed_response(item()[0])
+    ))
+    return benchmarks
+
+
+def run(results, corpus, backend=None, name_filter=None, repeat=15, min_time=0.05, sizes=TRAIN_SIZES, log=print):
+    """Time the microbenchmarks and add them to results"""
+    # Seed the generators that pick random templates and Markov states
+    random.seed(corpus.seed)
+    np.random.seed(corpus.seed)
+    messages = corpus.messages(512)
+    benchmarks = ml_processor_benchmarks(messages) + model_loader_benchmarks(
+        messages, corpus.labeled(max(sizes)), sizes)
+    if backend is not None:
+        benchmarks += generator_benchmarks(messages, backend)
+
+    for name, function in benchmarks:
+        if name_filter and name_filter not in name:
+            continue
+        samples, loops = time_calls(function, repeat=repeat, min_time=min_time)
+        entry = results.add(name, 'micro', samples, loops=loops)
+        summary = entry["summary"]
+        log(f"{name:<58} {format_duration(summary['median']):>9} "
+            f"±{summary['stdev'] / summary['median'] * 100:>5.1f}%  x{loops}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--filter', help='only benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--min-time', type=float, default=0.05, help='seconds per sample')
+    parser.add_argument('--no-generators', action='store_true', help='skip the generators, which import the app')
+    args = parser.parse_args()
+
+    backend = None
+    if not args.no_generators:
+        from benchmarks.suite import import_backend
+        backend = import_backend()
+    run(Results(config=vars(args)), ChatCorpus(seed=args.seed), backend, args.filter, args.repeat, args.min_time)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Benchmark timing, the JSON results format and run comparison.
+
+A results file records where it was measured and, per benchmark, every
+timing sample in seconds:
+
+    {
+      "format": 1,
+      "created": "2024-06-01T12:00:00",
+      "environment": {"python": "3.11.7", "cpu_count": 8, "git_commit": "...", ...},
+      "config": {"seed": 0, "quick": false, ...},
+      "benchmarks": {
+        "micro.ml_processor.extract_features": {
+          "group": "micro",
+          "unit": "s",
+          "samples": [1.2e-05, ...],
+          "summary": {"median": ..., "mean": ..., "stdev": ..., "min": ..., "p95": ...},
+          "extra": {"loops": 2048}
+        },
+        ...
+      }
+    }
+
+Microbenchmark samples are the mean time per call over a batch of loops
+sized so each sample lasts at least min_time; macro samples are the
+latencies of individual requests. Timings shift between processes (hash
+seeds, memory layout), so a run may pool the samples of several
+processes, as pyperf does. compare tests each benchmark present
+in both runs with a Mann-Whitney U test, so it needs no assumption about
+the shape of the timing distribution.
+"""
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+FORMAT = 1
+
+# Largest number of samples stored per benchmark, to bound file size
+MAX_SAMPLES = 5000
+
+
+def summarize(samples):
+    samples = np.asarray(samples, dtype=np.float64)
+    if not len(samples):
+        return {}
+    return {
+        "median": float(np.median(samples)),
+        "mean": float(samples.mean()),
+        "stdev": float(samples.std(ddof=1)) if len(samples) > 1 else 0.0,
+        "min": float(samples.min()),
+        "p95": float(np.percentile(samples, 95)),
+    }
+
+
+def _thin(samples):
+    """Evenly spaced subsample of at most MAX_SAMPLES, keeping the distribution"""
+    if len(samples) <= MAX_SAMPLES:
+        return samples
+    step = len(samples) / MAX_SAMPLES
+    return [samples[int(index * step)] for index in range(MAX_SAMPLES)]
+
+
+def time_calls(function, repeat=15, min_time=0.05, max_loops=1 << 20):
+    """Per-call seconds of function(), one sample per batch of loops.
+
+    Like timeit's autorange, the loop count doubles until one batch takes
+    min_time; that first batch doubles as warm-up. The garbage collector
+    is paused while a batch runs.
+    """
+    loops = 1
+    while True:
+        elapsed = _run_batch(function, loops)
+        if elapsed >= min_time or loops >= max_loops:
+            break
+        loops *= 2
+    samples = [_run_batch(function, loops) / loops for _ in range(repeat)]
+    return samples, loops
+
+
+def _run_batch(function, loops):
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for _ in range(loops):
+            function()
+        return time.perf_counter() - started
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    """Machine and library versions the results were measured with"""
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "git_commit": _git_commit(),
+        "argv": sys.argv,
+    }
+
+
+class Results:
+    """Benchmarks of one run, as stored in a results file"""
+
+    def __init__(self, config=None, env=None, created=None, benchmarks=None):
+        """Start an empty run, or wrap a loaded one"""
+        self.config = config or {}
+        self.environment = env if env is not None else environment()
+        self.created = created or datetime.now().isoformat(timespec='seconds')
+        self.benchmarks = benchmarks if benchmarks is not None else {}
+
+    def add(self, name, group, samples, **extra):
+        """Record the samples of one benchmark"""
+        samples = _thin([float(sample) for sample in samples])
+        self.benchmarks[name] = {
+            "group": group,
+            "unit": "s",
+            "samples": samples,
+            "summary": summarize(samples),
+            "extra": extra,
+        }
+        return self.benchmarks[name]
+
+    def extend(self, other):
+        """Append the samples of another run of the same benchmarks"""
+        for name, entry in other.benchmarks.items():
+            if name not in self.benchmarks:
+                self.benchmarks[name] = dict(entry, extra=dict(entry["extra"], processes=1))
+                continue
+            mine = self.benchmarks[name]
+            mine["samples"] = _thin(mine["samples"] + entry["samples"])
+            mine["summary"] = summarize(mine["samples"])
+            mine["extra"]["processes"] += 1
+
+    def to_dict(self):
+        return {
+            "format": FORMAT,
+            "created": self.created,
+            "environment": self.environment,
+            "config": self.config,
+            "benchmarks": self.benchmarks,
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("format") != FORMAT:
+            raise ValueError(f"{path}: unsupported results format {data.get('format')!r}")
+        return cls(data.get("config"), data.get("environment"), data.get("created"), data["benchmarks"])
+
+
+def compare(base, head, alpha=0.01, threshold=0.10, min_samples=5):
+    """Rows comparing every benchmark of two Results.
+
+    A benchmark is 'slower' when its samples in head are larger than in
+    base with p < alpha and its median grew by more than threshold, and
+    'faster' in the opposite case; small but significant shifts, which
+    runs on a busy machine produce, stay 'same'. Benchmarks in only one
+    run are 'added' or 'removed'.
+    """
+    from scipy.stats import mannwhitneyu
+
+    rows = []
+    for name in sorted(set(base.benchmarks) | set(head.benchmarks)):
+        if name not in head.benchmarks or name not in base.benchmarks:
+            rows.append({"name": name, "status": 'removed' if name not in head.benchmarks else 'added'})
+            continue
+        old = np.asarray(base.benchmarks[name]["samples"])
+        new = np.asarray(head.benchmarks[name]["samples"])
+        row = {
+            "name": name,
+            "base_median": float(np.median(old)),
+            "head_median": float(np.median(new)),
+            "ratio": float(np.median(new) / np.median(old)),
+            "p_value": None,
+            "status": 'same',
+        }
+        if min(len(old), len(new)) >= min_samples:
+            p_slower = mannwhitneyu(new, old, alternative='greater').pvalue
+            p_faster = mannwhitneyu(new, old, alternative='less').pvalue
+            if p_slower < alpha and row["ratio"] > 1 + threshold:
+                row["status"], row["p_value"] = 'slower', float(p_slower)
+            elif p_faster < alpha and row["ratio"] < 1 / (1 + threshold):
+                row["status"], row["p_value"] = 'faster', float(p_faster)
+            else:
+                row["p_value"] = float(min(p_slower, p_faster))
+        rows.append(row)
+    return rows
+
+
+def format_duration(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g}{unit}"
+    return f"{seconds / 1e-9:.3g}ns"
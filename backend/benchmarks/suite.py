@@ -0,0 +1,185 @@
+"""Benchmark suite for the whole chat pipeline, with run comparison.
+
+run times the microbenchmarks (benchmarks.micro) and the macro
+benchmarks (benchmarks.macro) on traffic from the seeded ChatCorpus and
+writes every sample to a JSON results file (format in
+benchmarks.results). compare reads two results files and flags the
+benchmarks that got significantly slower or faster; it exits with
+status 1 if any got slower, so it can gate a CI job.
+
+The micro and test client groups run in --processes fresh worker
+processes whose samples are pooled, each with its own fixed hash seed,
+so that compare sees how much timings vary between processes and two
+runs cover the same set of processes. Workers import the app with eager
+warm-up and a temporary data directory, so no model artifact or saved
+session from an earlier run changes what is measured. Compare runs made
+on the same otherwise idle machine.
+
+Run from the backend directory:
+    python -m benchmarks.suite run --output base.json
+    python -m benchmarks.suite run --quick --only micro --output head.json
+    python -m benchmarks.suite compare base.json head.json
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import macro, micro
+from benchmarks.corpus import ChatCorpus
+from benchmarks.results import Results, compare, format_duration
+
+
+def import_backend():
+    """Import the app with eager warm-up and a throwaway data directory"""
+    os.environ.setdefault('BRAD_WARMUP', 'eager')
+    os.environ.setdefault('BRAD_DATA_DIR', tempfile.mkdtemp(prefix='brad-bench-'))
+    # Startup, retraining and request logs would drown the report
+    logging.disable(logging.INFO)
+    import app as backend
+    return backend
+
+
+def run_in_process(args, results, corpus):
+    """The micro and test client groups, in this process"""
+    backend = import_backend()
+    if 'micro' in args.groups:
+        micro.run(results, corpus, backend, args.filter, args.repeat, args.min_time,
+                  sizes=micro.TRAIN_SIZES[:-1] if args.quick else micro.TRAIN_SIZES)
+    if 'macro' in args.groups:
+        macro.run_test_client(results, corpus, backend, args.requests)
+
+
+def run_workers(args, results):
+    """Run the in-process groups in fresh worker processes and pool their samples"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    options = ['--seed', args.seed, '--repeat', args.repeat, '--min-time', args.min_time,
+               '--requests', args.requests] + (['--filter', args.filter] if args.filter else [])
+    for index in range(args.processes):
+        print(f"process {index + 1}/{args.processes}")
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            # A fixed hash seed per worker: runs differ in code, not in dict layouts
+            env = dict(os.environ, PYTHONHASHSEED=str(index), PYTHONPATH=backend_dir)
+            subprocess.run(
+                [sys.executable, '-m', 'benchmarks.suite', 'run', '--worker', '--output', output.name,
+                 '--only', ','.join(sorted(args.groups & {'micro', 'macro'})), '--quick' if args.quick else '--full',
+                 *map(str, options)],
+                cwd=backend_dir, env=env, check=True
+            )
+            results.extend(Results.load(output.name))
+
+
+def run(args):
+    args.groups = set(args.only.split(',')) if args.only else {'micro', 'macro', 'http'}
+    results = Results(config={
+        "seed": args.seed,
+        "quick": args.quick,
+        "groups": sorted(args.groups),
+        "filter": args.filter,
+        "processes": args.processes,
+        "repeat": args.repeat,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "server": args.server,
+        "url": args.url,
+    })
+    corpus = ChatCorpus(seed=args.seed)
+    if args.worker:
+        run_in_process(args, results, corpus)
+        results.save(args.output)
+        return 0
+
+    print(f"corpus: {ChatCorpus.describe(corpus.requests(args.requests))}")
+    if args.groups & {'micro', 'macro'}:
+        run_workers(args, results)
+    if 'http' in args.groups:
+        macro.run_http(results, corpus, args.url, args.server, args.concurrency, args.duration)
+
+    if args.output:
+        results.save(args.output)
+        print(f"wrote {len(results.benchmarks)} benchmarks to {args.output}")
+    return 0
+
+
+def compare_command(args):
+    base, head = Results.load(args.base), Results.load(args.head)
+    for label, results in (('base', base), ('head', head)):
+        env = results.environment
+        print(f"{label}: {results.created} commit {env.get('git_commit')} "
+              f"python {env.get('python')} {env.get('cpu_count')} CPUs")
+    if base.environment.get('platform') != head.environment.get('platform') or \
+            base.environment.get('cpu_count') != head.environment.get('cpu_count'):
+        print("warning: the runs were measured on different machines")
+
+    rows = compare(base, head, alpha=args.alpha, threshold=args.threshold)
+    print(f"{'benchmark':<58} {'base':>9} {'head':>9} {'change':>8} {'p':>8}  status")
+    for row in rows:
+        if 'ratio' not in row:
+            print(f"{row['name']:<58} {'':>9} {'':>9} {'':>8} {'':>8}  {row['status']}")
+            continue
+        if args.changed and row["status"] == 'same':
+            continue
+        p_value = f"{row['p_value']:.1e}" if row["p_value"] is not None else '-'
+        print(f"{row['name']:<58} {format_duration(row['base_median']):>9} "
+              f"{format_duration(row['head_median']):>9} {(row['ratio'] - 1) * 100:>+7.1f}% "
+              f"{p_value:>8}  {row['status']}")
+
+    slower = [row["name"] for row in rows if row["status"] == 'slower']
+    faster = [row["name"] for row in rows if row["status"] == 'faster']
+    print(f"{len(slower)} slower, {len(faster)} faster "
+          f"(Mann-Whitney U, p < {args.alpha}, median change > {args.threshold:.0%})")
+    return 1 if slower else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks and save the results')
+    run_parser.add_argument('--output', '-o', help='results file to write')
+    run_parser.add_argument('--only', help='comma-separated groups: micro, macro (test client), http')
+    run_parser.add_argument('--filter', help='only microbenchmarks whose name contains this')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--quick', action='store_true', help='fewer samples and shorter runs')
+    run_parser.add_argument('--full', dest='quick', action='store_false', help=argparse.SUPPRESS)
+    run_parser.add_argument('--processes', type=int,
+                            help='worker processes for the micro and test client groups (default 3, quick 1)')
+    run_parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    run_parser.add_argument('--repeat', type=int, help='samples per microbenchmark and process (default 10, quick 7)')
+    run_parser.add_argument('--min-time', type=float, help='seconds per microbenchmark sample')
+    run_parser.add_argument('--requests', type=int, help='test client requests per process (default 2000, quick 500)')
+    run_parser.add_argument('--url', help='load a running server instead of starting one')
+    run_parser.add_argument('--server', choices=('dev', 'asgi'), default='dev', help='server to start')
+    run_parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    run_parser.add_argument('--duration', type=float, help='seconds per HTTP concurrency level')
+
+    compare_parser = commands.add_parser('compare', help='flag significant changes between two results files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('head')
+    compare_parser.add_argument('--alpha', type=float, default=0.01, help='significance level')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='smallest relative change of the median to report')
+    compare_parser.add_argument('--changed', action='store_true', help='only print changed benchmarks')
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        sys.exit(compare_command(args))
+
+    defaults = {
+        "processes": (3, 1),
+        "repeat": (10, 7),
+        "min_time": (0.05, 0.02),
+        "requests": (2000, 500),
+        "duration": (10.0, 3.0),
+    }
+    for option, (full, quick) in defaults.items():
+        if getattr(args, option) is None:
+            setattr(args, option, quick if args.quick else full)
+    sys.exit(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'markov_corpus.txt')
+
+# Words and sentence punctuation, as produced and consumed by MarkovBackend
+MARKOV_TOKEN_PATTERN = re.compile(r"[\w'-]+|[.!?,;:]")
+
+# Sentinel and wrapper used to pass stream end and errors between threads
+_END = object()
+
+
+class _Failure:
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class ModelOverloaded(Exception):
+    """Raised when a model's request queue is full"""
+
+    status_code = 503
+
+
+class ModelBackend:
+    """A response generator bound to one model id.
+
+    Requests run on the backend's own bounded worker pool of
+    max_concurrency threads with at most max_queue requests waiting, so a
+    slow or busy model cannot take over the threads serving the others.
+    Backends start cold and load on first use; the registry may unload an
+    idle warm backend again to stay within its memory budget. Subclasses
+    implement generate and, when they hold state, _load/_unload.
+    """
+
+    cacheable = True
+
+    def __init__(self, model_id, max_concurrency=4, max_queue=64, latency_window=1024):
+        """Initialize a cold backend and its worker pool"""
+        self.model_id = model_id
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.registry = None
+        self.state = 'cold'
+        self.memory_bytes = 0
+        self.load_seconds = None
+        self.loads = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f'model-{model_id}')
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self.requests = 0
+        self.rejected = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=latency_window)
+
+    def _load(self):
+        """Build the model; returns its approximate size in bytes"""
+        return 0
+
+    def _unload(self):
+        """Release the model"""
+
+    def generate(self, message, context, ml_features):
+        """Yield response chunks"""
+        raise NotImplementedError
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self._queued + self._active > 0
+
+    def ensure_loaded(self):
+        """Load the model if it is cold"""
+        with self._load_lock:
+            if self.state == 'warm':
+                return
+            self.state = 'loading'
+            started = time.perf_counter()
+            try:
+                self.memory_bytes = self._load()
+            except Exception:
+                self.state = 'cold'
+                raise
+            self.load_seconds = time.perf_counter() - started
+            self.loads += 1
+            self.state = 'warm'
+            logger.info(f"Loaded model {self.model_id} in {self.load_seconds * 1000:.1f}ms")
+
+    def unload(self):
+        """Unload the model unless requests are using it; returns True if unloaded"""
+        with self._load_lock:
+            if self.state != 'warm' or self.busy:
+                return False
+            self._unload()
+            self.state = 'cold'
+            self.memory_bytes = 0
+            logger.info(f"Unloaded model {self.model_id}")
+            return True
+
+    def stream(self, message, context, ml_features):
+        """Run generate on the worker pool, yielding chunks as they are produced"""
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise ModelOverloaded(f"Model {self.model_id} is overloaded, try again later")
+            self._queued += 1
+            self.requests += 1
+
+        chunks = queue.Queue()
+        submitted = time.perf_counter()
+
+        def work():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            try:
+                self.ensure_loaded()
+                if self.registry is not None:
+                    self.registry.touch(self)
+                for chunk in self.generate(message, context, ml_features):
+                    chunks.put(chunk)
+                chunks.put(_END)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                chunks.put(_Failure(e))
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._latencies.append(time.perf_counter() - submitted)
+
+        self._executor.submit(work)
+        while True:
+            chunk = chunks.get()
+            if chunk is _END:
+                return
+            if isinstance(chunk, _Failure):
+                raise chunk.error
+            yield chunk
+
+    def run_batch(self, requests):
+        """Generate many responses as a single worker pool task.
+
+        requests is a list of (message, context, ml_features) tuples. Returns
+        a Future for a list holding, per request, the response text or the
+        exception its generation raised.
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self.rejected += 1
+                raise ModelOverloaded(f"Model {self.model_id} is overloaded, try again later")
+            self._queued += 1
+            self.requests += len(requests)
+
+        submitted = time.perf_counter()
+
+        def work():
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            try:
+                self.ensure_loaded()
+                if self.registry is not None:
+                    self.registry.touch(self)
+                results = []
+                for message, context, ml_features in requests:
+                    try:
+                        results.append(''.join(self.generate(message, context, ml_features)))
+                    except Exception as e:
+                        with self._lock:
+                            self.errors += 1
+                        results.append(e)
+                    with self._lock:
+                        self._latencies.append(time.perf_counter() - submitted)
+                return results
+            finally:
+                with self._lock:
+                    self._active -= 1
+
+        return self._executor.submit(work)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Report load state, queue depth and measured latency"""
+        with self._lock:
+            latencies = np.array(self._latencies)
+            queued, active = self._queued, self._active
+            requests, rejected, errors = self.requests, self.rejected, self.errors
+        return {
+            "state": self.state,
+            "memory_bytes": self.memory_bytes,
+            "load_ms": self.load_seconds * 1000 if self.load_seconds is not None else None,
+            "loads": self.loads,
+            "max_concurrency": self.max_concurrency,
+            "active": active,
+            "queue_depth": queued,
+            "requests": requests,
+            "rejected": rejected,
+            "errors": errors,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50) * 1000) if len(latencies) else None,
+                "p95": float(np.percentile(latencies, 95) * 1000) if len(latencies) else None,
+                "samples": len(latencies)
+            }
+        }
+
+
+class TemplateBackend(ModelBackend):
+    """Backend around a stateless generator function"""
+
+    def __init__(self, model_id, generator, **kwargs):
+        super().__init__(model_id, **kwargs)
+        self.generator = generator
+        self.cacheable = getattr(generator, 'cacheable', True)
+
+    def generate(self, message, context, ml_features):
+        return self.generator(message, context, ml_features)
+
+
+class MarkovBackend(ModelBackend):
+    """Word-level Markov chain generator trained from a local text corpus.
+
+    Each state of order words maps to the words that followed it in the
+    corpus. A reply opens with a generated sentence, starting from a state
+    that begins with a word of the message when there is one, and continues
+    with the chunks yielded by respond(message).
+    """
+
+    cacheable = False
+
+    def __init__(self, model_id, respond, corpus_path=DEFAULT_CORPUS_PATH, order=2, max_words=40, **kwargs):
+        super().__init__(model_id, **kwargs)
+        self.respond = respond
+        self.corpus_path = corpus_path
+        self.order = order
+        self.max_words = max_words
+        self._chain = None
+
+    def _load(self):
+        with open(self.corpus_path, 'r', encoding='utf-8') as f:
+            tokens = MARKOV_TOKEN_PATTERN.findall(f.read())
+
+        transitions = defaultdict(list)
+        starts = []
+        by_word = defaultdict(list)
+        for index in range(len(tokens) - self.order):
+            state = tuple(tokens[index:index + self.order])
+            transitions[state].append(tokens[index + self.order])
+            if index == 0 or tokens[index - 1] in '.!?':
+                starts.append(state)
+            if state[0][0].isalnum():
+                by_word[state[0].lower()].append(state)
+
+        transitions = {state: tuple(words) for state, words in transitions.items()}
+        self._chain = (transitions, starts, dict(by_word))
+        return sum(
+            sys.getsizeof(state) + sys.getsizeof(words) for state, words in transitions.items()
+        ) + sys.getsizeof(transitions) + sys.getsizeof(starts)
+
+    def _unload(self):
+        self._chain = None
+
+    def sentence(self, seed_words=(), rng=random):
+        """Generate one sentence, starting near a seed word if possible"""
+        transitions, starts, by_word = self._chain
+        # Longer words tend to carry the topic, so try them first
+        candidates = next(
+            (by_word[word] for word in sorted(seed_words, key=len, reverse=True) if word in by_word),
+            starts
+        )
+        state = rng.choice(candidates)
+        words = list(state)
+        while len(words) < self.max_words and words[-1] not in '.!?':
+            followers = transitions.get(tuple(words[-self.order:]))
+            if not followers:
+                break
+            words.append(rng.choice(followers))
+
+        text = ' '.join(words)
+        text = re.sub(r" ([.!?,;:])", r"\1", text)
+        return text[0].upper() + text[1:]
+
+    def generate(self, message, context, ml_features):
+        seed_words = [word.lower() for word in MARKOV_TOKEN_PATTERN.findall(message) if len(word) > 3]
+        yield self.sentence(seed_words) + "\n\n"
+        yield from self.respond(message)
+
+
+class ModelRegistry:
+    """Model id to backend map with an LRU memory budget.
+
+    Warm backends are kept in least-recently-used order. After a backend
+    is used, idle backends are unloaded, least recently used first, until
+    the memory of the warm ones fits within memory_budget bytes.
+    """
+
+    def __init__(self, memory_budget=None):
+        """Initialize an empty registry"""
+        self.memory_budget = memory_budget
+        self._backends = {}
+        self._warm = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def register(self, backend):
+        backend.registry = self
+        self._backends[backend.model_id] = backend
+        return backend
+
+    def __contains__(self, model_id):
+        return model_id in self._backends
+
+    def get(self, model_id):
+        return self._backends[model_id]
+
+    def touch(self, backend):
+        """Mark backend as most recently used and enforce the memory budget"""
+        with self._lock:
+            self._warm[backend.model_id] = backend
+            self._warm.move_to_end(backend.model_id)
+            if self.memory_budget is None:
+                return
+            for candidate in list(self._warm.values()):
+                if sum(warm.memory_bytes for warm in self._warm.values()) <= self.memory_budget:
+                    break
+                if candidate is backend:
+                    continue
+                if candidate.unload():
+                    del self._warm[candidate.model_id]
+                    self.evictions += 1
+                elif candidate.state != 'warm':
+                    del self._warm[candidate.model_id]
+
+    def memory_bytes(self):
+        return sum(backend.memory_bytes for backend in self._backends.values())
+
+    def close(self):
+        for backend in self._backends.values():
+            backend.close()
+
+    def stats(self):
+        """Report per-model stats and memory use"""
+        return {
+            "memory_bytes": self.memory_bytes(),
+            "memory_budget": self.memory_budget,
+            "evictions": self.evictions,
+            "models": {model_id: backend.stats() for model_id, backend in self._backends.items()}
+        }
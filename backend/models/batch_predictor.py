@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class BatchPredictor:
+    """Micro-batching front end for ModelLoader.predict_categories.
+
+    Callers submit single texts and get a Future. A worker thread gathers
+    queued texts into a batch of at most max_batch items, waiting at most
+    max_wait_ms after the first one, and classifies the whole batch with one
+    transform/predict call. When every caller currently waiting is already
+    in the batch there is nothing left to wait for, so the batch is sent
+    straight away and a lone caller pays no batching delay.
+    """
+
+    def __init__(self, model_loader, max_batch=64, max_wait_ms=2.0):
+        """Start the batching worker for model_loader"""
+        self.model_loader = model_loader
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+        self.batches = 0
+        self.items = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+        self._worker = threading.Thread(target=self._run, name='batch-predictor', daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """Queue a text for classification and return a Future for its category"""
+        future = Future()
+        with self._lock:
+            self._waiting += 1
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def predict(self, text, timeout=None):
+        """Classify a single text through the batching queue"""
+        return self.submit(text).result(timeout)
+
+    def close(self):
+        """Stop the worker once queued requests are served"""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, first):
+        """Gather a batch starting with first; returns (batch, stop)"""
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    everyone_here = self._waiting <= len(batch)
+                remaining = deadline - time.perf_counter()
+                if everyone_here or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            self._process(batch)
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        texts = [text for text, _, _ in batch]
+        try:
+            categories = self.model_loader.predict_categories(texts)
+        except Exception as e:
+            logger.error(f"Batch prediction failed: {str(e)}")
+            categories = None
+            error = e
+
+        with self._lock:
+            self._waiting -= len(batch)
+            self.batches += 1
+            self.items += len(batch)
+            for _, _, enqueued in batch:
+                wait = started - enqueued
+                self.queue_wait_total += wait
+                self.queue_wait_max = max(self.queue_wait_max, wait)
+            bucket = next(
+                (index for index, bound in enumerate(BATCH_SIZE_BUCKETS) if len(batch) <= bound),
+                len(BATCH_SIZE_BUCKETS)
+            )
+            self.batch_size_counts[bucket] += 1
+
+        for index, (_, future, _) in enumerate(batch):
+            if categories is None:
+                future.set_exception(error)
+            else:
+                future.set_result(categories[index])
+
+    def stats(self):
+        """Report batch-size and queue-wait metrics"""
+        with self._lock:
+            labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "queued": self._queue.qsize(),
+                "avg_batch_size": self.items / self.batches if self.batches else 0,
+                "batch_size_histogram": dict(zip(labels, self.batch_size_counts)),
+                "avg_queue_wait_ms": 1000 * self.queue_wait_total / self.items if self.items else 0,
+                "max_queue_wait_ms": 1000 * self.queue_wait_max
+            }
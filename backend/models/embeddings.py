@@ -0,0 +1,86 @@
+import re
+import zlib
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# Longer words are hashed on every occurrence rather than memoized, so a
+# client sending long unique words cannot grow the cache by their size
+MAX_CACHED_WORD_LENGTH = 32
+
+
+class HashedNgramEmbedder:
+    """Feature-hashing text embedder over words and character n-grams.
+
+    Every word contributes itself and the character n-grams of "<word>",
+    each hashed with CRC32 into one of dim buckets with a sign taken from
+    the hash, so unrelated features tend to cancel out. Vectors are L2
+    normalized float32, so a dot product is the cosine similarity. CRC32 is
+    stable across processes, unlike hash(), so embeddings can be persisted
+    or computed in worker processes. Bucket indices and signs of words up to
+    MAX_CACHED_WORD_LENGTH characters are memoized.
+    """
+
+    def __init__(self, dim=256, ngram_sizes=(3, 4), cache_size=100000):
+        """Initialize the embedder"""
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self.cache_size = cache_size
+        self._word_cache = {}
+
+    def _word_features(self, word):
+        """Bucket indices and signs for a word, memoized"""
+        features = self._word_cache.get(word)
+        if features is not None:
+            return features
+
+        marked = f"<{word}>"
+        grams = [word]
+        for size in self.ngram_sizes:
+            grams.extend(marked[i:i + size] for i in range(len(marked) - size + 1))
+
+        hashes = np.fromiter(
+            (zlib.crc32(gram.encode('utf-8')) for gram in grams),
+            dtype=np.uint32, count=len(grams)
+        )
+        # The narrowest types that hold them; embed_batch widens on concatenation
+        indices = (hashes % self.dim).astype(np.int32)
+        signs = np.where(hashes & 0x80000000, 1, -1).astype(np.int8)
+        features = (indices, signs)
+
+        if len(word) > MAX_CACHED_WORD_LENGTH:
+            return features
+        if len(self._word_cache) >= self.cache_size:
+            self._word_cache.clear()
+        self._word_cache[word] = features
+        return features
+
+    def embed_batch(self, texts):
+        """Embed many texts as an (N, dim) float32 matrix"""
+        texts = list(texts)
+        rows, indices, signs = [], [], []
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                word_indices, word_signs = self._word_features(word)
+                rows.append(np.full(len(word_indices), row * self.dim, dtype=np.int64))
+                indices.append(word_indices)
+                signs.append(word_signs)
+
+        if not indices:
+            return np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        flat = np.concatenate(rows) + np.concatenate(indices)
+        matrix = np.bincount(
+            flat, weights=np.concatenate(signs), minlength=len(texts) * self.dim
+        ).reshape(len(texts), self.dim)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix.astype(np.float32)
+
+    def embed(self, text):
+        """Embed one text as a float32 vector"""
+        return self.embed_batch([text])[0]
@@ -0,0 +1,324 @@
+import re
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\b\w+\b')
+
+# Longer tokens are analyzed on every occurrence rather than memoized, so
+# a client sending long unique tokens cannot grow the cache by their size
+MAX_CACHED_TOKEN_LENGTH = 32
+
+
+class FeatureExtractor:
+    """Single-pass feature extraction engine.
+
+    The text is split on whitespace exactly once. Everything that the
+    feature dict needs from a token (length, lowercase form, sentiment
+    contribution, topic hits, punctuation) is computed the first time the
+    token is seen and memoized, so repeated words cost a dict lookup. Only
+    tokens up to MAX_CACHED_TOKEN_LENGTH characters are memoized.
+    """
+
+    def __init__(self, sentiment_lexicon, topic_keywords, long_word_length=6,
+                 max_topics=3, cache_size=65536):
+        """Compile lexicon and topic keywords into lookup structures"""
+        self.sentiment_lexicon = dict(sentiment_lexicon)
+        self.topics = list(topic_keywords.keys())
+        self.long_word_length = long_word_length
+        self.max_topics = max_topics
+        self.cache_size = cache_size
+        self._token_cache = {}
+
+        # Keyword -> bitmask of topics. A keyword also inherits the topics of
+        # every keyword it contains, so one match per position is enough.
+        keyword_masks = {}
+        for index, keywords in enumerate(topic_keywords.values()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                keyword_masks[keyword] = keyword_masks.get(keyword, 0) | (1 << index)
+
+        self._keyword_masks = {}
+        for keyword in keyword_masks:
+            mask = 0
+            for other, other_mask in keyword_masks.items():
+                if other in keyword:
+                    mask |= other_mask
+            self._keyword_masks[keyword] = mask
+
+        # Longest-first alternation inside a lookahead finds a match at every
+        # position, including overlapping ones.
+        alternation = '|'.join(
+            re.escape(keyword)
+            for keyword in sorted(self._keyword_masks, key=len, reverse=True)
+        )
+        self._topic_pattern = re.compile(f'(?=({alternation}))') if alternation else None
+
+    def _analyze_token(self, token):
+        """Compute and memoize the per-token statistics"""
+        lower = token.lower()
+        if lower == token:
+            # Keep one string rather than an equal copy
+            lower = token
+        score = 0
+        matches = 0
+        mask = 0
+        for word in WORD_PATTERN.findall(lower):
+            value = self.sentiment_lexicon.get(word)
+            if value is not None:
+                score += value
+                matches += 1
+        if self._topic_pattern is not None:
+            for keyword in self._topic_pattern.findall(lower):
+                mask |= self._keyword_masks[keyword]
+
+        stats = (
+            len(token),
+            lower,
+            score,
+            matches,
+            mask,
+            token.count('.'),
+            token.count('!'),
+            token.count('?'),
+        )
+
+        if len(token) > MAX_CACHED_TOKEN_LENGTH:
+            return stats
+        if len(self._token_cache) >= self.cache_size:
+            self._token_cache.clear()
+        self._token_cache[token] = stats
+        return stats
+
+    def topics_from_mask(self, mask):
+        """Convert a topic bitmask to a list of topic names"""
+        topics = []
+        for index, topic in enumerate(self.topics):
+            if mask & (1 << index):
+                topics.append(topic)
+                if len(topics) == self.max_topics:
+                    break
+        return topics
+
+    def extract(self, text):
+        """Extract the full feature dict from text"""
+        cache = self._token_cache
+        words = text.split()
+
+        total_length = 0
+        long_words = 0
+        score = 0
+        matches = 0
+        mask = 0
+        periods = 0
+        exclamations = 0
+        questions = 0
+        lowered = set()
+
+        for word in words:
+            stats = cache.get(word)
+            if stats is None:
+                stats = self._analyze_token(word)
+            length, lower, word_score, word_matches, word_mask, p, e, q = stats
+            total_length += length
+            if length > self.long_word_length:
+                long_words += 1
+            if word_matches:
+                score += word_score
+                matches += word_matches
+            mask |= word_mask
+            periods += p
+            exclamations += e
+            questions += q
+            lowered.add(lower)
+
+        word_count = len(words)
+
+        sentiment_score = score / (matches * 3) if matches > 0 else 0
+        if sentiment_score > 0.1:
+            sentiment = 'positive'
+        elif sentiment_score < -0.1:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+
+        if word_count:
+            sentence_count = (periods + exclamations + questions) or 1
+            complexity = (word_count / sentence_count) * 0.3 + (long_words / word_count) * 0.7
+            complexity = min(complexity, 1.0)
+            avg_word_length = total_length / word_count
+        else:
+            complexity = 0
+            avg_word_length = 0
+
+        return {
+            'length': len(text),
+            'word_count': word_count,
+            'sentiment': sentiment,
+            'sentiment_score': sentiment_score,
+            'topics': self.topics_from_mask(mask),
+            'complexity': complexity,
+            'has_question': questions > 0,
+            'has_exclamation': exclamations > 0,
+            'unique_words': len(lowered),
+            'avg_word_length': avg_word_length
+        }
+
+    def extract_batch(self, texts):
+        """Extract features for many texts at once as a FeatureBatch"""
+        # Deferred so that importing the module does not pay for scipy
+        from scipy import sparse
+
+        texts = list(texts)
+        cache = self._token_cache
+        vocabulary = {}
+        vocab_stats = []
+        token_ids = []
+        doc_lengths = np.empty(len(texts), dtype=np.int64)
+
+        # Map every whitespace token to a batch-local vocabulary id
+        for doc, text in enumerate(texts):
+            words = text.split()
+            doc_lengths[doc] = len(words)
+            for word in words:
+                token_id = vocabulary.get(word)
+                if token_id is None:
+                    stats = cache.get(word)
+                    if stats is None:
+                        stats = self._analyze_token(word)
+                    token_id = len(vocab_stats)
+                    vocabulary[word] = token_id
+                    vocab_stats.append(stats)
+                token_ids.append(token_id)
+
+        n_docs = len(texts)
+        n_vocab = len(vocab_stats)
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        doc_index = np.repeat(np.arange(n_docs), doc_lengths)
+
+        # Sparse document x token count matrix
+        counts = sparse.csr_matrix(
+            (np.ones(len(token_ids)), (doc_index, token_ids)),
+            shape=(n_docs, n_vocab)
+        )
+
+        # Per-token lexicon columns: length, long word, sentiment score,
+        # sentiment matches, periods, exclamations, questions
+        columns = np.zeros((n_vocab, 7))
+        lower_ids = np.empty(n_vocab, dtype=np.int64)
+        topic_matrix = np.zeros((n_vocab, len(self.topics)))
+        lower_vocabulary = {}
+        for token_id, stats in enumerate(vocab_stats):
+            length, lower, score, matches, mask, periods, exclamations, questions = stats
+            columns[token_id] = (
+                length, length > self.long_word_length, score, matches,
+                periods, exclamations, questions
+            )
+            lower_ids[token_id] = lower_vocabulary.setdefault(lower, len(lower_vocabulary))
+            for index in range(len(self.topics)):
+                if mask & (1 << index):
+                    topic_matrix[token_id, index] = 1
+
+        totals = counts @ columns
+        total_length, long_words, score, matches, periods, exclamations, questions = totals.T
+        topic_flags = (counts @ topic_matrix) > 0
+
+        lower_counts = sparse.csr_matrix(
+            (np.ones(len(token_ids)), (doc_index, lower_ids[token_ids])),
+            shape=(n_docs, len(lower_vocabulary))
+        )
+        lower_counts.sum_duplicates()
+        unique_words = np.diff(lower_counts.indptr)
+
+        word_count = doc_lengths.astype(np.float64)
+        has_words = doc_lengths > 0
+        has_matches = matches > 0
+
+        sentiment_score = np.zeros(n_docs)
+        np.divide(score, matches * 3, out=sentiment_score, where=has_matches)
+
+        sentence_count = periods + exclamations + questions
+        sentence_count[sentence_count == 0] = 1
+        complexity = np.zeros(n_docs)
+        np.divide(word_count, sentence_count, out=complexity, where=has_words)
+        long_ratio = np.zeros(n_docs)
+        np.divide(long_words, word_count, out=long_ratio, where=has_words)
+        complexity = np.minimum(complexity * 0.3 + long_ratio * 0.7, 1.0)
+
+        avg_word_length = np.zeros(n_docs)
+        np.divide(total_length, word_count, out=avg_word_length, where=has_words)
+
+        return FeatureBatch(
+            topic_names=self.topics,
+            max_topics=self.max_topics,
+            length=np.fromiter((len(text) for text in texts), dtype=np.int64, count=n_docs),
+            word_count=doc_lengths,
+            sentiment_score=sentiment_score,
+            sentiment_matches=matches.astype(np.int64),
+            topic_flags=topic_flags,
+            complexity=complexity,
+            has_question=questions > 0,
+            has_exclamation=exclamations > 0,
+            unique_words=unique_words.astype(np.int64),
+            avg_word_length=avg_word_length
+        )
+
+
+class FeatureBatch:
+    """Columnar features for a batch of texts.
+
+    Every column is a NumPy array with one entry per text; topic_flags is an
+    (N, topics) boolean matrix in topic declaration order. row(i) rebuilds
+    the dict that FeatureExtractor.extract returns for the same text.
+    """
+
+    SENTIMENT_LABELS = np.array(['negative', 'neutral', 'positive'])
+
+    def __init__(self, topic_names, max_topics, **columns):
+        """Store the feature columns"""
+        self.topic_names = list(topic_names)
+        self.max_topics = max_topics
+        self.length = columns['length']
+        self.word_count = columns['word_count']
+        self.sentiment_score = columns['sentiment_score']
+        self.sentiment_matches = columns['sentiment_matches']
+        self.topic_flags = columns['topic_flags']
+        self.complexity = columns['complexity']
+        self.has_question = columns['has_question']
+        self.has_exclamation = columns['has_exclamation']
+        self.unique_words = columns['unique_words']
+        self.avg_word_length = columns['avg_word_length']
+
+        sentiment_index = np.ones(len(self.length), dtype=np.int64)
+        sentiment_index[self.sentiment_score > 0.1] = 2
+        sentiment_index[self.sentiment_score < -0.1] = 0
+        self.sentiment = self.SENTIMENT_LABELS[sentiment_index]
+
+    def __len__(self):
+        return len(self.length)
+
+    def topics(self, index):
+        """Topic names for one text, limited like the per-message path"""
+        names = [name for name, flag in zip(self.topic_names, self.topic_flags[index]) if flag]
+        return names[:self.max_topics]
+
+    def row(self, index):
+        """Feature dict for one text"""
+        has_words = self.word_count[index] > 0
+        return {
+            'length': int(self.length[index]),
+            'word_count': int(self.word_count[index]),
+            'sentiment': str(self.sentiment[index]),
+            'sentiment_score': float(self.sentiment_score[index]) if self.sentiment_matches[index] else 0,
+            'topics': self.topics(index),
+            'complexity': float(self.complexity[index]) if has_words else 0,
+            'has_question': bool(self.has_question[index]),
+            'has_exclamation': bool(self.has_exclamation[index]),
+            'unique_words': int(self.unique_words[index]),
+            'avg_word_length': float(self.avg_word_length[index]) if has_words else 0
+        }
+
+    def to_dicts(self):
+        """Feature dicts for every text in the batch"""
+        return [self.row(index) for index in range(len(self))]
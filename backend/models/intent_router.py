@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_rules.json')
+
+WORD_PATTERN = re.compile(r'\w+')
+
+PLACEHOLDER_PATTERN = re.compile(r'\{(message|topic)\}')
+
+# Maps every ASCII byte that is not a word character (\w) to a space
+_ASCII_WORD_TABLE = bytes(
+    c if (chr(c).isalnum() and c < 128) or c == ord('_') else ord(' ')
+    for c in range(256)
+)
+
+
+class IntentRule:
+    """A named intent with trigger patterns and a response template"""
+
+    __slots__ = ('intent', 'patterns', 'response', 'strip_patterns', 'priority')
+
+    def __init__(self, intent, patterns, response, strip_patterns=False, priority=0):
+        self.intent = intent
+        self.patterns = [pattern.lower() for pattern in patterns]
+        self.response = response
+        self.strip_patterns = strip_patterns
+        self.priority = priority
+
+    def render(self, message):
+        """Fill the {message} and {topic} placeholders of the response.
+
+        Both are substituted in one pass over the template, so placeholder
+        text inside the user's message is left as typed.
+        """
+        def fill(match):
+            if match.group(1) == 'message':
+                return message
+            topic = message
+            if self.strip_patterns:
+                for pattern in self.patterns:
+                    topic = topic.replace(pattern, '')
+            return topic.strip().capitalize()
+
+        return PLACEHOLDER_PATTERN.sub(fill, self.response)
+
+
+class IntentRouter:
+    """Word-boundary-aware intent matcher compiled from a rule table.
+
+    Rules are checked in table order and the first rule with any pattern
+    present as whole words wins, so 'hi' no longer matches "this". All
+    patterns are compiled into one word index: the message is lowercased
+    and split into words once, and a single set intersection finds every
+    candidate rule regardless of how many rules there are. Multi-word
+    patterns are indexed by their words and confirmed with a
+    boundary-anchored regex only when all of their words are present.
+    """
+
+    def __init__(self, rules, fallback):
+        """Compile the rule table"""
+        self.rules = [
+            IntentRule(priority=index, **rule) if isinstance(rule, dict) else rule
+            for index, rule in enumerate(rules)
+        ]
+        self.fallback = IntentRule(patterns=(), **fallback) if isinstance(fallback, dict) else fallback
+
+        # word -> best (lowest) rule priority for single-word patterns
+        self._words = {}
+        # [(priority, words, regex)] for multi-word patterns, by priority
+        self._phrases = []
+        for rule in self.rules:
+            for pattern in rule.patterns:
+                words = pattern.split()
+                if len(words) == 1:
+                    self._words.setdefault(words[0], rule.priority)
+                else:
+                    # Starting with the literal first word lets the regex
+                    # engine skip ahead with a fast prefix search; the leading
+                    # word boundary is checked by a lookbehind after it.
+                    regex = re.compile(
+                        re.escape(words[0]) + f'(?<!\\w.{{{len(words[0])}}})' +
+                        ''.join(r'\s+' + re.escape(word) for word in words[1:]) + r'\b',
+                        re.DOTALL
+                    )
+                    self._phrases.append((rule.priority, frozenset(words), regex))
+        self._phrases.sort(key=lambda phrase: phrase[0])
+
+        self._vocabulary = set(self._words)
+        for _, words, _ in self._phrases:
+            self._vocabulary.update(words)
+        self._ascii_vocabulary = {
+            word.encode('ascii') for word in self._vocabulary if word.isascii()
+        }
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_RULES_PATH):
+        """Load a rule table from a JSON file"""
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        router = cls(table['rules'], table['fallback'])
+        logger.info(f"Loaded {len(router.rules)} intent rules from {path}")
+        return router
+
+    def _present_words(self, message_lower):
+        """Rule vocabulary words that occur as whole words in the message"""
+        if message_lower.isascii():
+            tokens = message_lower.encode('ascii').translate(_ASCII_WORD_TABLE).split()
+            return {token.decode('ascii') for token in self._ascii_vocabulary.intersection(tokens)}
+        return self._vocabulary.intersection(WORD_PATTERN.findall(message_lower))
+
+    def match(self, message):
+        """Return the highest-priority rule matching message, or the fallback"""
+        message_lower = message.lower()
+        present = self._present_words(message_lower)
+        if not present:
+            return self.fallback
+
+        best = len(self.rules)
+        for word in present:
+            priority = self._words.get(word)
+            if priority is not None and priority < best:
+                best = priority
+
+        for priority, words, regex in self._phrases:
+            if priority >= best:
+                break
+            if words <= present and regex.search(message_lower):
+                best = priority
+                break
+
+        return self.rules[best] if best < len(self.rules) else self.fallback
+
+    def respond(self, message):
+        """Render the response of the matching rule"""
+        return self.match(message).render(message)
@@ -1,7 +1,10 @@
+import os
 import re
 import numpy as np
 from collections import Counter
 import logging
+from models.feature_extractor import FeatureExtractor
+from models.embeddings import HashedNgramEmbedder
 
 logger = logging.getLogger(__name__)
 
@@ -25,23 +28,20 @@ class MLProcessor:
             'sports': ['sport', 'game', 'team', 'player', 'score'],
             'food': ['food', 'cook', 'recipe', 'meal', 'restaurant']
         }
+        
+        # Compiled single-pass engine used by extract_features
+        self.feature_extractor = FeatureExtractor(self.sentiment_lexicon, self.topic_keywords)
+        
+        # Hashed n-gram embeddings for context retrieval
+        self.embedder = HashedNgramEmbedder(dim=int(os.environ.get('BRAD_EMBEDDING_DIM', 256)))
     
     def extract_features(self, text):
         """Extract ML features from text"""
-        features = {
-            'length': len(text),
-            'word_count': len(text.split()),
-            'sentiment': self.analyze_sentiment(text),
-            'sentiment_score': self.calculate_sentiment_score(text),
-            'topics': self.extract_topics(text),
-            'complexity': self.calculate_complexity(text),
-            'has_question': '?' in text,
-            'has_exclamation': '!' in text,
-            'unique_words': len(set(text.lower().split())),
-            'avg_word_length': np.mean([len(word) for word in text.split()]) if text.split() else 0
-        }
-        
-        return features
+        return self.feature_extractor.extract(text)
+    
+    def extract_features_batch(self, texts):
+        """Extract ML features from many texts as columnar arrays"""
+        return self.feature_extractor.extract_batch(texts)
     
     def analyze_sentiment(self, text):
         """Analyze text sentiment"""
@@ -120,3 +120,26 @@ class MLProcessor:
         embeddings.append(self.calculate_complexity(text))
         
         return np.array(embeddings[:10])  # Return first 10 features
+    
+    def generate_embeddings_batch(self, texts):
+        """Generate embeddings for many texts as an (N, 10) matrix"""
+        texts = list(texts)
+        embeddings = np.zeros((len(texts), 10))
+        if not texts:
+            return embeddings
+        
+        lowered = [text.lower() for text in texts]
+        lengths = np.array([len(text) for text in texts], dtype=np.float64)
+        has_words = np.array([bool(text.split()) for text in lowered])
+        
+        # Count the first ten letters of every text with a single bincount
+        codes = np.frombuffer(''.join(lowered).encode('utf-32-le'), dtype=np.uint32)
+        doc_index = np.repeat(np.arange(len(texts)), [len(text) for text in lowered])
+        letters = (codes >= ord('a')) & (codes < ord('a') + 10)
+        counts = np.bincount(
+            doc_index[letters] * 10 + (codes[letters] - ord('a')),
+            minlength=len(texts) * 10
+        ).reshape(len(texts), 10)
+        
+        np.divide(counts, lengths[:, None], out=embeddings, where=has_words[:, None])
+        return embeddings
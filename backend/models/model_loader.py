@@ -1,24 +1,145 @@
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
+from collections import deque
+import copy
+import hashlib
+import json
 import pickle
 import os
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bumped whenever the pickled artifact layout changes
+ARTIFACT_FORMAT = 1
+
 class ModelLoader:
-    def __init__(self):
-        """Initialize model loader"""
+    def __init__(self, incremental=False, max_samples=10000, retrain_interval=10, n_features=2 ** 16,
+                 artifact_path=None, metrics=None):
+        """Initialize model loader
+
+        In incremental mode a stateless HashingVectorizer feeds
+        MultinomialNB.partial_fit, so each update costs O(batch) rather than
+        a refit over the whole history. In both modes retraining happens on
+        a background thread and the fitted (vectorizer, classifier) pair is
+        swapped in atomically, so predictions never wait for training.
+
+        The classifier is built on first use (or by warm_up), and sklearn
+        is only imported then. With an artifact_path the fitted model is
+        pickled there and reloaded on later starts instead of refitted.
+        get_model_info reads measured latency and throughput from metrics.
+        """
         self.models = {}
-        self.vectorizer = TfidfVectorizer(max_features=1000)
-        self.classifier = None
-        self.training_data = []
-        self.training_labels = []
+        self.incremental = incremental
+        self.retrain_interval = retrain_interval
+        self.n_features = n_features
+        self.artifact_path = artifact_path
+        self.metrics = metrics
+        self._accuracy = (None, None)
+        self.training_data = deque(maxlen=max_samples)
+        self.training_labels = deque(maxlen=max_samples)
+        self._model = (None, None)
+        # Bumped on every model swap so copies elsewhere can detect staleness
+        self.version = 0
+        
+        # Samples waiting for the background trainer
+        self._pending = []
+        self._lock = threading.Lock()
+        self._train_lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._trainer = None
+        self._ready = threading.Event()
+        self._warmup = None
         
         # Initialize with sample training data
         self._initialize_sample_data()
     
+    @property
+    def vectorizer(self):
+        self._ensure_model()
+        return self._model[0]
+    
+    @property
+    def classifier(self):
+        self._ensure_model()
+        return self._model[1]
+    
+    @property
+    def is_ready(self):
+        """Whether the classifier has been loaded or trained"""
+        return self._ready.is_set()
+    
+    def _ensure_model(self):
+        """Load or train the classifier on first use"""
+        if self._ready.is_set():
+            return
+        with self._train_lock:
+            if self._ready.is_set():
+                return
+            if self.artifact_path and self.load_artifact(self.artifact_path):
+                return
+            self.train_classifier()
+            self._ready.set()
+            if self.artifact_path:
+                self.save_artifact(self.artifact_path)
+    
+    def warm_up(self, background=False):
+        """Build the classifier now, optionally on a background thread"""
+        if not background:
+            self._ensure_model()
+            return None
+        if self._warmup is None:
+            self._warmup = threading.Thread(target=self._ensure_model, name='model-warmup', daemon=True)
+            self._warmup.start()
+        return self._warmup
+    
+    def _artifact_key(self):
+        """Fingerprint of everything the fitted model depends on"""
+        import sklearn
+        
+        with self._lock:
+            samples = list(zip(self.training_data, self.training_labels))
+        config = [ARTIFACT_FORMAT, sklearn.__version__, self.incremental, self.n_features, samples]
+        return hashlib.blake2b(json.dumps(config).encode('utf-8'), digest_size=16).hexdigest()
+    
+    def save_artifact(self, path):
+        """Pickle the fitted model to path, replacing it atomically"""
+        version, model = self.get_snapshot()
+        artifact = {
+            "format": ARTIFACT_FORMAT,
+            "key": self._artifact_key(),
+            "version": version,
+            "model": model
+        }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+            logger.info(f"Saved model artifact to {path}")
+        except OSError as e:
+            logger.error(f"Failed to save model artifact: {str(e)}")
+    
+    def load_artifact(self, path):
+        """Install the model pickled at path if it matches this configuration"""
+        try:
+            with open(path, 'rb') as f:
+                artifact = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable model artifact {path}: {str(e)}")
+            return False
+        
+        if artifact.get("format") != ARTIFACT_FORMAT or artifact.get("key") != self._artifact_key():
+            logger.info(f"Model artifact {path} is stale, retraining")
+            return False
+        self.set_snapshot(self.version + 1, artifact["model"])
+        logger.info(f"Loaded model artifact from {path}")
+        return True
+    
     def _initialize_sample_data(self):
         """Initialize with sample training data"""
         sample_data = [
@@ -38,44 +159,162 @@ class ModelLoader:
             self.training_data.append(text)
             self.training_labels.append(label)
         
-        # Train initial classifier
-        self.train_classifier()
+        # The initial classifier is trained (or loaded) on first use
+    
+    def _new_vectorizer(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+        
+        if self.incremental:
+            # Stateless: no vocabulary to refit, counts stay non-negative for NB
+            return HashingVectorizer(n_features=self.n_features, alternate_sign=False, norm=None)
+        return TfidfVectorizer(max_features=1000)
     
     def train_classifier(self):
-        """Train the text classifier"""
-        if len(self.training_data) > 0:
-            X = self.vectorizer.fit_transform(self.training_data)
-            self.classifier = MultinomialNB()
-            self.classifier.fit(X, self.training_labels)
-            logger.info("Classifier trained successfully")
+        """Train the text classifier from scratch on the retained samples"""
+        with self._train_lock:
+            with self._lock:
+                texts = list(self.training_data)
+                labels = list(self.training_labels)
+            if len(texts) > 0:
+                from sklearn.naive_bayes import MultinomialNB
+                
+                vectorizer = self._new_vectorizer()
+                X = vectorizer.fit_transform(texts)
+                classifier = MultinomialNB()
+                classifier.fit(X, labels)
+                self._model = (vectorizer, classifier)
+                self.version += 1
+                logger.info("Classifier trained successfully")
+    
+    def _update_classifier(self, texts, labels):
+        """Fold a batch of samples into a copy of the model and swap it in"""
+        with self._train_lock:
+            vectorizer, classifier = self._model
+            if classifier is None or not set(labels) <= set(classifier.classes_):
+                # partial_fit cannot learn new classes, refit on retained samples
+                self.train_classifier()
+                return
+            
+            classifier = copy.deepcopy(classifier)
+            classifier.partial_fit(vectorizer.transform(texts), labels)
+            self._model = (vectorizer, classifier)
+            self.version += 1
+    
+    def get_snapshot(self):
+        """Return (version, (vectorizer, classifier)) for the current model"""
+        self._ensure_model()
+        with self._train_lock:
+            return self.version, self._model
+    
+    def set_snapshot(self, version, model):
+        """Install a (vectorizer, classifier) pair trained elsewhere"""
+        with self._train_lock:
+            self._model = model
+            self.version = version
+            self._ready.set()
+    
+    def _train_loop(self):
+        """Background trainer: apply pending samples as they accumulate"""
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                self._wakeup.clear()
+                batch, self._pending = self._pending, []
+            if batch:
+                texts, labels = zip(*batch)
+                try:
+                    self._ensure_model()
+                    if self.incremental:
+                        self._update_classifier(list(texts), list(labels))
+                    else:
+                        self.train_classifier()
+                except Exception as e:
+                    logger.error(f"Background training failed: {str(e)}")
+            with self._lock:
+                if not self._pending:
+                    self._idle.set()
     
     def predict_category(self, text):
         """Predict category of text"""
-        if self.classifier is None:
+        self._ensure_model()
+        vectorizer, classifier = self._model
+        if classifier is None:
             return "general"
         
-        X = self.vectorizer.transform([text])
-        prediction = self.classifier.predict(X)
+        X = vectorizer.transform([text])
+        prediction = classifier.predict(X)
         return prediction[0]
     
+    def predict_categories(self, texts):
+        """Predict categories for a batch of texts in one transform/predict call"""
+        self._ensure_model()
+        vectorizer, classifier = self._model
+        if classifier is None:
+            return ["general"] * len(texts)
+        
+        X = vectorizer.transform(texts)
+        return list(classifier.predict(X))
+    
     def add_training_data(self, text, label):
         """Add new training data"""
-        self.training_data.append(text)
-        self.training_labels.append(label)
-        
-        # Retrain periodically
-        if len(self.training_data) % 10 == 0:
-            self.train_classifier()
+        with self._lock:
+            self.training_data.append(text)
+            self.training_labels.append(label)
+            self._pending.append((text, label))
+            
+            # Retrain periodically, off the calling thread
+            if len(self._pending) < self.retrain_interval:
+                return
+            self._idle.clear()
+            if self._trainer is None:
+                self._trainer = threading.Thread(target=self._train_loop, name='model-trainer', daemon=True)
+                self._trainer.start()
+            self._wakeup.set()
+    
+    def wait_for_training(self, timeout=None):
+        """Block until queued retraining has been applied"""
+        return self._idle.wait(timeout)
+    
+    def training_accuracy(self):
+        """Accuracy on the retained samples, computed once per model version"""
+        version, accuracy = self._accuracy
+        if version == self.version and accuracy is not None:
+            return accuracy
+        with self._lock:
+            texts = list(self.training_data)
+            labels = list(self.training_labels)
+        if not texts:
+            return None
+        version = self.version
+        predictions = self.predict_categories(texts)
+        accuracy = float(np.mean([predicted == label for predicted, label in zip(predictions, labels)]))
+        self._accuracy = (version, accuracy)
+        return accuracy
     
     def get_model_info(self, model_id):
-        """Get information about a specific model"""
+        """Get measured performance of a specific model.
+
+        Everything is nested under "performance" and "classifier" so it can
+        be merged into a model's spec without overwriting its fields. The
+        category classifier is shared by every model, so its accuracy on
+        its own training samples is reported as the classifier's.
+        """
+        summary = self.metrics.model_summary(model_id) if self.metrics is not None else {}
+        p50 = summary.get("p50_ms")
         model_info = {
-            "status": "loaded",
-            "parameters": "active",
+            "classifier": {
+                "status": "loaded" if self.is_ready else "loading",
+                "training_accuracy": self.training_accuracy() if self.is_ready else None
+            },
             "performance": {
-                "accuracy": np.random.uniform(0.85, 0.98),
-                "response_time": np.random.uniform(0.1, 0.5),
-                "throughput": np.random.randint(100, 1000)
+                "response_time": p50 / 1000 if p50 is not None else None,
+                "throughput": summary.get("rps", 0.0),
+                "latency_ms": {
+                    "p50": p50,
+                    "p95": summary.get("p95_ms"),
+                    "p99": summary.get("p99_ms")
+                },
+                "requests": summary.get("requests", 0)
             }
         }
         return model_info
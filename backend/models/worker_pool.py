@@ -0,0 +1,225 @@
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import logging
+from models.ml_processor import MLProcessor
+from models.model_loader import ModelLoader
+
+logger = logging.getLogger(__name__)
+
+# CPU-bound stages a worker can run on a batch of texts
+STAGES = ('features', 'category', 'embedding')
+
+# Per-process state of a pool worker, set by _init_worker
+_worker = None
+
+
+def run_stages(processor, model_loader, texts, stages):
+    """Run the named stages on texts, returning one compact result per stage.
+
+    Features come back as a columnar FeatureBatch, categories as a list of
+    strings and embeddings as an (N, dim) float32 matrix, all of which
+    pickle to a fraction of the size of per-text dicts.
+    """
+    results = []
+    for stage in stages:
+        if stage == 'features':
+            results.append(processor.extract_features_batch(texts))
+        elif stage == 'category':
+            results.append([str(category) for category in model_loader.predict_categories(texts)])
+        elif stage == 'embedding':
+            results.append(processor.embedder.embed_batch(texts))
+        else:
+            raise ValueError(f"Unknown stage: {stage}")
+    return tuple(results)
+
+
+def _init_worker(loader_options, model_version, model_path):
+    """Preload an MLProcessor and ModelLoader in a new worker process"""
+    global _worker
+    _worker = (MLProcessor(), ModelLoader(**loader_options))
+    _sync_model(model_version, model_path)
+
+
+def _sync_model(version, path):
+    """Load the parent's published classifier if ours is a different version"""
+    model_loader = _worker[1]
+    if model_loader.version == version:
+        return
+    try:
+        with open(path, 'rb') as f:
+            model_loader.set_snapshot(version, pickle.load(f))
+    except OSError as e:
+        logger.warning(f"Keeping model version {model_loader.version}: {str(e)}")
+
+
+def _run_task(task):
+    version, path, texts, stages = task
+    _sync_model(version, path)
+    return run_stages(_worker[0], _worker[1], texts, stages)
+
+
+def _ping():
+    return os.getpid()
+
+
+class PooledEmbedder:
+    """HashedNgramEmbedder stand-in that embeds in pool workers"""
+
+    def __init__(self, pool, dim):
+        self.pool = pool
+        self.dim = dim
+
+    def embed_batch(self, texts):
+        return self.pool.run(list(texts), ('embedding',))[0]
+
+    def embed(self, text):
+        return self.embed_batch([text])[0]
+
+
+class MLWorkerPool:
+    """Warm process pool for the CPU-bound stages of a chat turn.
+
+    Feature extraction, classification and embedding hold the GIL, so on
+    the request thread they serialize every concurrent request. Here they
+    run in worker processes that each preload their own MLProcessor and
+    ModelLoader. A task carries only the texts, the stage names and the
+    parent's model version; when that version changes the parent pickles
+    the new (vectorizer, classifier) pair to a file once and workers load
+    it on their next task. Large batches are split across workers.
+
+    If the pool cannot start or a worker dies, work falls back to running
+    in the calling thread with the parent's objects (or raises when
+    fallback is disabled).
+    """
+
+    def __init__(self, ml_processor, model_loader, workers=None, fallback=True,
+                 start_method=None, min_chunk=16):
+        """Start and warm up the worker processes"""
+        self.ml_processor = ml_processor
+        self.model_loader = model_loader
+        self.workers = workers or os.cpu_count() or 1
+        self.fallback = fallback
+        self.min_chunk = min_chunk
+        self.embedder = PooledEmbedder(self, ml_processor.embedder.dim)
+
+        self.tasks = 0
+        self.local_tasks = 0
+        self._lock = threading.Lock()
+        self._model_dir = tempfile.mkdtemp(prefix='brad-models-')
+        self._model_files = deque()
+        self._published = (None, None)
+        self._publish()
+
+        self._executor = None
+        try:
+            loader_options = {
+                "incremental": model_loader.incremental,
+                "n_features": model_loader.n_features
+            }
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(start_method),
+                initializer=_init_worker,
+                initargs=(loader_options, *self._published)
+            )
+            # Start every worker now rather than on the first requests
+            pids = {future.result() for future in [self._executor.submit(_ping) for _ in range(self.workers)]}
+            logger.info(f"Started {len(pids)} ML worker processes")
+        except Exception as e:
+            self._disable(e)
+
+    def _disable(self, error):
+        """Stop using the process pool after a failure"""
+        if not self.fallback:
+            raise error
+        logger.error(f"ML worker pool unavailable, running in-thread: {str(error)}")
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _publish(self):
+        """Pickle the current model for workers if its version changed"""
+        with self._lock:
+            version, model = self.model_loader.get_snapshot()
+            if version == self._published[0]:
+                return self._published
+            path = os.path.join(self._model_dir, f'model-{version}.pkl')
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+            self._published = (version, path)
+
+            # Keep the previous file for tasks queued before this version
+            self._model_files.append(path)
+            while len(self._model_files) > 2:
+                os.remove(self._model_files.popleft())
+            return self._published
+
+    def _chunks(self, texts):
+        size = max(self.min_chunk, -(-len(texts) // self.workers))
+        return [texts[start:start + size] for start in range(0, len(texts), size)]
+
+    def run(self, texts, stages=STAGES):
+        """Run stages on texts, returning one result per stage.
+
+        Results are lists of feature dicts and category strings and an
+        (N, dim) embedding matrix, in the order of texts.
+        """
+        executor = self._executor
+        if executor is not None and texts:
+            version, path = self._published
+            if self.model_loader.version != version:
+                version, path = self._publish()
+            try:
+                futures = [
+                    executor.submit(_run_task, (version, path, chunk, stages))
+                    for chunk in self._chunks(texts)
+                ]
+                parts = [future.result() for future in futures]
+                with self._lock:
+                    self.tasks += len(futures)
+                return self._merge(stages, parts)
+            except BrokenProcessPool as e:
+                self._disable(e)
+
+        with self._lock:
+            self.local_tasks += 1
+        return self._merge(stages, [run_stages(self.ml_processor, self.model_loader, texts, stages)])
+
+    @staticmethod
+    def _merge(stages, parts):
+        results = []
+        for index, stage in enumerate(stages):
+            if stage == 'features':
+                results.append([row for part in parts for row in part[index].to_dicts()])
+            elif stage == 'embedding':
+                results.append(np.concatenate([part[index] for part in parts]))
+            else:
+                results.append([value for part in parts for value in part[index]])
+        return tuple(results)
+
+    def close(self):
+        """Shut down the workers and remove published model files"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        shutil.rmtree(self._model_dir, ignore_errors=True)
+
+    def stats(self):
+        """Report pool mode and task counters"""
+        with self._lock:
+            return {
+                "mode": "process" if self._executor is not None else "thread",
+                "workers": self.workers if self._executor is not None else 0,
+                "tasks": self.tasks,
+                "local_tasks": self.local_tasks,
+                "model_version": self._published[0]
+            }
@@ -0,0 +1,446 @@
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+# Response chunks a bridged WSGI app may produce ahead of the client
+WSGI_QUEUE_CHUNKS = 8
+
+# Endpoints that are never shed and run on their own threads, so probes
+# keep working under load
+UNMETERED_PATHS = {'/api/health', '/api/health/ready', '/api/metrics'}
+
+
+class ChatASGIApp:
+    """ASGI front end for the Brad AI backend.
+
+    POST /api/chat and /api/chat/stream are served by async handlers that
+    run the CPU-bound pipeline (feature extraction, generation, profile
+    update) on a bounded thread pool. Every other route is bridged to the
+    Flask WSGI app on the same pool, except the health and metrics probes,
+    which bypass admission and run on a small pool of their own.
+
+    At most max_concurrency requests run at once and at most max_queue wait
+    for a slot. A full queue is answered with 429, a queue wait longer than
+    queue_timeout and any request arriving during shutdown with 503. On
+    lifespan shutdown the app stops admitting work and waits up to
+    shutdown_timeout seconds for in-flight requests before stopping the pool.
+    """
+
+    def __init__(self, backend, max_concurrency=32, max_queue=128, queue_timeout=10.0,
+                 workers=None, shutdown_timeout=30.0):
+        """Initialize the ASGI app around the backend module"""
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or max_concurrency,
+            thread_name_prefix='brad-worker'
+        )
+        self.probe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='brad-probe')
+        self._slots = None
+        self._idle = None
+        self._active = 0
+        self._waiting = 0
+        # Requests running or waiting for a slot
+        self._admitted = 0
+        self._draining = False
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        if scope['path'] in UNMETERED_PATHS:
+            await self._handle(scope, receive, send, self.probe_executor)
+            return
+
+        status = await self._admit()
+        if status is not None:
+            await self._send_json(send, status, {"error": "Server is overloaded, retry later"},
+                                  [(b'retry-after', b'1')])
+            return
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            self._release()
+
+    # Admission control
+
+    def _ensure_primitives(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._idle = asyncio.Event()
+            self._idle.set()
+
+    async def _admit(self):
+        """Reserve a request slot, or return the status code to shed with"""
+        self._ensure_primitives()
+        if self._draining:
+            return 503
+        # Reserve before awaiting: requests arriving together all see the
+        # semaphore unlocked, so it cannot tell a full queue on its own
+        if self._admitted >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            return 429
+
+        self._admitted += 1
+        self._waiting += 1
+        acquired = False
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            acquired = True
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            return 503
+        finally:
+            self._waiting -= 1
+            if not acquired:
+                self._admitted -= 1
+
+        self._active += 1
+        self._idle.clear()
+        return None
+
+    def _release(self):
+        self._active -= 1
+        self._admitted -= 1
+        self._slots.release()
+        if self._active == 0:
+            self._idle.set()
+
+    def stats(self):
+        """Report concurrency and shedding counters"""
+        return {
+            "active": self._active,
+            "waiting": self._waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "draining": self._draining
+        }
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._ensure_primitives()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def shutdown(self):
+        """Stop admitting requests and drain the in-flight ones"""
+        self._ensure_primitives()
+        self._draining = True
+        logger.info(f"Draining {self._active} in-flight requests")
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutdown timeout with {self._active} requests still running")
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.probe_executor.shutdown(wait=False, cancel_futures=True)
+
+    # Routing
+
+    async def _handle(self, scope, receive, send, executor=None):
+        try:
+            body = await self._read_body(receive)
+            if body is None:
+                await self._send_json(send, 413, {"error": "Request body too large"})
+                return
+
+            route = (scope['method'], scope['path'])
+            if route == ('POST', '/api/chat'):
+                await self._chat(body, send)
+            elif route == ('POST', '/api/chat/stream'):
+                await self._chat_stream(body, send)
+            else:
+                await self._wsgi(scope, body, send, executor)
+        except Exception as e:
+            logger.error(f"Error in ASGI handler: {str(e)}")
+            await self._send_json(send, getattr(e, 'status_code', 500), {"error": str(e)})
+
+    async def _run(self, func, *args, executor=None):
+        return await asyncio.get_running_loop().run_in_executor(executor or self.executor, func, *args)
+
+    def _parse_chat(self, body):
+        try:
+            data = self.backend.app.json.loads(body) if body else None
+        except ValueError:
+            return None, ("Invalid JSON body", 400)
+        if not isinstance(data, dict):
+            return None, ("Message is required", 400)
+        return self.backend.validate_chat_request(data)
+
+    def _chat_turn(self, user_message, model_id, user_id):
+        backend = self.backend
+        ml_features = backend.begin_chat_turn(user_message, model_id, user_id)
+        response = backend.generate_response(user_message, model_id, user_id, ml_features)
+        return backend.complete_chat_turn(user_message, model_id, user_id, response, ml_features)
+
+    async def _chat(self, body, send):
+        started = time.perf_counter()
+        params, error = self._parse_chat(body)
+        if error:
+            message, status = error
+            self.backend.metrics.record_request('/api/chat', "invalid", status, time.perf_counter() - started)
+            await self._send_json(send, status, {"error": message})
+            return
+        model_id, status = params[1], 500
+        try:
+            payload = await self._run(self._chat_turn, *params)
+            status = 200
+        except Exception as e:
+            status = getattr(e, 'status_code', 500)
+            raise
+        finally:
+            self.backend.metrics.record_request('/api/chat', model_id, status, time.perf_counter() - started)
+        await self._send_json(send, 200, payload)
+
+    async def _chat_stream(self, body, send):
+        started = time.perf_counter()
+        params, error = self._parse_chat(body)
+        if error:
+            message, status = error
+            self.backend.metrics.record_request('/api/chat/stream', "invalid", status, time.perf_counter() - started)
+            await self._send_json(send, status, {"error": message})
+            return
+        user_message, model_id, user_id = params
+        backend = self.backend
+
+        ml_features = await self._run(backend.begin_chat_turn, user_message, model_id, user_id)
+        chunks = backend.stream_response(user_message, model_id, user_id, ml_features)
+        step = None
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'access-control-allow-origin', b'*'),
+                ],
+            })
+
+            streamed = []
+            try:
+                while True:
+                    step = self.executor.submit(next, chunks, None)
+                    chunk = await asyncio.wrap_future(step)
+                    if chunk is None:
+                        break
+                    streamed.append(chunk)
+                    await self._send_chunk(send, backend.sse_event({"delta": chunk}))
+                payload = await self._run(
+                    backend.complete_chat_turn, user_message, model_id, user_id,
+                    ''.join(streamed), ml_features
+                )
+                event = backend.sse_event(payload, event='done')
+                status = 200
+            except Exception as e:
+                logger.error(f"Error in ASGI chat stream: {str(e)}")
+                event = backend.sse_event({"error": str(e)}, event='error')
+                status = getattr(e, 'status_code', 500)
+            backend.metrics.record_request('/api/chat/stream', model_id, status, time.perf_counter() - started)
+            await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': False})
+        finally:
+            # A failed send or a disconnect leaves the generator suspended; close
+            # it now so its finally blocks (metrics, model slot) run without
+            # waiting for GC. A step still running on a worker finishes first.
+            self._close_later(chunks, step)
+
+    def _close_later(self, generator, step=None):
+        """Close generator on a worker thread once step, its last next() call, is done"""
+        def close(_=None):
+            try:
+                self.executor.submit(generator.close)
+            except RuntimeError:
+                # Executor already shut down
+                generator.close()
+
+        if step is not None and not step.done():
+            step.add_done_callback(close)
+        else:
+            close()
+
+    async def _wsgi(self, scope, body, send, executor=None):
+        """Bridge to Flask, sending its response chunks as they are produced.
+
+        One worker thread runs the WSGI app and iterates its response
+        (stream_with_context needs a single thread), handing chunks over a
+        bounded queue so a slow client holds back the producer instead of
+        the whole body being buffered.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=WSGI_QUEUE_CHUNKS)
+        stop = threading.Event()
+
+        def emit(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def produce():
+            try:
+                self._call_wsgi(scope, body, emit, stop)
+            except Exception as e:
+                if not stop.is_set():
+                    emit(e)
+
+        producer = loop.run_in_executor(executor or self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if isinstance(item, tuple):
+                    status, headers = item
+                    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+                else:
+                    await send({'type': 'http.response.body', 'body': item, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            await producer
+        finally:
+            stop.set()
+            # Free a producer blocked on a full queue; it sees stop and closes the response
+            while not queue.empty():
+                queue.get_nowait()
+
+    def _call_wsgi(self, scope, body, emit, stop):
+        """Run the Flask app for one request, passing (status, headers), each
+        body chunk and finally None to emit until stop is set"""
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope['query_string'].decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f'HTTP_{name}'
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        result = self.backend.app.wsgi_app(environ, start_response)
+        try:
+            emit((response['status'], response['headers']))
+            for chunk in result:
+                if stop.is_set():
+                    return
+                if chunk:
+                    emit(chunk)
+            if not stop.is_set():
+                emit(None)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    # I/O helpers
+
+    async def _read_body(self, receive):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body += message.get('body', b'')
+            if len(body) > MAX_BODY_BYTES:
+                return None
+            if not message.get('more_body', False):
+                break
+        return bytes(body)
+
+    async def _send_chunk(self, send, text):
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+    async def _send_json(self, send, status, data, extra_headers=()):
+        body = self.backend.app.json.dumps_bytes(data)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('latin-1')),
+                (b'access-control-allow-origin', b'*'),
+                *extra_headers,
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def config_from_env():
+    """Read the serving limits from the environment"""
+    workers = os.environ.get('BRAD_WORKERS')
+    return {
+        "max_concurrency": int(os.environ.get('BRAD_MAX_CONCURRENCY', 32)),
+        "max_queue": int(os.environ.get('BRAD_MAX_QUEUE', 128)),
+        "queue_timeout": float(os.environ.get('BRAD_QUEUE_TIMEOUT', 10)),
+        "workers": int(workers) if workers else None,
+        "shutdown_timeout": float(os.environ.get('BRAD_SHUTDOWN_TIMEOUT', 30)),
+    }
+
+
+def create_app():
+    """ASGI application factory, e.g. `uvicorn --factory serving.asgi:create_app`"""
+    import app as backend
+    return ChatASGIApp(backend, **config_from_env())
+
+
+def serve(backend, host='0.0.0.0', port=5000):
+    """Serve the backend module with uvicorn"""
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError("The ASGI serving mode requires uvicorn (pip install uvicorn)")
+
+    config = config_from_env()
+    uvicorn.run(
+        ChatASGIApp(backend, **config),
+        host=host,
+        port=port,
+        log_level='info',
+        timeout_graceful_shutdown=int(config["shutdown_timeout"])
+    )
@@ -0,0 +1,67 @@
+import json
+import numpy as np
+from flask.json.provider import JSONProvider
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODERS = ('orjson', 'json')
+
+
+def _default(obj):
+    """Encode the types neither encoder handles natively"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    to_dict = getattr(obj, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider that encodes straight to bytes.
+
+    Uses orjson when it is installed, which serializes NumPy scalars and
+    arrays natively, and falls back to the standard library encoder with
+    compact separators otherwise. Other objects go through _default.
+    Unlike Flask's default provider, keys are not sorted.
+    """
+
+    def __init__(self, app, encoder=None):
+        super().__init__(app)
+        if encoder is None:
+            encoder = 'orjson' if orjson is not None else 'json'
+        if encoder not in ENCODERS:
+            raise ValueError(f"Unknown JSON encoder: {encoder}")
+        if encoder == 'orjson' and orjson is None:
+            logger.warning("orjson is not installed, using the json module")
+            encoder = 'json'
+        self.encoder = encoder
+
+        if encoder == 'orjson':
+            options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            self.dumps_bytes = lambda obj: orjson.dumps(obj, default=_default, option=options)
+            self._loads = orjson.loads
+        else:
+            encode = json.JSONEncoder(default=_default, separators=(',', ':'), ensure_ascii=False).encode
+            self.dumps_bytes = lambda obj: encode(obj).encode('utf-8')
+            self._loads = json.loads
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return self._loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype='application/json')
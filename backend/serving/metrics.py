@@ -0,0 +1,222 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets, in 1-2.5-5
+# steps from 50us to 10s
+LATENCY_BUCKETS = tuple(
+    base * scale
+    for scale in (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1)
+    for base in (5, 10, 25)
+)[:-1]
+
+
+class Histogram:
+    """Fixed-bucket histogram with a running sum, count and maximum"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'max', '_lock')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        # One count per bound plus the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def quantile(self, q):
+        """Estimate the q-quantile by interpolating inside its bucket"""
+        counts, _, count = self.snapshot()
+        if count == 0:
+            return None
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                # No observation is above the maximum seen
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+
+class RateMeter:
+    """Events per second over a sliding window of one-second slots"""
+
+    __slots__ = ('window', '_slots', '_lock')
+
+    def __init__(self, window=60):
+        self.window = window
+        self._slots = [(0, 0)] * window
+        self._lock = threading.Lock()
+
+    def mark(self, now=None):
+        second = int(now if now is not None else time.time())
+        slot = second % self.window
+        with self._lock:
+            stamp, count = self._slots[slot]
+            self._slots[slot] = (second, count + 1 if stamp == second else 1)
+
+    def rate(self, now=None):
+        """Average events per second over the last window seconds"""
+        second = int(now if now is not None else time.time())
+        with self._lock:
+            total = sum(count for stamp, count in self._slots if second - self.window < stamp <= second)
+        return total / self.window
+
+
+class Metrics:
+    """Per-model stage timers, request counters and throughput.
+
+    Recording is a bisect into a fixed bucket list and a short critical
+    section, with no allocation once a (stage, model) series exists.
+    Everything is rendered on demand in the Prometheus text format. When
+    disabled, the recording methods return immediately.
+    """
+
+    def __init__(self, enabled=True, namespace='brad', rate_window=60):
+        """Initialize empty metric series"""
+        self.enabled = enabled
+        self.namespace = namespace
+        self.rate_window = rate_window
+        self.started = time.time()
+        self._stages = {}
+        self._requests = {}
+        self._latency = {}
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def _series(self, table, key, factory):
+        series = table.get(key)
+        if series is None:
+            with self._lock:
+                series = table.setdefault(key, factory())
+        return series
+
+    def observe(self, stage, model, seconds):
+        """Record the duration of one pipeline stage"""
+        if self.enabled:
+            self._series(self._stages, (stage, model), Histogram).observe(seconds)
+
+    @contextmanager
+    def timer(self, stage, model):
+        """Time the enclosed block as one observation of stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, model, time.perf_counter() - started)
+
+    def record_request(self, endpoint, model, status, seconds):
+        """Count a finished request and record its end-to-end latency"""
+        if not self.enabled:
+            return
+        key = (endpoint, model, str(status))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+        self._series(self._latency, model, Histogram).observe(seconds)
+        self._series(self._rates, model, lambda: RateMeter(self.rate_window)).mark()
+
+    def model_summary(self, model):
+        """Measured latency quantiles (ms), request count and recent RPS for a model"""
+        histogram = self._latency.get(model)
+        meter = self._rates.get(model)
+        if histogram is None:
+            return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "requests": 0, "rps": 0.0}
+
+        def ms(q):
+            value = histogram.quantile(q)
+            return value * 1000 if value is not None else None
+
+        return {
+            "p50_ms": ms(0.50),
+            "p95_ms": ms(0.95),
+            "p99_ms": ms(0.99),
+            "requests": histogram.count,
+            "rps": meter.rate() if meter is not None else 0.0
+        }
+
+    @staticmethod
+    def _labels(**labels):
+        return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+    def _render_histogram(self, lines, name, histogram, labels):
+        counts, total, count = histogram.snapshot()
+        cumulative = 0
+        for bound, bucket_count in zip(histogram.bounds, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{{labels}}} {total!r}')
+        lines.append(f'{name}_count{{{labels}}} {count}')
+
+    def render_prometheus(self, gauges=None):
+        """Render all series in the Prometheus text exposition format
+
+        gauges maps a metric name to a (help, value) pair for point-in-time
+        values owned by other components.
+        """
+        ns = self.namespace
+        with self._lock:
+            stages = sorted(self._stages.items())
+            requests = sorted(self._requests.items())
+            latency = sorted(self._latency.items())
+            rates = sorted(self._rates.items())
+
+        lines = [
+            f'# HELP {ns}_stage_duration_seconds Time spent in each chat pipeline stage.',
+            f'# TYPE {ns}_stage_duration_seconds histogram'
+        ]
+        for (stage, model), histogram in stages:
+            self._render_histogram(lines, f'{ns}_stage_duration_seconds', histogram,
+                                   self._labels(stage=stage, model=model))
+
+        lines.append(f'# HELP {ns}_request_duration_seconds End-to-end chat request latency.')
+        lines.append(f'# TYPE {ns}_request_duration_seconds histogram')
+        for model, histogram in latency:
+            self._render_histogram(lines, f'{ns}_request_duration_seconds', histogram,
+                                   self._labels(model=model))
+
+        lines.append(f'# HELP {ns}_requests_total Chat requests by endpoint, model and status.')
+        lines.append(f'# TYPE {ns}_requests_total counter')
+        for (endpoint, model, status), count in requests:
+            lines.append(f'{ns}_requests_total{{{self._labels(endpoint=endpoint, model=model, status=status)}}} {count}')
+
+        lines.append(f'# HELP {ns}_requests_per_second Chat requests per second over the last {self.rate_window}s.')
+        lines.append(f'# TYPE {ns}_requests_per_second gauge')
+        for model, meter in rates:
+            lines.append(f'{ns}_requests_per_second{{{self._labels(model=model)}}} {meter.rate()!r}')
+
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            lines.append(f'# HELP {ns}_{name} {help_text}')
+            lines.append(f'# TYPE {ns}_{name} gauge')
+            if isinstance(value, dict):
+                for label, item in sorted(value.items()):
+                    lines.append(f'{ns}_{name}{{{self._labels(model=label)}}} {item}')
+            else:
+                lines.append(f'{ns}_{name} {value}')
+
+        lines.append(f'# HELP {ns}_uptime_seconds Seconds since the metrics were initialized.')
+        lines.append(f'# TYPE {ns}_uptime_seconds gauge')
+        lines.append(f'{ns}_uptime_seconds {time.time() - self.started:.3f}')
+        return '\n'.join(lines) + '\n'
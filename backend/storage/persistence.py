@@ -0,0 +1,491 @@
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from collections import deque
+from storage.session_store import run_periodically
+import logging
+
+logger = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct('>I')
+SEGMENT_SHIFT = 40
+SNAPSHOT_VERSION = 1
+
+
+class PersistenceBackend:
+    """Interface for durable conversation history and profile storage"""
+
+    def __init__(self):
+        self._maintenance_stop = None
+
+    def has_user(self, user_id):
+        raise NotImplementedError
+
+    def append_message(self, user_id, message):
+        raise NotImplementedError
+
+    def read_history(self, user_id, limit=None):
+        raise NotImplementedError
+
+    def history_length(self, user_id):
+        raise NotImplementedError
+
+    def save_profile(self, user_id, profile):
+        raise NotImplementedError
+
+    def load_profile(self, user_id):
+        raise NotImplementedError
+
+    def compact(self):
+        """Reclaim space taken by superseded records"""
+
+    def snapshot(self):
+        """Persist whatever is needed for a fast restart"""
+
+    def maintenance(self):
+        """Periodic housekeeping, called from the maintenance thread"""
+        self.snapshot()
+
+    def start_maintenance(self, interval=60):
+        """Run maintenance() every interval seconds on a daemon thread"""
+        self._maintenance_stop = run_periodically(self.maintenance, interval, 'persistence-maintenance')
+
+    def close(self):
+        if self._maintenance_stop is not None:
+            self._maintenance_stop.set()
+
+
+class _UserIndex:
+    """Positions of a user's live records in the segment log"""
+
+    __slots__ = ('messages', 'profile')
+
+    def __init__(self, history_size):
+        self.messages = deque(maxlen=history_size)
+        self.profile = None
+
+
+class SegmentLogBackend(PersistenceBackend):
+    """Append-only, length-prefixed segment log read through mmap.
+
+    Every record is a 4-byte big-endian length followed by a JSON body of
+    the form {"u": user_id, "t": "m" | "p", "d": data}. Only positions are
+    kept in memory: for each user, the offsets of the last history_size
+    messages and of the latest profile. Positions pack the segment number
+    and the byte offset into a single int.
+
+    snapshot() writes that index together with the log position it covers,
+    so a restart loads the snapshot and replays only the records written
+    after it. compact() rewrites live records into fresh segments and drops
+    the old ones.
+    """
+
+    def __init__(self, directory, history_size=50, segment_bytes=64 * 1024 * 1024,
+                 compact_ratio=0.5, compact_min_records=10000, fsync=False):
+        """Open or create a segment log in directory"""
+        super().__init__()
+        self.directory = directory
+        self.history_size = history_size
+        self.segment_bytes = segment_bytes
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._index = {}
+        self._maps = {}
+        self._total_records = 0
+        self._dead_records = 0
+        self._unsnapshotted = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # Paths and positions
+
+    def _segment_path(self, segment_id):
+        return os.path.join(self.directory, f"{segment_id:08d}.seg")
+
+    @property
+    def _snapshot_path(self):
+        return os.path.join(self.directory, "index.snapshot")
+
+    def _segment_ids(self):
+        return sorted(
+            int(name[:-4]) for name in os.listdir(self.directory)
+            if name.endswith('.seg') and name[:-4].isdigit()
+        )
+
+    @staticmethod
+    def _position(segment_id, offset):
+        return (segment_id << SEGMENT_SHIFT) | offset
+
+    # Startup
+
+    def _load(self):
+        """Load the index snapshot, then replay the log tail after it"""
+        for name in os.listdir(self.directory):
+            if name.endswith('.seg.tmp'):
+                os.remove(os.path.join(self.directory, name))
+
+        segment_ids = self._segment_ids()
+        start_segment, start_offset = (segment_ids[0] if segment_ids else 1), 0
+
+        if os.path.exists(self._snapshot_path):
+            try:
+                start_segment, start_offset = self._load_snapshot(segment_ids)
+            except (ValueError, KeyError, OSError) as e:
+                logger.warning(f"Ignoring unusable index snapshot: {str(e)}")
+                self._index = {}
+                self._total_records = self._dead_records = 0
+                start_segment, start_offset = (segment_ids[0] if segment_ids else 1), 0
+            else:
+                # Segments older than the snapshot are leftovers from an
+                # interrupted compaction.
+                for segment_id in segment_ids:
+                    if segment_id < start_segment and segment_id < self._first_id:
+                        os.remove(self._segment_path(segment_id))
+                segment_ids = [s for s in segment_ids if s >= self._first_id]
+        self._first_id = segment_ids[0] if segment_ids else start_segment
+
+        replayed = 0
+        for segment_id in segment_ids:
+            if segment_id < start_segment:
+                continue
+            offset = start_offset if segment_id == start_segment else 0
+            replayed += self._replay_segment(segment_id, offset)
+
+        self._active_id = segment_ids[-1] if segment_ids else start_segment
+        self._active = open(self._segment_path(self._active_id), 'ab')
+        self._active_size = self._active.tell()
+        logger.info(f"Segment log loaded: {len(self._index)} users, {replayed} records replayed")
+
+    def _load_snapshot(self, segment_ids):
+        with open(self._snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {snapshot['version']}")
+        first_id, last_id = snapshot["segments"]
+        if any(s not in segment_ids for s in range(first_id, last_id + 1)):
+            raise ValueError("snapshot references missing segments")
+        self._first_id = first_id
+
+        for user_id, (messages, profile) in snapshot["users"].items():
+            entry = _UserIndex(self.history_size)
+            entry.messages.extend(messages)
+            entry.profile = profile
+            self._index[user_id] = entry
+        self._total_records = snapshot["total_records"]
+        self._dead_records = snapshot["dead_records"]
+        return snapshot["segment"], snapshot["offset"]
+
+    def _replay_segment(self, segment_id, offset):
+        """Index records from offset to the end of a segment"""
+        path = self._segment_path(segment_id)
+        replayed = 0
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                (length,) = RECORD_HEADER.unpack(header)
+                body = f.read(length)
+                if len(body) < length:
+                    break
+                record = json.loads(body)
+                self._index_record(record["u"], record["t"], self._position(segment_id, offset))
+                offset += RECORD_HEADER.size + length
+                replayed += 1
+
+        if offset < os.path.getsize(path):
+            logger.warning(f"Truncating torn record at {path}:{offset}")
+            with open(path, 'r+b') as f:
+                f.truncate(offset)
+        return replayed
+
+    def _index_record(self, user_id, kind, position):
+        entry = self._index.get(user_id)
+        if entry is None:
+            entry = self._index[user_id] = _UserIndex(self.history_size)
+        if kind == 'm':
+            if len(entry.messages) == entry.messages.maxlen:
+                self._dead_records += 1
+            entry.messages.append(position)
+        elif kind == 'p':
+            if entry.profile is not None:
+                self._dead_records += 1
+            entry.profile = position
+        self._total_records += 1
+
+    # Reads and writes
+
+    def _write(self, user_id, kind, data):
+        body = json.dumps({"u": user_id, "t": kind, "d": data}, separators=(',', ':')).encode('utf-8')
+        if self._active_size + len(body) > self.segment_bytes and self._active_size > 0:
+            self._roll_segment()
+        position = self._position(self._active_id, self._active_size)
+        self._active.write(RECORD_HEADER.pack(len(body)) + body)
+        self._active.flush()
+        if self.fsync:
+            os.fsync(self._active.fileno())
+        self._active_size += RECORD_HEADER.size + len(body)
+        self._index_record(user_id, kind, position)
+        self._unsnapshotted += 1
+
+    def _roll_segment(self):
+        self._active.close()
+        self._active_id += 1
+        self._active = open(self._segment_path(self._active_id), 'ab')
+        self._active_size = 0
+
+    def _map(self, segment_id, end):
+        """Return an mmap of a segment that covers at least end bytes"""
+        mapped = self._maps.get(segment_id)
+        if mapped is None or len(mapped) < end:
+            if mapped is not None:
+                mapped.close()
+            with open(self._segment_path(segment_id), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment_id] = mapped
+        return mapped
+
+    def _read(self, position):
+        segment_id = position >> SEGMENT_SHIFT
+        offset = position & ((1 << SEGMENT_SHIFT) - 1)
+        mapped = self._map(segment_id, offset + RECORD_HEADER.size)
+        (length,) = RECORD_HEADER.unpack_from(mapped, offset)
+        start = offset + RECORD_HEADER.size
+        mapped = self._map(segment_id, start + length)
+        return json.loads(mapped[start:start + length])["d"]
+
+    def has_user(self, user_id):
+        return user_id in self._index
+
+    def append_message(self, user_id, message):
+        with self._lock:
+            self._write(user_id, 'm', message)
+
+    def read_history(self, user_id, limit=None):
+        with self._lock:
+            entry = self._index.get(user_id)
+            if entry is None:
+                return []
+            positions = list(entry.messages)
+            if limit:
+                positions = positions[-limit:]
+            return [self._read(position) for position in positions]
+
+    def history_length(self, user_id):
+        entry = self._index.get(user_id)
+        return len(entry.messages) if entry is not None else 0
+
+    def save_profile(self, user_id, profile):
+        with self._lock:
+            self._write(user_id, 'p', profile)
+
+    def load_profile(self, user_id):
+        with self._lock:
+            entry = self._index.get(user_id)
+            if entry is None or entry.profile is None:
+                return None
+            return self._read(entry.profile)
+
+    # Maintenance
+
+    def snapshot(self):
+        """Write the index and the log position it covers"""
+        with self._lock:
+            if self._unsnapshotted == 0 and os.path.exists(self._snapshot_path):
+                return
+            snapshot = {
+                "version": SNAPSHOT_VERSION,
+                "segments": [self._first_id, self._active_id],
+                "segment": self._active_id,
+                "offset": self._active_size,
+                "total_records": self._total_records,
+                "dead_records": self._dead_records,
+                "users": {
+                    user_id: [list(entry.messages), entry.profile]
+                    for user_id, entry in self._index.items()
+                }
+            }
+            temp_path = self._snapshot_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self._snapshot_path)
+            self._unsnapshotted = 0
+
+    def needs_compaction(self):
+        return (self._total_records >= self.compact_min_records
+                and self._dead_records > self._total_records * self.compact_ratio)
+
+    def compact(self):
+        """Rewrite live records into one new segment and drop the old ones"""
+        with self._lock:
+            old_ids = list(range(self._first_id, self._active_id + 1))
+            records = []
+            for user_id, entry in self._index.items():
+                for position in entry.messages:
+                    records.append((user_id, 'm', self._read(position)))
+                if entry.profile is not None:
+                    records.append((user_id, 'p', self._read(entry.profile)))
+
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps = {}
+            self._active.close()
+
+            # Write the compacted segment under a temporary name. The new
+            # snapshot is written before the rename, so after a crash either
+            # the snapshot is unusable and the old segments are replayed, or
+            # the new segment exists and the old ones are dropped on load.
+            new_id = self._active_id + 1
+            final_path = self._segment_path(new_id)
+            temp_path = final_path + '.tmp'
+            self._index = {}
+            self._total_records = 0
+            self._dead_records = 0
+            self._first_id = self._active_id = new_id
+            self._active = open(temp_path, 'wb')
+            self._active_size = 0
+            for user_id, kind, data in records:
+                body = json.dumps({"u": user_id, "t": kind, "d": data}, separators=(',', ':')).encode('utf-8')
+                self._active.write(RECORD_HEADER.pack(len(body)) + body)
+                self._index_record(user_id, kind, self._position(new_id, self._active_size))
+                self._active_size += RECORD_HEADER.size + len(body)
+            self._active.flush()
+            os.fsync(self._active.fileno())
+            self._active.close()
+
+            self._unsnapshotted = 1
+            self.snapshot()
+            os.replace(temp_path, final_path)
+            for segment_id in old_ids:
+                path = self._segment_path(segment_id)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._active = open(final_path, 'ab')
+            logger.info(f"Segment log compacted: {len(records)} live records")
+
+    def maintenance(self):
+        if self.needs_compaction():
+            self.compact()
+        else:
+            self.snapshot()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self.snapshot()
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps = {}
+            self._active.close()
+
+
+class SQLiteBackend(PersistenceBackend):
+    """SQLite storage in WAL mode"""
+
+    def __init__(self, path, history_size=50):
+        """Open or create the database at path"""
+        super().__init__()
+        self.path = path
+        self.history_size = history_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS messages_user ON messages (user_id, id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+
+    def has_user(self, user_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM messages WHERE user_id = ? "
+                "UNION ALL SELECT 1 FROM profiles WHERE user_id = ? LIMIT 1",
+                (user_id, user_id)
+            ).fetchone()
+        return row is not None
+
+    def append_message(self, user_id, message):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO messages (user_id, data) VALUES (?, ?)",
+                (user_id, json.dumps(message, separators=(',', ':')))
+            )
+
+    def read_history(self, user_id, limit=None):
+        limit = min(limit or self.history_size, self.history_size)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def history_length(self, user_id):
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return min(count, self.history_size)
+
+    def save_profile(self, user_id, profile):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, data) VALUES (?, ?)",
+                (user_id, json.dumps(profile, separators=(',', ':')))
+            )
+
+    def load_profile(self, user_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM profiles WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def compact(self):
+        """Delete messages older than the last history_size per user"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM messages WHERE id IN ("
+                "SELECT id FROM (SELECT id, ROW_NUMBER() OVER "
+                "(PARTITION BY user_id ORDER BY id DESC) AS rank FROM messages) "
+                "WHERE rank > ?)",
+                (self.history_size,)
+            )
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def snapshot(self):
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def maintenance(self):
+        self.compact()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._conn.close()
+
+
+def create_backend(kind, location, history_size=50):
+    """Build a persistence backend by name ('log' or 'sqlite'), or None"""
+    if not kind or kind == 'none':
+        return None
+    if kind == 'log':
+        return SegmentLogBackend(location, history_size=history_size)
+    if kind == 'sqlite':
+        os.makedirs(location, exist_ok=True)
+        return SQLiteBackend(os.path.join(location, 'brad.db'), history_size=history_size)
+    raise ValueError(f"Unknown persistence backend: {kind}")
@@ -0,0 +1,149 @@
+import sys
+import time
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def format_timestamp(epoch):
+    """ISO 8601 local time for an epoch timestamp"""
+    return datetime.fromtimestamp(epoch).isoformat()
+
+
+def parse_timestamp(value):
+    """Epoch seconds from an epoch number or an ISO 8601 string"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class Message:
+    """One history entry.
+
+    A slotted record instead of a dict of four strings: the timestamp is a
+    float of epoch seconds, formatted only when the entry is serialized,
+    and role and model id are interned so every entry shares one copy.
+    """
+
+    __slots__ = ('role', 'message', 'timestamp', 'model')
+
+    def __init__(self, role, message, timestamp=None, model=None):
+        self.role = sys.intern(role)
+        self.message = message
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.model = sys.intern(model) if model is not None else None
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (self.timestamp, self.role, self.model, self.message) == \
+            (other.timestamp, other.role, other.model, other.message)
+
+    def __hash__(self):
+        return hash((self.timestamp, self.message))
+
+    def __repr__(self):
+        return f"Message({self.role!r}, {self.message[:40]!r}, {self.timestamp!r}, {self.model!r})"
+
+    def to_dict(self, raw=False):
+        """API form; with raw, keep the epoch timestamp for storage"""
+        return {
+            "role": self.role,
+            "message": self.message,
+            "timestamp": self.timestamp if raw else format_timestamp(self.timestamp),
+            "model": self.model
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["role"], data["message"], parse_timestamp(data["timestamp"]), data.get("model"))
+
+
+# Topics a profile keeps counts for
+TOPIC_CAPACITY = 32
+
+
+class BoundedCounter:
+    """Frequency counter that tracks at most capacity keys.
+
+    When a new key arrives at capacity, it replaces the least frequent key
+    and inherits its count plus one (the space-saving heavy-hitters rule),
+    so frequent keys stay tracked without the counter growing.
+    """
+
+    __slots__ = ('capacity', 'counts')
+
+    def __init__(self, capacity=TOPIC_CAPACITY, counts=None):
+        self.capacity = capacity
+        self.counts = dict(counts) if counts else {}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, keys):
+        counts = self.counts
+        for key in keys:
+            if key in counts:
+                counts[key] += 1
+            elif len(counts) < self.capacity:
+                counts[key] = 1
+            else:
+                least = min(counts, key=counts.get)
+                counts[key] = counts.pop(least) + 1
+
+    def most_common(self, n=None):
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n] if n is not None else ranked
+
+
+class Profile:
+    """Per-user interaction summary"""
+
+    __slots__ = ('interaction_count', 'topics', 'average_sentiment', 'preferred_model', 'last_interaction')
+
+    # Number of topics reported in the API form
+    TOP_TOPICS = 10
+
+    def __init__(self, interaction_count=0, topics=None, average_sentiment=0, preferred_model=None,
+                 last_interaction=None):
+        self.interaction_count = interaction_count
+        self.topics = BoundedCounter(counts=topics)
+        self.average_sentiment = average_sentiment
+        self.preferred_model = preferred_model
+        self.last_interaction = time.time() if last_interaction is None else last_interaction
+
+    def record(self, ml_features, now=None):
+        """Count one interaction and fold in its topics and sentiment"""
+        self.interaction_count += 1
+        self.last_interaction = time.time() if now is None else now
+        if 'topics' in ml_features:
+            self.topics.update(ml_features['topics'])
+        if 'sentiment_score' in ml_features:
+            count = self.interaction_count
+            self.average_sentiment = (self.average_sentiment * (count - 1) + ml_features['sentiment_score']) / count
+
+    def to_dict(self, raw=False):
+        """API form; with raw, keep topic counts and the epoch timestamp for storage"""
+        return {
+            "interaction_count": self.interaction_count,
+            "topics": (dict(self.topics.counts) if raw
+                       else [topic for topic, _ in self.topics.most_common(self.TOP_TOPICS)]),
+            "average_sentiment": self.average_sentiment,
+            "preferred_model": self.preferred_model,
+            "last_interaction": self.last_interaction if raw else format_timestamp(self.last_interaction)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        topics = data.get("topics") or {}
+        if isinstance(topics, list):
+            # Profiles saved before topics were counted
+            topics = dict.fromkeys(topics, 1)
+        return cls(
+            interaction_count=data.get("interaction_count", 0),
+            topics=topics,
+            average_sentiment=data.get("average_sentiment", 0),
+            preferred_model=data.get("preferred_model"),
+            last_interaction=parse_timestamp(data["last_interaction"]) if "last_interaction" in data else None
+        )
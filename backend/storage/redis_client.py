@@ -0,0 +1,196 @@
+import bisect
+import hashlib
+import socket
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RedisError(Exception):
+    """An error reply from the server, or a client-side failure"""
+
+
+class RedisConnection:
+    """One socket speaking the Redis protocol (RESP2).
+
+    execute sends a single command and raises error replies. pipeline
+    writes many commands in one send and reads all replies back, returning
+    error replies as RedisError instances in their place.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, timeout=5.0):
+        """Connect and select db"""
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    @staticmethod
+    def _encode(command):
+        parts = [b'*%d\r\n' % len(command)]
+        for arg in command:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif isinstance(arg, (int, float)):
+                arg = repr(arg).encode('ascii')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            return RedisError(rest.decode('utf-8'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) < length + 2:
+                raise ConnectionError("Connection closed by server")
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply type {kind!r}")
+
+    def execute(self, *command):
+        self._sock.sendall(self._encode(command))
+        reply = self._read_reply()
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    def pipeline(self, commands):
+        self._sock.sendall(b''.join(self._encode(command) for command in commands))
+        return [self._read_reply() for _ in commands]
+
+    def close(self):
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of connections to one server.
+
+    Idle connections are reused most recently returned first. A connection
+    that fails with anything other than an error reply is dropped rather
+    than returned, since its protocol state is unknown.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, max_connections=16, timeout=5.0):
+        """Initialize an empty pool"""
+        self.host = host
+        self.port = port
+        self.db = db
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.discarded = 0
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Pool for a redis://host:port/db URL"""
+        parsed = urlparse(url)
+        if parsed.scheme != 'redis':
+            raise ValueError(f"Unsupported state URL: {url}")
+        db = int(parsed.path.lstrip('/') or 0)
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379, db, **kwargs)
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}/{self.db}"
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, waiting up to timeout for a free slot"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RedisError(f"No free connection to {self.address} within {self.timeout}s")
+        connection = None
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = RedisConnection(self.host, self.port, self.db, self.timeout)
+                self.created += 1
+            yield connection
+        except RedisError:
+            raise
+        except BaseException:
+            if connection is not None:
+                connection.close()
+                connection = None
+                self.discarded += 1
+            raise
+        finally:
+            if connection is not None:
+                with self._lock:
+                    self._idle.append(connection)
+            self._slots.release()
+
+    def execute(self, *command):
+        with self.connection() as connection:
+            return connection.execute(*command)
+
+    def pipeline(self, commands):
+        with self.connection() as connection:
+            return connection.pipeline(commands)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+        return {
+            "address": self.address,
+            "max_connections": self.max_connections,
+            "idle": idle,
+            "created": self.created,
+            "discarded": self.discarded
+        }
+
+
+def _ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hashing of keys onto nodes.
+
+    Each node is placed at replicas points on a 64-bit ring and a key
+    belongs to the first point at or after its hash, so adding or removing
+    a node only moves the keys of the arcs it gains or loses.
+    """
+
+    def __init__(self, nodes, replicas=64):
+        """Place nodes on the ring"""
+        if not nodes:
+            raise ValueError("HashRing needs at least one node")
+        points = sorted((_ring_hash(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas))
+        self.nodes = list(nodes)
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def node(self, key):
+        index = bisect.bisect_left(self._hashes, _ring_hash(key))
+        return self._owners[index % len(self._owners)]
@@ -0,0 +1,443 @@
+"""Minimal in-memory server speaking the Redis protocol.
+
+A local stand-in for a Redis server, covering the commands the shared
+state backend uses: strings, lists, hashes and sorted sets with key
+expiry, MULTI/EXEC transactions and a few admin commands. It is meant
+for development and load tests, not production.
+
+Run from the backend directory:
+    python -m storage.resp_server --port 6380
+"""
+import argparse
+import fnmatch
+import math
+import socket
+import socketserver
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CommandError(Exception):
+    """Sent back to the client as an error reply"""
+
+
+class _Nil:
+    """Null reply of a given RESP type"""
+
+    def __init__(self, encoded):
+        self.encoded = encoded
+
+
+NIL = _Nil(b'$-1\r\n')
+QUEUED = 'QUEUED'
+OK = 'OK'
+
+
+def encode_reply(reply):
+    if isinstance(reply, _Nil):
+        return reply.encoded
+    if reply is None:
+        return NIL.encoded
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode('utf-8')
+    if isinstance(reply, CommandError):
+        return b'-%s\r\n' % str(reply).encode('utf-8')
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, bytes):
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(encode_reply(item) for item in reply)
+    raise TypeError(f"Cannot encode {type(reply).__name__}")
+
+
+def _score(value):
+    text = value.decode('ascii').lower()
+    if text in ('-inf', '+inf', 'inf'):
+        return -math.inf if text == '-inf' else math.inf
+    if text.startswith('('):
+        raise CommandError("ERR exclusive ranges are not supported")
+    return float(text)
+
+
+class _Hash(dict):
+    """Field -> value"""
+
+
+class _SortedSet(dict):
+    """Member -> score"""
+
+
+def _number(value):
+    """Format a float reply, without a trailing .0 for whole numbers"""
+    if value.is_integer() and abs(value) < 1e17:
+        return b'%d' % value
+    return repr(value).encode('ascii')
+
+
+class Keyspace:
+    """The data and expiry deadlines behind one server"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    def _alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            del self.data[key]
+            del self.expires[key]
+        return key in self.data
+
+    def _get(self, key, kind):
+        if not self._alive(key):
+            return None
+        value = self.data[key]
+        if not isinstance(value, kind):
+            raise CommandError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def knows(self, name):
+        return hasattr(self, f'cmd_{name.lower()}')
+
+    def execute(self, name, args):
+        """Run one command; the caller holds lock"""
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            raise CommandError(f"ERR unknown command '{name}'")
+        return handler(*args)
+
+    # Connection and admin
+
+    def cmd_ping(self, message=None):
+        return message if message is not None else 'PONG'
+
+    def cmd_echo(self, message):
+        return message
+
+    def cmd_select(self, db):
+        return OK
+
+    def cmd_dbsize(self):
+        return sum(1 for key in list(self.data) if self._alive(key))
+
+    def cmd_keys(self, pattern):
+        pattern = pattern.decode('utf-8')
+        return [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key.decode('utf-8'), pattern)]
+
+    def cmd_flushdb(self, *args):
+        self.data.clear()
+        self.expires.clear()
+        return OK
+
+    cmd_flushall = cmd_flushdb
+
+    # Keys and strings
+
+    def cmd_get(self, key):
+        return self._get(key, bytes)
+
+    def cmd_set(self, key, value, *options):
+        ttl = None
+        options = [option.upper() for option in options]
+        if len(options) == 2 and options[0] in (b'EX', b'PX'):
+            ttl = int(options[1]) / (1 if options[0] == b'EX' else 1000)
+        elif options:
+            raise CommandError("ERR unsupported SET options")
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if ttl is not None:
+            self.expires[key] = time.monotonic() + ttl
+        return OK
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def cmd_pexpire(self, key, milliseconds):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(milliseconds) / 1000
+        return 1
+
+    def cmd_expire(self, key, seconds):
+        return self.cmd_pexpire(key, int(seconds) * 1000)
+
+    # Lists
+
+    def cmd_rpush(self, key, *values):
+        items = self._get(key, list)
+        if items is None:
+            items = self.data[key] = []
+        items.extend(values)
+        return len(items)
+
+    @staticmethod
+    def _range(length, start, stop):
+        start, stop = int(start), int(stop)
+        if start < 0:
+            start = max(length + start, 0)
+        if stop < 0:
+            stop = length + stop
+        return start, max(min(stop, length - 1) + 1, start)
+
+    def cmd_lrange(self, key, start, stop):
+        items = self._get(key, list) or []
+        start, end = self._range(len(items), start, stop)
+        return items[start:end]
+
+    def cmd_ltrim(self, key, start, stop):
+        items = self._get(key, list)
+        if items is not None:
+            start, end = self._range(len(items), start, stop)
+            items[:] = items[start:end]
+            if not items:
+                del self.data[key]
+                self.expires.pop(key, None)
+        return OK
+
+    def cmd_llen(self, key):
+        items = self._get(key, list)
+        return len(items) if items is not None else 0
+
+    # Hashes
+
+    def _hash(self, key):
+        fields = self._get(key, _Hash)
+        if fields is None:
+            fields = self.data[key] = _Hash()
+        return fields
+
+    def cmd_hset(self, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise CommandError("ERR wrong number of arguments for 'hset' command")
+        fields = self._hash(key)
+        added = 0
+        for index in range(0, len(pairs), 2):
+            added += pairs[index] not in fields
+            fields[pairs[index]] = pairs[index + 1]
+        return added
+
+    def cmd_hgetall(self, key):
+        fields = self._get(key, _Hash) or {}
+        return [item for pair in fields.items() for item in pair]
+
+    def cmd_hincrby(self, key, field, increment):
+        fields = self._hash(key)
+        value = int(fields.get(field, b'0')) + int(increment)
+        fields[field] = b'%d' % value
+        return value
+
+    def cmd_hincrbyfloat(self, key, field, increment):
+        fields = self._hash(key)
+        fields[field] = _number(float(fields.get(field, b'0')) + float(increment))
+        return fields[field]
+
+    # Sorted sets
+
+    def _sorted_set(self, key):
+        members = self._get(key, _SortedSet)
+        if members is None:
+            members = self.data[key] = _SortedSet()
+        return members
+
+    def _drop_if_empty(self, key, members):
+        """Redis deletes a sorted set once its last member is removed"""
+        if not members:
+            del self.data[key]
+            self.expires.pop(key, None)
+
+    def _ranked(self, members):
+        return sorted(members.items(), key=lambda item: (item[1], item[0]))
+
+    def cmd_zadd(self, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise CommandError("ERR syntax error")
+        members = self._sorted_set(key)
+        added = 0
+        for index in range(0, len(pairs), 2):
+            member = pairs[index + 1]
+            added += member not in members
+            members[member] = float(pairs[index])
+        return added
+
+    def cmd_zincrby(self, key, increment, member):
+        members = self._sorted_set(key)
+        members[member] = members.get(member, 0.0) + float(increment)
+        return _number(members[member])
+
+    def cmd_zcount(self, key, low, high):
+        members = self._get(key, _SortedSet) or {}
+        low, high = _score(low), _score(high)
+        return sum(1 for score in members.values() if low <= score <= high)
+
+    def cmd_zrevrange(self, key, start, stop, *options):
+        members = self._get(key, _SortedSet) or {}
+        ranked = self._ranked(members)[::-1]
+        start, end = self._range(len(ranked), start, stop)
+        if [option.upper() for option in options] == [b'WITHSCORES']:
+            return [item for member, score in ranked[start:end] for item in (member, _number(score))]
+        return [member for member, _ in ranked[start:end]]
+
+    def cmd_zremrangebyrank(self, key, start, stop):
+        members = self._get(key, _SortedSet)
+        if members is None:
+            return 0
+        ranked = self._ranked(members)
+        start, end = self._range(len(ranked), start, stop)
+        for member, _ in ranked[start:end]:
+            del members[member]
+        self._drop_if_empty(key, members)
+        return end - start
+
+    def cmd_zremrangebyscore(self, key, low, high):
+        members = self._get(key, _SortedSet)
+        if members is None:
+            return 0
+        low, high = _score(low), _score(high)
+        doomed = [member for member, score in members.items() if low <= score <= high]
+        for member in doomed:
+            del members[member]
+        self._drop_if_empty(key, members)
+        return len(doomed)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection, with its MULTI state"""
+
+    def setup(self):
+        super().setup()
+        # Pipelined replies are written one by one; do not let Nagle hold them
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            # Inline command, as typed into telnet
+            return line.split()
+        command = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            command.append(self.rfile.read(length + 2)[:-2])
+        return command
+
+    def handle(self):
+        keyspace = self.server.keyspace
+        queued = None
+        aborted = False
+        while True:
+            try:
+                command = self._read_command()
+            except (OSError, ValueError):
+                return
+            if not command:
+                return
+            name = command[0].decode('utf-8').upper()
+            args = command[1:]
+
+            if name == 'QUIT':
+                self.wfile.write(encode_reply(OK))
+                return
+            if name == 'MULTI':
+                reply = CommandError("ERR MULTI calls can not be nested") if queued is not None else OK
+                if queued is None:
+                    queued, aborted = [], False
+            elif name == 'DISCARD':
+                reply = OK if queued is not None else CommandError("ERR DISCARD without MULTI")
+                queued = None
+            elif name == 'EXEC':
+                if queued is None:
+                    reply = CommandError("ERR EXEC without MULTI")
+                elif aborted:
+                    reply = CommandError("EXECABORT Transaction discarded because of previous errors.")
+                    queued = None
+                else:
+                    with keyspace.lock:
+                        reply = [self._run(keyspace, *item) for item in queued]
+                    queued = None
+            elif queued is not None:
+                # Like Redis, unknown commands are rejected when queued and abort the transaction
+                if keyspace.knows(name):
+                    queued.append((name, args))
+                    reply = QUEUED
+                else:
+                    reply = CommandError(f"ERR unknown command '{name}'")
+                    aborted = True
+            else:
+                with keyspace.lock:
+                    reply = self._run(keyspace, name, args)
+            try:
+                self.wfile.write(encode_reply(reply))
+            except OSError:
+                return
+
+    @staticmethod
+    def _run(keyspace, name, args):
+        try:
+            return keyspace.execute(name, args)
+        except CommandError as e:
+            return e
+        except (TypeError, ValueError):
+            return CommandError(f"ERR wrong arguments for '{name}' command")
+
+
+class RESPServer(socketserver.ThreadingTCPServer):
+    """Threaded server; every command runs under one keyspace lock"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        """Bind to host:port (port 0 picks a free port)"""
+        super().__init__((host, port), _Handler)
+        self.keyspace = Keyspace()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        """Serve on a daemon thread"""
+        thread = threading.Thread(target=self.serve_forever, name='resp-server', daemon=True)
+        thread.start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6380)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = RESPServer(args.host, args.port)
+    logger.info(f"Serving on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
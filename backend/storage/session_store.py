@@ -0,0 +1,234 @@
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from storage.records import Message, Profile
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """Conversation state for a single user"""
+
+    __slots__ = ('user_id', 'history', 'profile', 'last_access', 'history_bytes')
+
+    def __init__(self, user_id, history_size):
+        self.user_id = user_id
+        self.history = deque(maxlen=history_size)
+        self.profile = None
+        self.last_access = time.monotonic()
+        self.history_bytes = 0
+
+
+class SessionStore:
+    """Bounded, thread-safe store for conversation history and user profiles.
+
+    Sessions are kept in least-recently-used order and evicted when the user
+    cap is reached or when they have been idle for longer than the TTL. The
+    session map is guarded by one short-lived lock; read-modify-write work on
+    a single user's state is serialized with a striped per-user lock.
+
+    With a persistence backend, messages and profiles are written through to
+    it and evicted sessions are rehydrated from it on their next access.
+    """
+
+    def __init__(self, max_users=10000, ttl_seconds=3600, history_size=50, lock_stripes=64,
+                 persistence=None):
+        """Initialize the session store"""
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.history_size = history_size
+        self.persistence = persistence
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._user_locks = [threading.RLock() for _ in range(lock_stripes)]
+        self._history_bytes = 0
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+        self._maintenance_stop = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, user_id):
+        return user_id in self._sessions or (
+            self.persistence is not None and self.persistence.has_user(user_id)
+        )
+
+    def user_lock(self, user_id):
+        """Return the lock that serializes updates for a user"""
+        return self._user_locks[hash(user_id) % len(self._user_locks)]
+
+    def _expire(self, now):
+        """Drop idle sessions from the least-recently-used end"""
+        if not self.ttl_seconds:
+            return
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_access <= self.ttl_seconds:
+                break
+            self._remove(session.user_id)
+            self.ttl_evictions += 1
+
+    def _remove(self, user_id):
+        session = self._sessions.pop(user_id)
+        self._history_bytes -= session.history_bytes
+        return session
+
+    def _session(self, user_id, create):
+        """Look up a session, refreshing its LRU position"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(user_id)
+            if session is not None:
+                self._sessions.move_to_end(user_id)
+                session.last_access = now
+                return session
+
+        # Rehydrate from persistence outside the map lock
+        restored = None
+        if self.persistence is not None and self.persistence.has_user(user_id):
+            restored = Session(user_id, self.history_size)
+            for data in self.persistence.read_history(user_id, self.history_size):
+                message = Message.from_dict(data)
+                restored.history.append(message)
+                restored.history_bytes += _message_size(message)
+            profile = self.persistence.load_profile(user_id)
+            restored.profile = Profile.from_dict(profile) if profile is not None else None
+        elif not create:
+            return None
+
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                while len(self._sessions) >= self.max_users:
+                    self._remove(next(iter(self._sessions)))
+                    self.lru_evictions += 1
+                session = restored or Session(user_id, self.history_size)
+                self._sessions[user_id] = session
+                self._history_bytes += session.history_bytes
+            else:
+                self._sessions.move_to_end(user_id)
+            session.last_access = now
+            return session
+
+    def append_message(self, user_id, message):
+        """Append a Message to a user's history ring buffer"""
+        size = _message_size(message)
+        with self.user_lock(user_id):
+            while True:
+                session = self._session(user_id, create=True)
+                with self._lock:
+                    # Another user's insert may have evicted the session since
+                    # the lookup; appending to it would lose the message
+                    if self._sessions.get(user_id) is not session:
+                        continue
+                    history = session.history
+                    dropped = _message_size(history[0]) if len(history) == history.maxlen else 0
+                    history.append(message)
+                    session.history_bytes += size - dropped
+                    self._history_bytes += size - dropped
+                    break
+            if self.persistence is not None:
+                self.persistence.append_message(user_id, message.to_dict(raw=True))
+
+    def record_turn(self, user_id, messages, ml_features, now=None):
+        """Append messages and record the interaction in the user's profile"""
+        with self.user_lock(user_id):
+            for message in messages:
+                self.append_message(user_id, message)
+            profile = self.get_or_create_profile(user_id, Profile)
+            profile.record(ml_features, now)
+            self.save_profile(user_id)
+
+    def get_history(self, user_id, limit=None):
+        """Return a copy of the most recent messages for a user"""
+        session = self._session(user_id, create=False)
+        if session is None:
+            return []
+        with self.user_lock(user_id):
+            history = list(session.history)
+        return history[-limit:] if limit else history
+
+    def history_length(self, user_id):
+        """Number of stored messages for a user"""
+        session = self._session(user_id, create=False)
+        return len(session.history) if session is not None else 0
+
+    def get_profile(self, user_id):
+        """Return a user's profile, or None if there is none"""
+        session = self._session(user_id, create=False)
+        return session.profile if session is not None else None
+
+    def get_or_create_profile(self, user_id, factory):
+        """Return a user's profile, creating it with factory() if missing.
+
+        Callers that modify the profile should hold user_lock(user_id).
+        """
+        with self.user_lock(user_id):
+            session = self._session(user_id, create=True)
+            if session.profile is None:
+                session.profile = factory()
+            return session.profile
+
+    def save_profile(self, user_id):
+        """Write a user's current profile through to persistence"""
+        if self.persistence is None:
+            return
+        with self.user_lock(user_id):
+            profile = self.get_profile(user_id)
+            if profile is not None:
+                self.persistence.save_profile(user_id, profile.to_dict(raw=True))
+
+    def prune(self):
+        """Drop sessions idle for longer than the TTL"""
+        with self._lock:
+            before = len(self._sessions)
+            self._expire(time.monotonic())
+            return before - len(self._sessions)
+
+    def start_maintenance(self, interval=60):
+        """Run prune() every interval seconds on a daemon thread"""
+        self._maintenance_stop = run_periodically(self.prune, interval, 'session-maintenance')
+
+    def close(self):
+        if self._maintenance_stop is not None:
+            self._maintenance_stop.set()
+
+    def stats(self):
+        """Report occupancy, memory and eviction counters, without expiring sessions"""
+        with self._lock:
+            messages = sum(len(session.history) for session in self._sessions.values())
+            return {
+                "active_users": len(self._sessions),
+                "max_users": self.max_users,
+                "stored_messages": messages,
+                "history_bytes": self._history_bytes,
+                "lru_evictions": self.lru_evictions,
+                "ttl_evictions": self.ttl_evictions
+            }
+
+
+def run_periodically(task, interval, name):
+    """Run task every interval seconds on a daemon thread; set the returned event to stop"""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            try:
+                task()
+            except Exception as e:
+                logger.error(f"Periodic task {name} failed: {str(e)}")
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return stop
+
+
+def _message_size(message):
+    """Approximate memory footprint of a history entry in bytes
+
+    Role and model strings are interned and shared, so they are not counted.
+    """
+    return sys.getsizeof(message) + sys.getsizeof(message.message) + sys.getsizeof(message.timestamp)
@@ -0,0 +1,316 @@
+import json
+import threading
+import time
+from storage.redis_client import ConnectionPool, HashRing, RedisError
+from storage.records import TOPIC_CAPACITY, Message, Profile
+from storage.response_cache import LRUCache
+from storage.session_store import SessionStore, run_periodically
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(',', ':'))
+
+
+class StateBackend:
+    """Where conversation history, profiles and shared caches live.
+
+    The in-process backend keeps everything in this process, so only one
+    worker can serve a user. A networked backend lets any worker or node
+    serve any user.
+    """
+
+    kind = None
+
+    def session_store(self, max_users=10000, ttl_seconds=3600, history_size=50, persistence=None):
+        """The store for conversation history and user profiles"""
+        raise NotImplementedError
+
+    def cache(self, name, max_entries=10000, ttl_seconds=300):
+        """A get/put cache shared by everything using this backend"""
+        raise NotImplementedError
+
+    def stats(self):
+        return {"backend": self.kind}
+
+    def close(self):
+        """Release connections"""
+
+
+class LocalState(StateBackend):
+    """In-process state: a SessionStore and LRU caches"""
+
+    kind = 'local'
+
+    def session_store(self, max_users=10000, ttl_seconds=3600, history_size=50, persistence=None):
+        return SessionStore(
+            max_users=max_users,
+            ttl_seconds=ttl_seconds,
+            history_size=history_size,
+            persistence=persistence
+        )
+
+    def cache(self, name, max_entries=10000, ttl_seconds=300):
+        return LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+
+class RedisState(StateBackend):
+    """State on one or more Redis-protocol servers.
+
+    Each URL gets its own connection pool. With several URLs, user ids and
+    cache keys are spread over the servers with consistent hashing, and
+    all keys of one user live on the same server so a chat turn can be
+    written as one transaction.
+    """
+
+    kind = 'redis'
+
+    def __init__(self, urls, max_connections=16, timeout=5.0, prefix='brad', replicas=64):
+        """Create a pool per server URL"""
+        if isinstance(urls, str):
+            urls = [url.strip() for url in urls.split(',') if url.strip()]
+        self.prefix = prefix
+        self.pools = {
+            url: ConnectionPool.from_url(url, max_connections=max_connections, timeout=timeout)
+            for url in urls
+        }
+        self.ring = HashRing(list(self.pools), replicas=replicas)
+
+    def pool(self, routing_key):
+        """The pool of the server that owns routing_key"""
+        return self.pools[self.ring.node(str(routing_key))]
+
+    def key(self, *parts):
+        return ':'.join((self.prefix,) + tuple(str(part) for part in parts))
+
+    def session_store(self, max_users=10000, ttl_seconds=3600, history_size=50, persistence=None):
+        if persistence is not None:
+            logger.warning("Ignoring the persistence backend: state is kept by the Redis servers")
+        return RemoteSessionStore(self, ttl_seconds=ttl_seconds, history_size=history_size)
+
+    def cache(self, name, max_entries=10000, ttl_seconds=300):
+        # The servers bound the cache with their own memory policy
+        return RemoteCache(self, name, ttl_seconds=ttl_seconds)
+
+    def stats(self):
+        return {"backend": self.kind, "shards": [pool.stats() for pool in self.pools.values()]}
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+
+class RemoteSessionStore:
+    """SessionStore interface over a RedisState.
+
+    A user's history is a list trimmed to history_size entries. Their
+    profile is a hash of counters plus a sorted set of topic counts, so a
+    turn updates it with increments instead of a read-modify-write and
+    concurrent workers never overwrite each other. A user's keys expire
+    after ttl_seconds without activity, and a sorted set per server scores
+    users by their last activity to count active users; prune, run by
+    start_maintenance, trims idle users from it. Nothing is kept
+    in this process, so every worker sees the same state.
+    """
+
+    def __init__(self, state, ttl_seconds=3600, history_size=50, lock_stripes=64):
+        """Initialize the store"""
+        self.state = state
+        self.ttl_seconds = ttl_seconds
+        self.history_size = history_size
+        self._user_locks = [threading.RLock() for _ in range(lock_stripes)]
+        self._maintenance_stop = None
+
+    def _keys(self, user_id):
+        """History, profile and topic keys of a user"""
+        return self.state.key('h', user_id), self.state.key('p', user_id), self.state.key('t', user_id)
+
+    def _expire_commands(self, keys):
+        if not self.ttl_seconds:
+            return []
+        return [('PEXPIRE', key, int(self.ttl_seconds * 1000)) for key in keys]
+
+    def _history_commands(self, user_id, messages, now):
+        history_key = self._keys(user_id)[0]
+        return [
+            ('RPUSH', history_key, *(_dumps(message.to_dict(raw=True)) for message in messages)),
+            ('LTRIM', history_key, -self.history_size, -1),
+            *self._expire_commands([history_key]),
+            ('ZADD', self.state.key('active'), now, user_id)
+        ]
+
+    def _profile_commands(self, user_id, ml_features, now):
+        """Increments matching Profile.record"""
+        _, profile_key, topics_key = self._keys(user_id)
+        commands = [
+            ('HINCRBY', profile_key, 'interaction_count', 1),
+            ('HSET', profile_key, 'last_interaction', repr(now))
+        ]
+        if 'sentiment_score' in ml_features:
+            commands.append(('HINCRBYFLOAT', profile_key, 'sentiment_total', float(ml_features['sentiment_score'])))
+        topics = ml_features.get('topics') or []
+        for topic in topics:
+            commands.append(('ZINCRBY', topics_key, 1, topic))
+        if topics:
+            # Keep the most frequent topics, as the in-process BoundedCounter does
+            commands.append(('ZREMRANGEBYRANK', topics_key, 0, -(TOPIC_CAPACITY + 1)))
+        return commands + self._expire_commands([profile_key, topics_key])
+
+    def _write(self, user_id, commands):
+        """Run commands as one MULTI/EXEC transaction in a single round trip"""
+        replies = self.state.pool(user_id).pipeline([('MULTI',), *commands, ('EXEC',)])
+        # A command rejected while queued is reported there, and EXEC then
+        # fails with EXECABORT; report the rejection, which says what was wrong
+        for reply in replies[:-1]:
+            if isinstance(reply, RedisError):
+                raise reply
+        if isinstance(replies[-1], RedisError):
+            raise replies[-1]
+        for reply in replies[-1] or []:
+            if isinstance(reply, RedisError):
+                raise reply
+
+    def __len__(self):
+        """Users active within the TTL"""
+        low = time.time() - self.ttl_seconds if self.ttl_seconds else '-inf'
+        return sum(
+            pool.execute('ZCOUNT', self.state.key('active'), low, '+inf')
+            for pool in self.state.pools.values()
+        )
+
+    def __contains__(self, user_id):
+        return self.state.pool(user_id).execute('EXISTS', *self._keys(user_id)[:2]) > 0
+
+    def user_lock(self, user_id):
+        """Return the lock that serializes reads of a user within this process"""
+        return self._user_locks[hash(user_id) % len(self._user_locks)]
+
+    def append_message(self, user_id, message):
+        """Append a Message to a user's history"""
+        self._write(user_id, self._history_commands(user_id, [message], time.time()))
+
+    def record_turn(self, user_id, messages, ml_features, now=None):
+        """Append messages and record the interaction in the profile, in one round trip"""
+        now = time.time() if now is None else now
+        commands = self._history_commands(user_id, messages, now) if messages else []
+        self._write(user_id, commands + self._profile_commands(user_id, ml_features, now))
+
+    def get_history(self, user_id, limit=None):
+        """Return the most recent messages for a user"""
+        limit = min(limit or self.history_size, self.history_size)
+        entries = self.state.pool(user_id).execute('LRANGE', self._keys(user_id)[0], -limit, -1)
+        return [Message.from_dict(json.loads(entry)) for entry in entries]
+
+    def history_length(self, user_id):
+        """Number of stored messages for a user"""
+        return self.state.pool(user_id).execute('LLEN', self._keys(user_id)[0])
+
+    def get_profile(self, user_id):
+        """Return a copy of a user's profile, or None if there is none"""
+        _, profile_key, topics_key = self._keys(user_id)
+        fields, topics = self.state.pool(user_id).pipeline([
+            ('HGETALL', profile_key),
+            ('ZREVRANGE', topics_key, 0, -1, 'WITHSCORES')
+        ])
+        for reply in (fields, topics):
+            if isinstance(reply, RedisError):
+                raise reply
+        if not fields:
+            return None
+        fields = {fields[index].decode('utf-8'): fields[index + 1] for index in range(0, len(fields), 2)}
+        count = int(fields['interaction_count'])
+        return Profile(
+            interaction_count=count,
+            topics={topics[index].decode('utf-8'): int(float(topics[index + 1])) for index in range(0, len(topics), 2)},
+            average_sentiment=float(fields.get('sentiment_total', 0)) / count if count else 0,
+            last_interaction=float(fields['last_interaction'])
+        )
+
+    def prune(self):
+        """Drop users idle for longer than the TTL from the activity sets"""
+        if not self.ttl_seconds:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        return sum(
+            pool.execute('ZREMRANGEBYSCORE', self.state.key('active'), '-inf', cutoff)
+            for pool in self.state.pools.values()
+        )
+
+    def start_maintenance(self, interval=60):
+        """Run prune() every interval seconds on a daemon thread"""
+        self._maintenance_stop = run_periodically(self.prune, interval, 'session-maintenance')
+
+    def close(self):
+        if self._maintenance_stop is not None:
+            self._maintenance_stop.set()
+
+    def stats(self):
+        """Report active users and connection pools, without writing"""
+        return dict(self.state.stats(), active_users=len(self), history_size=self.history_size)
+
+
+class RemoteCache:
+    """LRUCache interface over a RedisState; values must be JSON-serializable"""
+
+    def __init__(self, state, name, ttl_seconds=300):
+        """Initialize the cache"""
+        self.state = state
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return self.state.key('c', self.name, key.hex() if isinstance(key, bytes) else str(key))
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss"""
+        redis_key = self._key(key)
+        data = self.state.pool(redis_key).execute('GET', redis_key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return json.loads(data)
+
+    def put(self, key, value):
+        """Store value under key with the cache TTL"""
+        redis_key = self._key(key)
+        command = ('SET', redis_key, _dumps(value))
+        if self.ttl_seconds:
+            command += ('PX', int(self.ttl_seconds * 1000))
+        self.state.pool(redis_key).execute(*command)
+
+    def clear(self):
+        """Delete every entry of this cache on every server"""
+        pattern = self.state.key('c', self.name, '*')
+        for pool in self.state.pools.values():
+            keys = pool.execute('KEYS', pattern)
+            if keys:
+                pool.execute('DEL', *keys)
+
+    def stats(self):
+        """Report hit/miss counters of this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.state.kind,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0
+            }
+
+
+def create_state(kind, urls=None, **kwargs):
+    """Build a state backend by name ('local' or 'redis')"""
+    if not kind or kind == 'local':
+        return LocalState()
+    if kind == 'redis':
+        if not urls:
+            raise ValueError("The redis state backend needs at least one server URL")
+        return RedisState(urls, **kwargs)
+    raise ValueError(f"Unknown state backend: {kind}")
@@ -0,0 +1,275 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores, best first"""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class VectorIndex:
+    """Brute-force inner-product index over a contiguous float32 matrix.
+
+    Rows are appended to a matrix that grows by doubling. With a capacity
+    the matrix becomes a ring buffer and new rows overwrite the oldest.
+    """
+
+    def __init__(self, dim, capacity=None, initial_rows=16):
+        """Initialize an empty index"""
+        self.dim = dim
+        self.capacity = capacity
+        rows = min(initial_rows, capacity) if capacity else initial_rows
+        self._matrix = np.empty((rows, dim), dtype=np.float32)
+        self._payloads = [None] * rows
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._matrix.nbytes
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if self.capacity:
+            needed = min(needed, self.capacity)
+        rows = len(self._matrix)
+        if needed <= rows:
+            return
+        while rows < needed:
+            rows *= 2
+        if self.capacity:
+            rows = min(rows, self.capacity)
+        matrix = np.empty((rows, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        self._payloads.extend([None] * (rows - len(self._payloads)))
+
+    def add_batch(self, vectors, payloads):
+        """Append rows with their payloads"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            self._reserve(len(vectors))
+            for vector, payload in zip(vectors, payloads):
+                if self.capacity and self._size == self.capacity:
+                    # Full ring buffer: overwrite the oldest row
+                    row = self._next
+                    self._next = (self._next + 1) % self.capacity
+                else:
+                    row = self._size
+                    self._size += 1
+                self._matrix[row] = vector
+                self._payloads[row] = payload
+
+    def add(self, vector, payload):
+        self.add_batch(vector[None, :], [payload])
+
+    def search(self, query, k=10):
+        """Return up to k (score, payload) pairs with the highest inner product"""
+        with self._lock:
+            if self._size == 0:
+                return []
+            scores = self._matrix[:self._size] @ np.asarray(query, dtype=np.float32)
+            best = _top_k(scores, k)
+            return [(float(scores[row]), self._payloads[row]) for row in best]
+
+
+class PartitionedIndex:
+    """Inverted-file (IVF) index for large stores.
+
+    Vectors are partitioned by their nearest k-means centroid, each
+    partition being a VectorIndex. A query scans only the nprobe partitions
+    whose centroids score highest, trading a little recall for speed.
+    """
+
+    def __init__(self, dim, n_lists=256, nprobe=8):
+        """Initialize an untrained index"""
+        self.dim = dim
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.centroids = None
+        self._lists = []
+
+    def __len__(self):
+        return sum(len(partition) for partition in self._lists)
+
+    def train(self, sample, iterations=10, seed=0, chunk=65536):
+        """Fit spherical k-means centroids on a sample of vectors"""
+        sample = np.asarray(sample, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        n_lists = min(self.n_lists, len(sample))
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = self._assign(sample, centroids, chunk)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        self.centroids = centroids.astype(np.float32)
+        self._lists = [VectorIndex(self.dim) for _ in range(n_lists)]
+
+    @staticmethod
+    def _assign(vectors, centroids, chunk=65536):
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            block = vectors[start:start + chunk] @ centroids.T
+            assignment[start:start + chunk] = block.argmax(axis=1)
+        return assignment
+
+    def add_batch(self, vectors, payloads):
+        """Add vectors to the partitions of their nearest centroids"""
+        if self.centroids is None:
+            raise RuntimeError("PartitionedIndex must be trained before adding vectors")
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        payloads = list(payloads)
+        assignment = self._assign(vectors, self.centroids)
+        order = np.argsort(assignment, kind='stable')
+        bounds = np.searchsorted(assignment[order], np.arange(len(self._lists) + 1))
+        for partition, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if start < end:
+                rows = order[start:end]
+                self._lists[partition].add_batch(vectors[rows], [payloads[row] for row in rows])
+
+    def search(self, query, k=10):
+        """Return up to k (score, payload) pairs from the nearest partitions"""
+        if self.centroids is None:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        probes = _top_k(self.centroids @ query, self.nprobe)
+        results = []
+        for partition in probes:
+            results.extend(self._lists[partition].search(query, k))
+        results.sort(key=lambda result: result[0], reverse=True)
+        return results[:k]
+
+
+class ConversationIndex:
+    """Per-user embedding indexes over past conversation turns.
+
+    Each user gets a VectorIndex ring buffer of at most turns_per_user
+    entries; users are evicted least-recently-used beyond max_users and,
+    like sessions, once idle for longer than ttl_seconds, so the turns of
+    users the session store has dropped do not stay resident. At 256
+    dimensions the defaults bound the vectors to about 100 MB.
+
+    The index lives in process memory. With load_history, a callable
+    returning a user's stored Messages oldest first, a search for a user
+    with no index seeds one from the completed turns of that history, so
+    context survives restarts, evictions and requests landing on another
+    worker.
+    """
+
+    def __init__(self, embedder, max_users=1000, turns_per_user=100, ttl_seconds=3600,
+                 load_history=None):
+        """Initialize the conversation index"""
+        self.embedder = embedder
+        self.max_users = max_users
+        self.turns_per_user = turns_per_user
+        self.ttl_seconds = ttl_seconds
+        self.load_history = load_history
+        # user_id -> (index, last access), least recently used first
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.ttl_evictions = 0
+        self.seeded = 0
+
+    def _expire(self, now):
+        """Drop idle users from the least-recently-used end"""
+        if not self.ttl_seconds:
+            return
+        while self._indexes:
+            _, last_access = next(iter(self._indexes.values()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            self._indexes.popitem(last=False)
+            self.ttl_evictions += 1
+
+    def _index(self, user_id, create):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._indexes.get(user_id)
+            if entry is not None:
+                index = entry[0]
+                self._indexes.move_to_end(user_id)
+            elif create:
+                while len(self._indexes) >= self.max_users:
+                    self._indexes.popitem(last=False)
+                    self.evictions += 1
+                index = VectorIndex(self.embedder.dim, capacity=self.turns_per_user)
+            else:
+                return None
+            self._indexes[user_id] = (index, now)
+            return index
+
+    def _seed(self, user_id):
+        """Index the completed turns of a user's stored history"""
+        history = self.load_history(user_id)
+        # A trailing user message is the turn in progress; add_turns indexes
+        # it once the turn completes
+        end = len(history)
+        while end and history[end - 1].role == 'user':
+            end -= 1
+        history = history[max(0, end - self.turns_per_user):end]
+        if not history:
+            return None
+
+        index = VectorIndex(self.embedder.dim, capacity=self.turns_per_user)
+        index.add_batch(self.embedder.embed_batch([entry.message for entry in history]), history)
+        with self._lock:
+            entry = self._indexes.get(user_id)
+            if entry is not None:
+                # Another request seeded or indexed the user meanwhile
+                return entry[0]
+            while len(self._indexes) >= self.max_users:
+                self._indexes.popitem(last=False)
+                self.evictions += 1
+            self._indexes[user_id] = (index, time.monotonic())
+            self.seeded += 1
+        return index
+
+    def add_turns(self, user_id, messages):
+        """Embed and index history entries (Message records)"""
+        vectors = self.embedder.embed_batch([entry.message for entry in messages])
+        self._index(user_id, create=True).add_batch(vectors, messages)
+
+    def search(self, user_id, text, k=10):
+        """Past entries of a user most similar to text, best first"""
+        index = self._index(user_id, create=False)
+        if index is None and self.load_history is not None:
+            index = self._seed(user_id)
+        if index is None:
+            return []
+        return [entry for _, entry in index.search(self.embedder.embed(text), k)]
+
+    def stats(self):
+        """Report index occupancy and memory"""
+        with self._lock:
+            self._expire(time.monotonic())
+            indexes = [index for index, _ in self._indexes.values()]
+        return {
+            "users": len(indexes),
+            "vectors": sum(len(index) for index in indexes),
+            "matrix_bytes": sum(index.nbytes for index in indexes),
+            "evictions": self.evictions,
+            "ttl_evictions": self.ttl_evictions,
+            "seeded": self.seeded
+        }
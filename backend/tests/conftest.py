@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def backend():
+    """The app module, imported with eager warm-up and a throwaway data directory"""
+    os.environ.setdefault('BRAD_WARMUP', 'eager')
+    os.environ.setdefault('BRAD_DATA_DIR', tempfile.mkdtemp(prefix='brad-test-'))
+    import app
+    return app
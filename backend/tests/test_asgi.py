@@ -0,0 +1,44 @@
+"""Admission control of the ASGI front end, driven without a server."""
+import asyncio
+import json
+
+from serving.asgi import ChatASGIApp
+
+
+async def post(app, path, data):
+    body = json.dumps(data).encode('utf-8')
+    scope = {
+        'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'',
+        'headers': [(b'content-type', b'application/json')],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]['status']
+
+
+def test_burst_beyond_queue_is_shed(backend):
+    app = ChatASGIApp(backend, max_concurrency=2, max_queue=1)
+
+    async def burst():
+        return await asyncio.gather(*(
+            post(app, '/api/chat', {"message": f"hello number {index}", "user_id": f"burst-{index}"})
+            for index in range(10)
+        ))
+
+    try:
+        statuses = asyncio.run(burst())
+    finally:
+        app.executor.shutdown()
+        app.probe_executor.shutdown()
+    assert statuses.count(200) == 3
+    assert statuses.count(429) == 7
+    assert app.rejected == 7
+    stats = app.stats()
+    assert stats["active"] == 0 and stats["waiting"] == 0
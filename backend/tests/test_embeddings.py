@@ -0,0 +1,15 @@
+"""Word memoization of the hashed n-gram embedder."""
+import numpy as np
+
+from models.embeddings import MAX_CACHED_WORD_LENGTH, HashedNgramEmbedder
+
+
+def test_long_words_are_not_cached():
+    embedder = HashedNgramEmbedder(dim=64)
+    long_word = 'w' * (MAX_CACHED_WORD_LENGTH + 1)
+    text = f"short words {long_word}"
+    first = embedder.embed(text)
+
+    assert set(embedder._word_cache) == {'short', 'words'}
+    assert np.array_equal(embedder.embed(text), first)
+    assert np.isclose(np.linalg.norm(first), 1.0)
@@ -0,0 +1,17 @@
+"""Token memoization of the single-pass feature extractor."""
+from models.feature_extractor import MAX_CACHED_TOKEN_LENGTH
+from models.ml_processor import MLProcessor
+
+
+def test_long_tokens_are_not_cached():
+    extractor = MLProcessor().feature_extractor
+    long_token = 'Great' + 'x' * MAX_CACHED_TOKEN_LENGTH
+    text = f"great python {long_token}!"
+    features = extractor.extract(text)
+
+    assert set(extractor._token_cache) == {'great', 'python'}
+    # The cached form shares the token instead of holding a lowercase copy
+    assert all(stats[1] is token for token, stats in extractor._token_cache.items())
+    assert extractor.extract(text) == features
+    assert features["word_count"] == 3 and features["has_exclamation"]
+    assert extractor.extract_batch([text]).to_dicts()[0]["unique_words"] == features["unique_words"]
@@ -0,0 +1,17 @@
+"""Response templates of the intent router."""
+from models.intent_router import IntentRouter
+
+
+def test_placeholders_in_message_are_kept():
+    router = IntentRouter.from_file()
+    response = router.respond("zzz {topic}")
+    assert router.match("zzz {topic}") is router.fallback
+    assert "about 'zzz {topic}'" in response
+
+    response = router.respond("explain {message} templates")
+    assert response.startswith("{message} templates is a topic")
+
+
+def test_other_braces_in_templates_are_kept():
+    router = IntentRouter.from_file()
+    assert "return f'Hello, {name}!'" in router.respond("python")
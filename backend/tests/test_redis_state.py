@@ -0,0 +1,176 @@
+"""Redis-protocol client and shared state against the stand-in server.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+import socket
+
+import pytest
+
+from models.ml_processor import MLProcessor
+from storage.records import Message, Profile
+from storage.redis_client import ConnectionPool, HashRing, RedisConnection, RedisError
+from storage.resp_server import RESPServer
+from storage.state import RedisState
+
+
+@pytest.fixture
+def server():
+    server = RESPServer().start()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def pool(server):
+    pool = ConnectionPool.from_url(server.url, max_connections=4, timeout=2.0)
+    yield pool
+    pool.close()
+
+
+def test_encode_command():
+    assert RedisConnection._encode(('SET', 'key', 42, 1.5, b'\x00raw')) == (
+        b'*5\r\n$3\r\nSET\r\n$3\r\nkey\r\n$2\r\n42\r\n$3\r\n1.5\r\n$4\r\n\x00raw\r\n'
+    )
+
+
+def test_reply_types(pool):
+    assert pool.execute('PING') == 'PONG'
+    assert pool.execute('SET', 'text', 'héllo\r\nworld') == 'OK'
+    assert pool.execute('GET', 'text') == 'héllo\r\nworld'.encode('utf-8')
+    assert pool.execute('RPUSH', 'list', 'a', 'b', 'c') == 3
+    assert pool.execute('LRANGE', 'list', 0, -1) == [b'a', b'b', b'c']
+    assert pool.execute('LRANGE', 'missing', 0, -1) == []
+
+
+def test_nil_reply(pool):
+    assert pool.execute('GET', 'missing') is None
+    assert pool.pipeline([('GET', 'missing'), ('EXISTS', 'missing')]) == [None, 0]
+
+
+def test_error_replies(pool):
+    with pytest.raises(RedisError, match='unknown command'):
+        pool.execute('BOGUS')
+    pool.execute('SET', 'text', 'value')
+    replies = pool.pipeline([('RPUSH', 'text', 'x'), ('GET', 'text')])
+    assert isinstance(replies[0], RedisError) and 'WRONGTYPE' in str(replies[0])
+    assert replies[1] == b'value'
+    # An error reply leaves the connection usable, so it goes back to the pool
+    assert pool.stats()["discarded"] == 0
+    assert pool.execute('PING') == 'PONG'
+
+
+def test_pool_reuses_connections(pool):
+    for _ in range(5):
+        pool.execute('PING')
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["idle"] == 1
+
+
+def test_pool_drops_connection_after_io_error(pool):
+    pool.execute('PING')
+    with pytest.raises(OSError):
+        with pool.connection() as connection:
+            connection._sock.shutdown(socket.SHUT_RDWR)
+            connection.execute('PING')
+    stats = pool.stats()
+    assert stats["discarded"] == 1
+    assert stats["idle"] == 0
+
+    assert pool.execute('PING') == 'PONG'
+    assert pool.stats()["created"] == 2
+
+
+def test_exec_with_error_reply_inside(pool):
+    pool.execute('SET', 'text', 'value')
+    replies = pool.pipeline([
+        ('MULTI',), ('SET', 'other', '1'), ('RPUSH', 'text', 'x'), ('GET', 'other'), ('EXEC',)
+    ])
+    assert replies[:4] == ['OK', 'QUEUED', 'QUEUED', 'QUEUED']
+    ok, error, value = replies[4]
+    assert ok == 'OK' and isinstance(error, RedisError) and value == b'1'
+
+
+def test_exec_aborted_by_queued_error(pool):
+    replies = pool.pipeline([('MULTI',), ('SET', 'key', '1'), ('BOGUS',), ('EXEC',)])
+    assert isinstance(replies[2], RedisError)
+    assert isinstance(replies[3], RedisError) and str(replies[3]).startswith('EXECABORT')
+    assert pool.execute('GET', 'key') is None
+
+
+def test_session_write_reports_errors(server):
+    state = RedisState(server.url)
+    store = state.session_store()
+    with pytest.raises(RedisError, match='WRONGTYPE'):
+        store._write('user', [('SET', 'k', 'v'), ('RPUSH', 'k', 'x')])
+    with pytest.raises(RedisError, match='unknown command'):
+        store._write('user', [('SET', 'k', 'v'), ('BOGUS',)])
+    state.close()
+
+
+def test_hash_ring_stable_when_node_added():
+    keys = [f"user-{index}" for index in range(5000)]
+    before = HashRing(['a', 'b', 'c'])
+    after = HashRing(['a', 'b', 'c', 'd'])
+    moved = [key for key in keys if before.node(key) != after.node(key)]
+    # Only keys taken over by the new node move
+    assert all(after.node(key) == 'd' for key in moved)
+    assert 0.15 < len(moved) / len(keys) < 0.35
+    assert {before.node(key) for key in keys} == {'a', 'b', 'c'}
+
+
+def test_record_turn_matches_profile_record():
+    # Features as the chat path extracts them
+    processor = MLProcessor()
+    turns = [processor.extract_features(text) for text in (
+        "I love learning about machine learning and neural networks",
+        "My computer keeps crashing, this is terrible",
+        "What should I cook for dinner tonight?",
+        "Tell me about the science of black holes",
+        "Python code for a web server, please",
+    )]
+    servers = [RESPServer().start(), RESPServer().start()]
+    state = RedisState([server.url for server in servers])
+    try:
+        store = state.session_store(history_size=4)
+        expected = Profile(last_interaction=0)
+        for index, features in enumerate(turns):
+            now = 1000.0 + index
+            expected.record(features, now)
+            store.record_turn('user-1', [Message('user', f"message {index}", now)], features, now)
+
+        profile = store.get_profile('user-1')
+        assert profile.interaction_count == expected.interaction_count
+        assert profile.average_sentiment == pytest.approx(expected.average_sentiment)
+        assert profile.last_interaction == expected.last_interaction
+        assert profile.topics.counts == expected.topics.counts
+        assert [entry.message for entry in store.get_history('user-1')] == [
+            f"message {index}" for index in range(1, 5)
+        ]
+        assert store.get_profile('someone-else') is None
+    finally:
+        state.close()
+        for server in servers:
+            server.close()
+
+
+def test_numeric_user_id(server):
+    state = RedisState(server.url)
+    store = state.session_store()
+    store.record_turn(42, [Message('user', 'hi')], {})
+    assert 42 in store
+    assert store.get_history('42')[0].message == 'hi'
+    state.close()
+
+
+def test_stats_do_not_write(server):
+    state = RedisState(server.url)
+    store = state.session_store(ttl_seconds=1)
+    store.record_turn('user-1', [Message('user', 'hi')], {}, now=0.0)
+    before = {key: dict(value) if isinstance(value, dict) else value
+              for key, value in server.keyspace.data.items()}
+    assert store.stats()["active_users"] == 0
+    assert server.keyspace.data == before
+    assert store.prune() == 1
+    state.close()
@@ -0,0 +1,60 @@
+"""Thread safety of the in-process SessionStore."""
+import sys
+import threading
+
+from storage.records import Message
+from storage.session_store import SessionStore, _message_size
+
+
+def test_history_bytes_under_concurrent_eviction():
+    store = SessionStore(max_users=4, ttl_seconds=0, history_size=5)
+    switch_interval = sys.getswitchinterval()
+    # Switch threads often so evictions land between lookup and append
+    sys.setswitchinterval(1e-6)
+
+    def chat(worker):
+        for index in range(10000):
+            store.append_message(f"user-{worker}-{index % 6}", Message('user', 'x' * (index % 50)))
+
+    threads = [threading.Thread(target=chat, args=(worker,)) for worker in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    sessions = list(store._sessions.values())
+    assert len(sessions) <= 4
+    retained = sum(_message_size(message) for session in sessions for message in session.history)
+    assert store._history_bytes == retained
+    assert store.stats()["history_bytes"] == retained
+
+
+def test_append_survives_eviction_after_lookup():
+    store = SessionStore(max_users=1, ttl_seconds=0)
+    lookup = store._session
+    evicted = []
+
+    def racing_lookup(user_id, create):
+        session = lookup(user_id, create)
+        if not evicted:
+            # Another user arrives between the lookup and the append
+            evicted.append(lookup('other', create=True))
+        return session
+
+    store._session = racing_lookup
+    store.append_message('user', Message('user', 'hello'))
+    assert [message.message for message in store.get_history('user')] == ['hello']
+    assert store._history_bytes == _message_size(store.get_history('user')[0])
+
+
+def test_stats_do_not_expire():
+    store = SessionStore(ttl_seconds=60)
+    store.append_message('user', Message('user', 'hello'))
+    store._sessions['user'].last_access -= 120
+    assert store.stats()["active_users"] == 1
+    assert store.ttl_evictions == 0
+    assert store.prune() == 1
+    assert store.stats()["active_users"] == 0
@@ -0,0 +1,36 @@
+"""Context retrieval of the per-user conversation index."""
+from models.embeddings import HashedNgramEmbedder
+from storage.records import Message
+from storage.session_store import SessionStore
+from storage.vector_index import ConversationIndex
+
+
+def test_fresh_index_is_seeded_from_stored_history():
+    store = SessionStore()
+    for role, text in (('user', 'how do I train a neural network'),
+                       ('assistant', 'start with a small network and a learning rate'),
+                       ('user', 'what is the weather like'),
+                       ('assistant', 'I have no weather data'),
+                       ('user', 'tell me more about neural network training')):
+        store.append_message('user-1', Message(role, text))
+    # As after a restart or on another worker: the history exists, the index does not
+    index = ConversationIndex(HashedNgramEmbedder(dim=64), load_history=store.get_history)
+
+    context = index.search('user-1', 'tell me more about neural network training', k=2)
+    assert [entry.message for entry in context] == [
+        'how do I train a neural network', 'start with a small network and a learning rate'
+    ]
+    # The message in progress is left for add_turns
+    assert index.stats()["vectors"] == 4 and index.seeded == 1
+
+    index.add_turns('user-1', [Message('user', 'tell me more about neural network training'),
+                               Message('assistant', 'use more data')])
+    assert index.stats()["vectors"] == 6 and index.seeded == 1
+    assert index.search('nobody', 'hello') == []
+
+
+def test_app_retrieves_context_from_history_it_did_not_index(backend):
+    backend.session_store.append_message('restored-user', Message('user', 'my favourite food is pizza'))
+    backend.session_store.append_message('restored-user', Message('assistant', 'pizza is a fine choice'))
+    context = backend.conversation_index.search('restored-user', 'what is my favourite food', k=1)
+    assert [entry.message for entry in context] == ['my favourite food is pizza']
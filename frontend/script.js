@@ -150,8 +150,10 @@ class BradAIChat {
         // Show loading
         this.setLoading(true);
         
+        let streamingElement = null;
+        
         try {
-            const response = await fetch(`${this.API_URL}/chat`, {
+            const response = await fetch(`${this.API_URL}/chat/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -163,13 +165,33 @@ class BradAIChat {
                 })
             });
             
-            const data = await response.json();
-            
-            if (data.error) {
-                throw new Error(data.error);
+            if (!response.ok || !response.body) {
+                const error = await response.json();
+                throw new Error(error.error || `Request failed (${response.status})`);
             }
             
-            // Add assistant response
+            // Render chunks as they arrive
+            let streamed = '';
+            const data = await this.readEventStream(response, (delta) => {
+                if (!streamingElement) {
+                    this.elements.loadingOverlay.classList.remove('active');
+                    streamingElement = this.addMessage({
+                        role: 'assistant',
+                        content: '',
+                        timestamp: new Date().toISOString(),
+                        model: this.models ? this.models[this.currentModel].name : null
+                    });
+                }
+                streamed += delta;
+                streamingElement.querySelector('.message-content').innerHTML = this.formatResponse(streamed);
+                this.elements.chatMessages.scrollTop = this.elements.chatMessages.scrollHeight;
+            });
+            
+            // Replace the streamed message with the final one and its metadata
+            if (streamingElement) {
+                streamingElement.remove();
+                streamingElement = null;
+            }
             this.addMessage({
                 role: 'assistant',
                 content: data.response,
@@ -187,6 +209,9 @@ class BradAIChat {
             
         } catch (error) {
             console.error('Error sending message:', error);
+            if (streamingElement) {
+                streamingElement.remove();
+            }
             this.addMessage({
                 role: 'system',
                 content: `Error: ${error.message}`,
@@ -198,6 +223,40 @@ class BradAIChat {
         }
     }
     
+    async readEventStream(response, onDelta) {
+        // Parse Server-Sent Events from a fetch body; resolves with the 'done' payload
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (!data) continue;
+                
+                const payload = JSON.parse(data);
+                if (event === 'done') return payload;
+                if (event === 'error') throw new Error(payload.error);
+                onDelta(payload.delta);
+            }
+        }
+        
+        throw new Error('Stream ended before the response completed');
+    }
+    
     addMessage(messageData) {
         const messageElement = document.createElement('div');
         messageElement.className = `message ${messageData.role}`;
@@ -266,6 +325,8 @@ class BradAIChat {
         if (welcomeMessage) {
             welcomeMessage.remove();
         }
+        
+        return messageElement;
     }
     
     formatResponse(text) {